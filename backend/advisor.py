@@ -0,0 +1,291 @@
+"""
+Anytime choice advisor.
+Ranks every legal (card, choice) of a state by the expected value of an objective
+after playing on for a number of time units. Each choice is an arm of a UCB1 bandit
+(flat Monte-Carlo tree search): until the time budget runs out, batches of rollouts
+go to the most promising or least explored choices. A rollout makes the choice on a
+fork of the state and then follows the default policy: a fixed Policy with a seeded
+random choice for cards it doesn't cover, or a uniformly random legal choice.
+
+Rollouts run in worker processes (or inline with jobs=1). Statistics live in a
+transposition table keyed by the state a choice leads to, so choices reaching the
+same state share them and asking again about a state continues where the last
+budget stopped.
+"""
+import math
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from . import debug
+from .game_loader import attach_modes, published_modes
+from .game_state import GameState, Policy
+from .optimizer import Objective, policy_to_rules, rules_to_policy
+from .runner import apply_action, choose_action, legal_choices
+
+@dataclass
+class ChoiceAdvice:
+    card_index: int
+    choice_index: int
+    card_title: str
+    choice_description: str
+    mean: float  # Average objective over the rollouts (-inf if the choice fails)
+    best: float
+    rollouts: int
+    rank: int = 0  # 1 is the best choice
+
+@dataclass
+class _Stats:
+    rollouts: int = 0
+    total: float = 0.0
+    best: float = -math.inf
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.rollouts if self.rollouts else -math.inf
+
+    def add(self, values: List[float]) -> None:
+        for value in values:
+            self.rollouts += 1
+            self.total += value
+            self.best = max(self.best, value)
+
+def rollout(state: GameState, horizon: int, seed: int, objective: Objective, max_steps: int = 10000) -> float:
+    """Play a fork of the state with its policy (random where no rule matches) for
+    `horizon` time units and score the outcome"""
+    game = state.fork()
+    game.set_undo_limit(0)
+    rng = random.Random(seed)
+    stop_time = game.current_time + horizon
+    error = None
+    try:
+        for _ in range(max_steps):
+            if game.current_time >= stop_time or game.is_game_over():
+                break
+            action = choose_action(game, rng)
+            if action is None or (not apply_action(game, action) and action["type"] != "choice"):
+                break
+    except Exception as e:
+        # Config errors (e.g. a next_cards link to a missing card) make the line worthless
+        error = f"{type(e).__name__}: {e}"
+    return objective({
+        "resources": dict(game.resources),
+        "relics": {relic.name: relic.count for relic in game.relics},
+        "time": game.current_time,
+        "game_over": game.is_game_over(),
+        "error": error
+    })
+
+def _state_payload(state: GameState) -> Dict:
+    """What a worker needs to rebuild the state exactly"""
+    data = state.to_dict()
+    data.pop("event_history")  # Doesn't affect how the game continues
+    return {
+        "state": data,
+        # make_choice only auto-selects while this attribute has never been set
+        "auto_selecting": getattr(state, "_auto_selecting", None)
+    }
+
+def _restore(payload: Dict, mode: str, config_path: str) -> GameState:
+    state = GameState.from_dict(payload["state"], Path(config_path), mode)
+    if payload["auto_selecting"] is not None:
+        state._auto_selecting = payload["auto_selecting"]
+    return state
+
+# Worker process caches: states by transposition key, objectives by expression
+_STATES: "OrderedDict[Tuple, GameState]" = OrderedDict()
+_OBJECTIVES: Dict[str, Objective] = {}
+
+def _worker_init(mode_handles: List[Dict]) -> None:
+    debug.set_debug(False)
+    attach_modes(mode_handles)
+
+def _rollout_batch(key: Tuple, payload: Dict, mode: str, config_path: str, rules: Optional[tuple],
+                   horizon: int, seeds: List[int], objective: str, max_steps: int) -> List[float]:
+    if key not in _STATES:
+        state = _restore(payload, mode, config_path)
+        state.set_undo_limit(0)
+        state.policy = rules_to_policy(rules or ())
+        _STATES[key] = state
+        while len(_STATES) > 64:
+            _STATES.popitem(last=False)
+    if objective not in _OBJECTIVES:
+        _OBJECTIVES[objective] = Objective(objective)
+    return [rollout(_STATES[key], horizon, seed, _OBJECTIVES[objective], max_steps) for seed in seeds]
+
+class Advisor:
+    """Ranks the legal choices of a state within a time budget"""
+    def __init__(self, mode: str, objective: Union[str, Callable[[Dict], float]], horizon: int = 20,
+                 rollout_policy: Optional[Policy] = None, config_path: str = "config", jobs: int = 1,
+                 batch_size: int = 4, exploration: float = 1.4, max_steps: int = 10000,
+                 max_entries: int = 10000, seed: int = 0):
+        if jobs > 1 and not isinstance(objective, str):
+            raise ValueError("Worker processes need the objective as an expression string")
+        self.mode = mode
+        self.objective_source = objective
+        self.objective = Objective(objective)
+        self.horizon = horizon
+        self.rules = policy_to_rules(rollout_policy) if rollout_policy is not None else ()
+        self.config_path = config_path
+        self.jobs = jobs
+        self.batch_size = batch_size
+        self.exploration = exploration
+        self.max_steps = max_steps
+        self.max_entries = max_entries
+        self._seeds = random.Random(seed)
+        # (child state hash, auto-select flag, horizon, policy, objective) -> rollout statistics
+        self.table: "OrderedDict[Tuple, _Stats]" = OrderedDict()
+        self._modes = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._modes = published_modes([(self.mode, self.config_path)])
+            handles = self._modes.__enter__()
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_worker_init,
+                                                 initargs=(handles,))
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._modes.__exit__(None, None, None)
+            self._modes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _key(self, child: GameState) -> Tuple:
+        return (child.state_hash(), getattr(child, "_auto_selecting", None), self.horizon,
+                self.rules, str(self.objective_source))
+
+    def _stats(self, key: Tuple) -> _Stats:
+        stats = self.table.get(key)
+        if stats is None:
+            stats = self.table[key] = _Stats()
+            while len(self.table) > self.max_entries:
+                self.table.popitem(last=False)
+        else:
+            self.table.move_to_end(key)
+        return stats
+
+    def advise(self, state: GameState, budget: float = 0.2,
+               should_stop: Optional[Callable[[], bool]] = None) -> List[ChoiceAdvice]:
+        """Rank the legal choices of the state, spending about `budget` seconds on rollouts"""
+        deadline = time.monotonic() + budget
+        arms: Dict[Tuple, Tuple[GameState, List[Tuple[int, int]]]] = {}
+        failed: List[Tuple[int, int]] = []
+        for card_index, choice_index in legal_choices(state):
+            child = state.fork()
+            child.set_undo_limit(0)
+            child.policy = rules_to_policy(self.rules)
+            try:
+                child.make_choice(card_index, choice_index)
+            except Exception:
+                failed.append((card_index, choice_index))
+                continue
+            key = self._key(child)
+            if key in arms:
+                arms[key][1].append((card_index, choice_index))
+            else:
+                arms[key] = (child, [(card_index, choice_index)])
+
+        if len(arms) > 1:
+            if self.jobs > 1:
+                self._search_parallel(arms, deadline, should_stop)
+            else:
+                self._search_inline(arms, deadline, should_stop)
+        else:
+            # Nothing to compare; one rollout still gives the only choice a value
+            for key, (child, _) in arms.items():
+                if self._stats(key).rollouts == 0:
+                    self._run_inline(key, child, 1)
+
+        advice = []
+        for key, (child, choices) in arms.items():
+            stats = self._stats(key)
+            for card_index, choice_index in choices:
+                advice.append(self._advice(state, card_index, choice_index, stats.mean, stats.best, stats.rollouts))
+        for card_index, choice_index in failed:
+            advice.append(self._advice(state, card_index, choice_index, -math.inf, -math.inf, 0))
+        advice.sort(key=lambda a: (-a.mean, -a.rollouts))
+        for rank, item in enumerate(advice, 1):
+            item.rank = rank
+        return advice
+
+    @staticmethod
+    def _advice(state: GameState, card_index: int, choice_index: int, mean: float, best: float,
+                rollouts: int) -> ChoiceAdvice:
+        card = state.active_cards[card_index]
+        return ChoiceAdvice(card_index, choice_index, card.title, card.choices[choice_index]["description"],
+                            mean, best, rollouts)
+
+    def _select(self, keys: List[Tuple], in_flight: Dict[Tuple, int]) -> Tuple:
+        """UCB1 over the arms, counting queued rollouts as already played"""
+        counts = {key: self._stats(key).rollouts + in_flight.get(key, 0) for key in keys}
+        unexplored = [key for key in keys if counts[key] == 0]
+        if unexplored:
+            return unexplored[0]
+        finite = [self._stats(key).mean for key in keys if self._stats(key).rollouts and math.isfinite(self._stats(key).mean)]
+        scale = (max(finite) - min(finite)) if len(finite) > 1 else 0.0
+        scale = scale or max(1.0, max((abs(value) for value in finite), default=1.0))
+        total = sum(counts.values())
+
+        def ucb(key: Tuple) -> float:
+            stats = self._stats(key)
+            if stats.rollouts == 0:
+                return math.inf
+            return stats.mean + self.exploration * scale * math.sqrt(math.log(total) / counts[key])
+        return max(keys, key=ucb)
+
+    def _run_inline(self, key: Tuple, child: GameState, count: int) -> None:
+        seeds = [self._seeds.getrandbits(32) for _ in range(count)]
+        self._stats(key).add([rollout(child, self.horizon, seed, self.objective, self.max_steps) for seed in seeds])
+
+    def _search_inline(self, arms: Dict, deadline: float, should_stop: Optional[Callable[[], bool]]) -> None:
+        keys = list(arms)
+        while time.monotonic() < deadline and not (should_stop and should_stop()):
+            key = self._select(keys, {})
+            self._run_inline(key, arms[key][0], 1)
+
+    def _search_parallel(self, arms: Dict, deadline: float, should_stop: Optional[Callable[[], bool]]) -> None:
+        executor = self._pool()
+        keys = list(arms)
+        payloads = {key: _state_payload(arms[key][0]) for key in keys}
+        in_flight: Dict[Tuple, int] = {}
+        pending: Dict[Future, Tuple] = {}
+        while True:
+            stopping = time.monotonic() >= deadline or (should_stop and should_stop())
+            while not stopping and len(pending) < self.jobs * 2:
+                key = self._select(keys, in_flight)
+                seeds = [self._seeds.getrandbits(32) for _ in range(self.batch_size)]
+                future = executor.submit(_rollout_batch, key, payloads[key], self.mode, self.config_path,
+                                         self.rules, self.horizon, seeds, self.objective_source, self.max_steps)
+                pending[future] = key
+                in_flight[key] = in_flight.get(key, 0) + self.batch_size
+            if not pending:
+                return
+            if stopping:
+                for future in pending:
+                    future.cancel()
+            done, _ = wait(pending, timeout=None if stopping else max(0.0, deadline - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                in_flight[key] -= self.batch_size
+                if not future.cancelled():
+                    self._stats(key).add(future.result())
+            if stopping:
+                # Batches already running are short; collect them so no work is lost
+                for future, key in list(pending.items()):
+                    if not future.cancelled():
+                        self._stats(key).add(future.result())
+                return
@@ -0,0 +1,370 @@
+"""
+Cross-run analytics.
+Plays many headless games of a mode and answers aggregate questions: distributions
+of final resources and game length, how often each card is drawn and each choice
+made, when relics are first acquired, and why games end (the min_amount/max_amount
+checks of is_game_over, or running out of cards).
+
+Every statistic is a mergeable partial result: counters, and quantile sketches that
+also give histograms. Worker processes reduce their runs locally into an Aggregate
+and send back its compact to_dict() form, never event histories; the parent merges
+the partials and writes one JSON report per mode.
+"""
+import argparse
+import json
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from . import debug, events
+from .game_loader import GameLoader, attach_modes, mode_error, published_modes
+from .game_state import GameState
+from .runner import RANDOM_POLICY, RunSpec, iter_run
+
+QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy (logarithmic buckets, as in
+    DDSketch). Count, sum, min and max are exact; quantiles are within `accuracy` of
+    the true value."""
+    def __init__(self, accuracy: float = 0.01):
+        if not 0 < accuracy < 1:
+            raise ValueError("accuracy must be between 0 and 1")
+        self.accuracy = accuracy
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Counter = Counter()  # Bucket key -> count
+        self.negative: Counter = Counter()  # Same, for magnitudes of negative values
+        self.zero = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value > 0:
+            self.positive[self._key(value)] += count
+        elif value < 0:
+            self.negative[self._key(-value)] += count
+        else:
+            self.zero += count
+        self.count += count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        if other.accuracy != self.accuracy:
+            raise ValueError("Can't merge sketches of different accuracy")
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zero += other.zero
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """(representative value, count) in ascending order"""
+        result = [(-self._value(key), self.negative[key]) for key in sorted(self.negative, reverse=True)]
+        if self.zero:
+            result.append((0.0, self.zero))
+        result.extend((self._value(key), self.positive[key]) for key in sorted(self.positive))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for value, count in self.buckets():
+            seen += count
+            if seen > rank:
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def histogram(self, bins: int = 20) -> List[Dict]:
+        """Equal-width bins between min and max, filled from the sketch buckets"""
+        if not self.count:
+            return []
+        if self.min == self.max:
+            return [{"low": self.min, "high": self.max, "count": self.count}]
+        width = (self.max - self.min) / bins
+        counts = [0] * bins
+        for value, count in self.buckets():
+            index = int((min(max(value, self.min), self.max) - self.min) / width)
+            counts[min(index, bins - 1)] += count
+        return [{"low": self.min + i * width, "high": self.min + (i + 1) * width, "count": count}
+                for i, count in enumerate(counts)]
+
+    def summary(self, bins: int = 20) -> Dict:
+        if not self.count:
+            return {"count": 0}
+        result = {"count": self.count, "mean": self.total / self.count, "min": self.min, "max": self.max}
+        result.update({f"p{round(q * 100)}": self.quantile(q) for q in QUANTILES})
+        result["histogram"] = self.histogram(bins)
+        return result
+
+    def to_dict(self) -> Dict:
+        return {
+            "accuracy": self.accuracy,
+            "positive": sorted(self.positive.items()),
+            "negative": sorted(self.negative.items()),
+            "zero": self.zero,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketch':
+        sketch = cls(data["accuracy"])
+        sketch.positive = Counter(dict(data["positive"]))
+        sketch.negative = Counter(dict(data["negative"]))
+        sketch.zero = data["zero"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+def _merge_sketches(target: Dict[str, QuantileSketch], source: Dict[str, QuantileSketch], accuracy: float) -> None:
+    for name, sketch in source.items():
+        target.setdefault(name, QuantileSketch(accuracy)).merge(sketch)
+
+class Aggregate:
+    """Mergeable statistics over runs of one mode"""
+    def __init__(self, mode: str, accuracy: float = 0.01):
+        self.mode = mode
+        self.accuracy = accuracy
+        self.runs = 0
+        self.errors = 0
+        self.load_error: Optional[str] = None  # Why the mode couldn't be loaded, if it couldn't
+        self.stop_reasons = Counter()
+        self.game_over_causes = Counter()
+        self.final_time = QuantileSketch(accuracy)
+        self.final_resources: Dict[str, QuantileSketch] = {}
+        self.card_draws = Counter()  # Card title -> draws (stacked draws included)
+        self.card_runs = Counter()  # Card title -> runs it was drawn in
+        self.choices = Counter()  # (card title, choice description) -> times made
+        self.relic_runs = Counter()  # Relic -> runs it was acquired in
+        self.relic_first: Dict[str, QuantileSketch] = {}  # Relic -> time of first acquisition
+
+    def add_run(self, summary: Dict, run_events: Iterable[events.EngineEvent],
+                game_over_cause: Optional[str]) -> None:
+        """Fold one run in: its runner summary record and the engine events it emitted"""
+        self.runs += 1
+        self.errors += 1 if summary.get("error") else 0
+        self.stop_reasons[summary["stop_reason"]] += 1
+        if game_over_cause is not None:
+            self.game_over_causes[game_over_cause] += 1
+        self.final_time.add(summary["final_time"])
+        for name, value in summary["resources"].items():
+            self.final_resources.setdefault(name, QuantileSketch(self.accuracy)).add(value)
+        drawn = set()
+        first_relic = {}
+        for event in run_events:
+            if event.kind in (events.CARD_DRAWN, events.CARD_STACKED):
+                self.card_draws[event.data["card"]] += 1
+                drawn.add(event.data["card"])
+            elif event.kind == events.CHOICE_APPLIED:
+                self.choices[(event.data["card"], event.data["choice"])] += 1
+            elif event.kind == events.RELIC_GAINED:
+                first_relic.setdefault(event.data["relic"], event.time)
+        self.card_runs.update(drawn)
+        self.relic_runs.update(first_relic)
+        for relic, time in first_relic.items():
+            self.relic_first.setdefault(relic, QuantileSketch(self.accuracy)).add(time)
+
+    def add_failed(self, runs: int, error: str) -> None:
+        """Count runs that never started because the mode failed to load"""
+        self.runs += runs
+        self.errors += runs
+        self.stop_reasons["error"] += runs
+        self.load_error = error
+
+    def merge(self, other: 'Aggregate') -> 'Aggregate':
+        if other.mode != self.mode:
+            raise ValueError(f"Can't merge {other.mode} into {self.mode}")
+        self.runs += other.runs
+        self.errors += other.errors
+        self.load_error = self.load_error or other.load_error
+        self.stop_reasons.update(other.stop_reasons)
+        self.game_over_causes.update(other.game_over_causes)
+        self.final_time.merge(other.final_time)
+        _merge_sketches(self.final_resources, other.final_resources, self.accuracy)
+        self.card_draws.update(other.card_draws)
+        self.card_runs.update(other.card_runs)
+        self.choices.update(other.choices)
+        self.relic_runs.update(other.relic_runs)
+        _merge_sketches(self.relic_first, other.relic_first, self.accuracy)
+        return self
+
+    def to_dict(self) -> Dict:
+        """Compact partial result, e.g. to send from a worker process"""
+        return {
+            "mode": self.mode,
+            "accuracy": self.accuracy,
+            "runs": self.runs,
+            "errors": self.errors,
+            "load_error": self.load_error,
+            "stop_reasons": dict(self.stop_reasons),
+            "game_over_causes": dict(self.game_over_causes),
+            "final_time": self.final_time.to_dict(),
+            "final_resources": {name: sketch.to_dict() for name, sketch in self.final_resources.items()},
+            "card_draws": dict(self.card_draws),
+            "card_runs": dict(self.card_runs),
+            "choices": [[card, choice, count] for (card, choice), count in self.choices.items()],
+            "relic_runs": dict(self.relic_runs),
+            "relic_first": {name: sketch.to_dict() for name, sketch in self.relic_first.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Aggregate':
+        aggregate = cls(data["mode"], data["accuracy"])
+        aggregate.runs = data["runs"]
+        aggregate.errors = data["errors"]
+        aggregate.load_error = data.get("load_error")
+        aggregate.stop_reasons = Counter(data["stop_reasons"])
+        aggregate.game_over_causes = Counter(data["game_over_causes"])
+        aggregate.final_time = QuantileSketch.from_dict(data["final_time"])
+        aggregate.final_resources = {name: QuantileSketch.from_dict(sketch)
+                                     for name, sketch in data["final_resources"].items()}
+        aggregate.card_draws = Counter(data["card_draws"])
+        aggregate.card_runs = Counter(data["card_runs"])
+        aggregate.choices = Counter({(card, choice): count for card, choice, count in data["choices"]})
+        aggregate.relic_runs = Counter(data["relic_runs"])
+        aggregate.relic_first = {name: QuantileSketch.from_dict(sketch)
+                                 for name, sketch in data["relic_first"].items()}
+        return aggregate
+
+    def report(self, bins: int = 20) -> Dict:
+        """The final JSON report"""
+        runs = max(1, self.runs)
+        choices: Dict[str, Dict] = {}
+        for (card, choice), count in self.choices.most_common():
+            choices.setdefault(card, {})[choice] = {"count": count, "per_run": count / runs}
+        return {
+            "mode": self.mode,
+            "runs": self.runs,
+            "errors": self.errors,
+            "load_error": self.load_error,
+            "stop_reasons": dict(self.stop_reasons.most_common()),
+            "game_over_causes": dict(self.game_over_causes.most_common()),
+            "final_time": self.final_time.summary(bins),
+            "final_resources": {name: sketch.summary(bins) for name, sketch in self.final_resources.items()},
+            "cards": {title: {"draws_per_run": count / runs, "drawn_in_runs": self.card_runs[title] / runs}
+                      for title, count in self.card_draws.most_common()},
+            "choices": choices,
+            "relics": {name: {"acquired_in_runs": self.relic_runs[name] / runs,
+                              "first_acquired": self.relic_first[name].summary(bins)}
+                       for name in sorted(self.relic_first)},
+            "quantile_accuracy": self.accuracy
+        }
+
+_OBSERVED = (events.CARD_DRAWN, events.CARD_STACKED, events.CHOICE_APPLIED, events.RELIC_GAINED)
+
+def analyze_run(spec: RunSpec, aggregate: Aggregate) -> None:
+    """Play one run and fold it into the aggregate"""
+    game = GameState(Path(spec.config_path), spec.mode)
+    game.set_undo_limit(0)
+    subscription = game.events.subscribe(maxsize=1 << 16, kinds=_OBSERVED)
+    run_events = []
+    summary = None
+    for record in iter_run(spec, game):
+        run_events.extend(subscription.drain())
+        if record["record"] == "summary":
+            summary = record
+    subscription.close()
+    game.events.unsubscribe(subscription)
+    aggregate.add_run(summary, run_events, game.game_over_cause())
+
+def analyze_batch(specs: List[RunSpec], accuracy: float = 0.01) -> Dict:
+    """Reduce a batch of runs of one mode to a partial result"""
+    aggregate = Aggregate(specs[0].mode, accuracy)
+    for spec in specs:
+        analyze_run(spec, aggregate)
+    return aggregate.to_dict()
+
+def _worker_init(mode_handles: List[Dict]) -> None:
+    debug.set_debug(False)
+    attach_modes(mode_handles)
+
+def analyze(specs: List[RunSpec], jobs: int = 1, batch_size: Optional[int] = None,
+            accuracy: float = 0.01) -> Dict[str, Aggregate]:
+    """Play every spec and return one merged Aggregate per mode"""
+    by_mode: Dict[str, List[RunSpec]] = {}
+    for spec in specs:
+        by_mode.setdefault(spec.mode, []).append(spec)
+    if batch_size is None:
+        # A few batches per worker keeps them busy without many partial results
+        batch_size = max(1, math.ceil(len(specs) / (max(1, jobs) * 4)))
+    batches = [mode_specs[i:i + batch_size]
+               for mode_specs in by_mode.values() for i in range(0, len(mode_specs), batch_size)]
+    results = {mode: Aggregate(mode, accuracy) for mode in by_mode}
+    if jobs <= 1:
+        errors: Dict[Tuple[str, str], Optional[str]] = {}
+        for batch in batches:
+            key = (batch[0].mode, str(batch[0].config_path))
+            if key not in errors:
+                errors[key] = mode_error(*key)
+            if errors[key] is not None:
+                results[batch[0].mode].add_failed(len(batch), errors[key])
+            else:
+                results[batch[0].mode].merge(Aggregate.from_dict(analyze_batch(batch, accuracy)))
+        return results
+
+    with published_modes((spec.mode, spec.config_path) for spec in specs) as handles, \
+            ProcessPoolExecutor(max_workers=jobs, initializer=_worker_init, initargs=(handles,)) as executor:
+        futures = []
+        for batch in batches:
+            error = handles.failures.get((batch[0].mode, str(batch[0].config_path)))
+            if error is not None:
+                results[batch[0].mode].add_failed(len(batch), error)
+            else:
+                futures.append(executor.submit(analyze_batch, batch, accuracy))
+        for future in as_completed(futures):
+            partial = Aggregate.from_dict(future.result())
+            results[partial.mode].merge(partial)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate statistics over many headless games")
+    parser.add_argument("--mode", action="append", help="Mode to analyze (repeatable, default: all)")
+    parser.add_argument("--runs", type=int, default=1000, help="Seeded runs per mode")
+    parser.add_argument("--policy", default=RANDOM_POLICY, help="Policy JSON file, or 'random'")
+    parser.add_argument("--until", type=int, help="Game time each run stops at")
+    parser.add_argument("--max-steps", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first run")
+    parser.add_argument("--config", default="config", help="Config directory")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--accuracy", type=float, default=0.01, help="Relative accuracy of quantiles")
+    parser.add_argument("--bins", type=int, default=20, help="Histogram bins")
+    parser.add_argument("--out", default="analytics_{mode}.json", help="Report path per mode ({mode} is replaced)")
+    args = parser.parse_args()
+
+    debug.set_debug(False)
+    modes = args.mode or sorted(GameLoader.get_available_modes(Path(args.config)))
+    specs = [RunSpec(mode=mode, stop_time=args.until, policy=args.policy, seed=args.seed + i,
+                     max_steps=args.max_steps, config_path=args.config)
+             for mode in modes for i in range(args.runs)]
+    for mode, aggregate in analyze(specs, jobs=args.jobs, accuracy=args.accuracy).items():
+        path = args.out.replace("{mode}", mode)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(aggregate.report(args.bins), f, indent=2, ensure_ascii=False)
+        causes = ", ".join(f"{cause} {count}" for cause, count in aggregate.game_over_causes.most_common())
+        print(f"{mode}: {aggregate.runs} runs, {aggregate.errors} errors, game over: {causes or 'none'} -> {path}")
+        if aggregate.load_error:
+            print(f"  {mode} couldn't be loaded: {aggregate.load_error}")
+
+if __name__ == "__main__":
+    main()
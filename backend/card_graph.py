@@ -0,0 +1,165 @@
+"""
+Compiled next_cards graph of a mode.
+Choices link to other cards through next_cards; this pass resolves those links once at
+load time instead of discovering them while playing. It records which choices lead to
+each card, links to card ids that don't exist, cards that can never be drawn, cycles,
+and a lower bound on the earliest time each card can be drawn. The bound ignores
+requirements and resources: a card can't appear sooner, but may appear later or never.
+"""
+import heapq
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Mapping, Tuple
+
+@dataclass(frozen=True)
+class CardLink:
+    source: str  # Card id of the card whose choice queues the target
+    choice: int  # Index of that choice
+    target: str  # Card id in next_cards
+    time_offset: int
+
+@dataclass(frozen=True)
+class CardGraph:
+    cards: Tuple[str, ...]  # Card ids in config order
+    scheduled: Mapping[str, int]  # Card id -> drawed_at for cards the game starts with
+    successors: Mapping[str, Tuple[CardLink, ...]]  # Valid links out of each card
+    predecessors: Mapping[str, Tuple[CardLink, ...]]  # Reverse index: choices that lead to each card
+    dangling: Tuple[CardLink, ...]  # Links to card ids missing from the config
+    reachable: FrozenSet[str]  # Cards that can be drawn at all
+    unreachable: Tuple[str, ...]
+    cycles: Tuple[Tuple[str, ...], ...]  # Card ids of each cycle (strongly connected component)
+    earliest_draw: Mapping[str, int]  # Lower bound on draw time, reachable cards only
+    ids_by_title: Mapping[str, Tuple[str, ...]]  # Runtime cards only know their title
+
+    def leads_to(self, card_id: str) -> Tuple[CardLink, ...]:
+        """Choices that queue card_id"""
+        return self.predecessors.get(card_id, ())
+
+    def problems(self) -> List[str]:
+        """Human readable config problems: dangling links and cards that can never be drawn"""
+        result = [f"{link.source} choice {link.choice} links to unknown card '{link.target}'"
+                  for link in self.dangling]
+        result.extend(f"{card_id} can never be drawn" for card_id in self.unreachable)
+        return result
+
+def compile_card_graph(card_config: Mapping) -> CardGraph:
+    cards_config = card_config.get("cards") or {}
+    cards = tuple(cards_config)
+    scheduled = {}
+    successors: Dict[str, List[CardLink]] = {card_id: [] for card_id in cards}
+    predecessors: Dict[str, List[CardLink]] = {card_id: [] for card_id in cards}
+    dangling = []
+    ids_by_title: Dict[str, List[str]] = {}
+    for card_id, card_data in cards_config.items():
+        ids_by_title.setdefault(card_data.get("title", card_id), []).append(card_id)
+        if card_data.get("drawed_at") is not None and card_data["drawed_at"] >= 0:
+            scheduled[card_id] = card_data["drawed_at"]
+        for index, choice in enumerate(card_data.get("choices") or []):
+            for next_card in (choice.get("effects") or {}).get("next_cards") or []:
+                link = CardLink(card_id, index, next_card["card"], next_card.get("time_offset", 0))
+                if link.target in successors:
+                    successors[card_id].append(link)
+                    predecessors[link.target].append(link)
+                else:
+                    dangling.append(link)
+
+    earliest_draw = _earliest_draw(scheduled, successors)
+    return CardGraph(
+        cards=cards,
+        scheduled=scheduled,
+        successors={card_id: tuple(links) for card_id, links in successors.items()},
+        predecessors={card_id: tuple(links) for card_id, links in predecessors.items()},
+        dangling=tuple(dangling),
+        reachable=frozenset(earliest_draw),
+        unreachable=tuple(card_id for card_id in cards if card_id not in earliest_draw),
+        cycles=_cycles(cards, successors),
+        earliest_draw=earliest_draw,
+        ids_by_title={title: tuple(ids) for title, ids in ids_by_title.items()}
+    )
+
+def _earliest_draw(scheduled: Dict[str, int], successors: Dict[str, List[CardLink]]) -> Dict[str, int]:
+    """Dijkstra from the scheduled cards; a choice is made no earlier than its card is drawn,
+    and a card queued into the past is drawn at once"""
+    earliest: Dict[str, int] = {}
+    heap = [(time, card_id) for card_id, time in scheduled.items()]
+    heapq.heapify(heap)
+    while heap:
+        time, card_id = heapq.heappop(heap)
+        if card_id in earliest:
+            continue
+        earliest[card_id] = time
+        for link in successors[card_id]:
+            if link.target not in earliest:
+                heapq.heappush(heap, (time + max(0, link.time_offset), link.target))
+    return earliest
+
+def _cycles(cards: Tuple[str, ...], successors: Dict[str, List[CardLink]]) -> Tuple[Tuple[str, ...], ...]:
+    """Strongly connected components that contain a cycle (iterative Tarjan, so deep
+    next_cards chains don't hit the recursion limit)"""
+    index: Dict[str, int] = {}
+    lowlink: Dict[str, int] = {}
+    on_stack = set()
+    stack: List[str] = []
+    cycles = []
+    counter = 0
+    for root in cards:
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            card_id, position = work.pop()
+            if position == 0:
+                index[card_id] = lowlink[card_id] = counter
+                counter += 1
+                stack.append(card_id)
+                on_stack.add(card_id)
+            links = successors[card_id]
+            if position < len(links):
+                work.append((card_id, position + 1))
+                target = links[position].target
+                if target not in index:
+                    work.append((target, 0))
+                elif target in on_stack:
+                    lowlink[card_id] = min(lowlink[card_id], index[target])
+                continue
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[card_id])
+            if lowlink[card_id] == index[card_id]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == card_id:
+                        break
+                self_loop = any(link.target == card_id for link in successors[card_id])
+                if len(component) > 1 or self_loop:
+                    cycles.append(tuple(reversed(component)))
+    return tuple(cycles)
+
+def main(argv=None) -> int:
+    """Report the card graph of each mode; exits non-zero if a mode links to unknown cards"""
+    import argparse
+    from .game_loader import GameLoader
+
+    parser = argparse.ArgumentParser(description="Check the next_cards graph of game modes")
+    parser.add_argument("modes", nargs="*", help="Modes to check (default: all)")
+    parser.add_argument("--config", default="config", help="Config directory")
+    args = parser.parse_args(argv)
+
+    config_path = Path(args.config)
+    failed = False
+    for mode in args.modes or sorted(GameLoader.get_available_modes(config_path)):
+        graph = GameLoader.load_mode(mode, config_path).card_graph
+        links = sum(len(out) for out in graph.successors.values())
+        print(f"{mode}: {len(graph.cards)} cards, {links} links, {len(graph.cycles)} cycles, "
+              f"{len(graph.unreachable)} unreachable, {len(graph.dangling)} dangling")
+        for problem in graph.problems():
+            print(f"  {problem}")
+        failed = failed or bool(graph.dangling)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+Switch for the engine's [DEBUG] console output.
+Headless runs turn it off so the log lines are neither formatted nor printed.
+"""
+
+enabled = True
+
+def set_debug(on: bool) -> None:
+    """Enable or disable [DEBUG] output from the backend"""
+    global enabled
+    enabled = on
@@ -0,0 +1,242 @@
+"""
+Typed engine event feed.
+GameState publishes what happens inside the engine (choices, draws, stacks, relic
+changes, passive ticks, time advances, completed actions) on its EventBus. Consumers
+subscribe with a bounded queue and read it from their own thread or asyncio task,
+so they never run inside the engine loop. Emitting costs nothing while nobody is
+subscribed.
+"""
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set
+
+CHOICE_APPLIED = "choice_applied"
+CARD_DRAWN = "card_drawn"
+CARD_STACKED = "card_stacked"
+RELIC_GAINED = "relic_gained"
+RELIC_LOST = "relic_lost"
+PASSIVE_TICK = "passive_tick"
+TIME_ADVANCED = "time_advanced"
+ACTION = "action"  # A public action finished; carries the callback message
+EVENT_KINDS = (CHOICE_APPLIED, CARD_DRAWN, CARD_STACKED, RELIC_GAINED, RELIC_LOST,
+               PASSIVE_TICK, TIME_ADVANCED, ACTION)
+
+BLOCK = "block"  # Engine waits for the consumer when the queue is full
+DROP_OLDEST = "drop_oldest"  # Oldest queued event is discarded and counted
+
+@dataclass
+class EngineEvent:
+    seq: int
+    kind: str
+    time: int  # Game time
+    data: Dict
+    state: Optional[Dict] = None  # GameState.to_dict() after an ACTION, for snapshot subscribers
+
+    def to_dict(self) -> Dict:
+        result = {"seq": self.seq, "kind": self.kind, "time": self.time, "data": self.data}
+        if self.state is not None:
+            result["state"] = self.state
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+class SubscriptionClosed(Exception):
+    pass
+
+class Subscription:
+    """Bounded event queue of one consumer"""
+    def __init__(self, bus: 'EventBus', maxsize: int = 1024, overflow: str = DROP_OLDEST,
+                 kinds: Optional[Iterable[str]] = None, snapshots: bool = False,
+                 block_timeout: Optional[float] = None, stall_budget: Optional[float] = None):
+        if overflow not in (BLOCK, DROP_OLDEST):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.bus = bus
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.kinds: Optional[Set[str]] = set(kinds) if kinds else None
+        self.snapshots = snapshots
+        self.block_timeout = block_timeout  # With BLOCK, drop after waiting this long (None waits forever)
+        # With BLOCK, total seconds the engine may wait on this consumer; once spent the
+        # subscription switches to DROP_OLDEST, so a stalled consumer can't hold the engine
+        # for block_timeout on every event
+        self.stall_budget = stall_budget
+        self.stalled = 0.0
+        self.dropped = 0
+        self.closed = False
+        self._queue: Deque[EngineEvent] = deque()
+        self._cond = threading.Condition()
+        self._async_waiters: List[tuple] = []  # (loop, asyncio.Event) of tasks waiting in __anext__
+
+    def wants(self, kind: str) -> bool:
+        return self.kinds is None or kind in self.kinds
+
+    def put(self, event: EngineEvent) -> None:
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._queue) >= self.maxsize:
+                if self.overflow == DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    limits = [limit for limit in (self.block_timeout,
+                                                  None if self.stall_budget is None else self.stall_budget - self.stalled)
+                              if limit is not None]
+                    started = time.monotonic()
+                    deadline = started + min(limits) if limits else None
+                    timed_out = False
+                    while len(self._queue) >= self.maxsize and not self.closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            timed_out = True
+                            break
+                        self._cond.wait(remaining)
+                    self.stalled += time.monotonic() - started
+                    if self.stall_budget is not None and self.stalled >= self.stall_budget:
+                        self.overflow = DROP_OLDEST
+                    if timed_out:
+                        self.dropped += 1
+                        return
+                    if self.closed:
+                        return
+            self._queue.append(event)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[EngineEvent]:
+        """Next event, None on timeout. Raises SubscriptionClosed once closed and drained."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self.closed, timeout):
+                return None
+            if not self._queue:
+                raise SubscriptionClosed()
+            event = self._queue.popleft()
+            self._cond.notify_all()
+            return event
+
+    def drain(self) -> List[EngineEvent]:
+        """Take every queued event without waiting"""
+        with self._cond:
+            events = list(self._queue)
+            self._queue.clear()
+            self._cond.notify_all()
+            return events
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.get()
+            except SubscriptionClosed:
+                return
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> EngineEvent:
+        while True:
+            with self._cond:
+                if self._queue:
+                    event = self._queue.popleft()
+                    self._cond.notify_all()
+                    return event
+                if self.closed:
+                    raise StopAsyncIteration
+                import asyncio  # Only async consumers pay for importing asyncio
+                waiter = asyncio.Event()
+                self._async_waiters.append((asyncio.get_running_loop(), waiter))
+            await waiter.wait()
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+class EventBus:
+    """Fans engine events out to subscriptions"""
+    def __init__(self):
+        self.subscriptions: List[Subscription] = []
+        self.active = False  # Checked by emitters before building an event
+        self.snapshots = False  # Some subscription wants state snapshots on ACTION
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def subscribe(self, maxsize: int = 1024, overflow: str = DROP_OLDEST,
+                  kinds: Optional[Iterable[str]] = None, snapshots: bool = False,
+                  block_timeout: Optional[float] = None, stall_budget: Optional[float] = None) -> Subscription:
+        subscription = Subscription(self, maxsize, overflow, kinds, snapshots, block_timeout, stall_budget)
+        with self._lock:
+            self.subscriptions = self.subscriptions + [subscription]
+            self._refresh()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+            self._refresh()
+
+    def _refresh(self) -> None:
+        self.active = bool(self.subscriptions)
+        self.snapshots = any(s.snapshots for s in self.subscriptions)
+
+    def emit(self, kind: str, time: int, data: Dict,
+             snapshot: Optional[Callable[[], Dict]] = None) -> None:
+        subscriptions = self.subscriptions
+        if not subscriptions:
+            return
+        event = EngineEvent(next(self._seq), kind, time, data)
+        plain = event
+        if snapshot is not None and self.snapshots:
+            event = EngineEvent(event.seq, kind, time, data, snapshot())
+        for subscription in subscriptions:
+            if subscription.wants(kind):
+                subscription.put(event if subscription.snapshots else plain)
+
+async def serve_ndjson(bus: EventBus, host: str = "127.0.0.1", port: int = 8765,
+                       maxsize: int = 1024) -> None:
+    """Stream every event of the bus as NDJSON to each client connecting to host:port"""
+    import asyncio
+
+    async def handle(reader: "asyncio.StreamReader", writer: "asyncio.StreamWriter") -> None:
+        subscription = bus.subscribe(maxsize=maxsize, overflow=DROP_OLDEST)
+        try:
+            async for event in subscription:
+                writer.write(event.to_json().encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            subscription.close()
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+def start_ndjson_server(bus: EventBus, host: str = "127.0.0.1", port: int = 8765) -> threading.Thread:
+    """Run serve_ndjson on a daemon thread (for synchronous hosts such as the GUI)"""
+    import asyncio
+    thread = threading.Thread(target=lambda: asyncio.run(serve_ndjson(bus, host, port)),
+                              name="event-feed", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,174 @@
+"""
+Closed-form forecast of passive relic income.
+Computes resources at a future time from relic counts, resource_per_time
+effects and effect_timers without stepping the engine. Cards are ignored: the
+forecast is what manual time advance would produce if no card were drawn or
+played.
+
+Effects without requirements are counted exactly in O(1) each.
+Requirement-gated effects are handled piecewise: time is split into segments at
+the points where a requirement can flip, each segment is counted in closed form
+with a fixed set of applying effects, and a gated effect that switches on pays
+its accumulated intervals at once (as the engine does). Flip points are found
+exactly (binary search) when the gating resource only moves in one direction
+within a segment, otherwise they are estimated from its average rate, which can
+also miss a temporary crossing. Requirements are evaluated on the resources at
+the end of the previous time unit, whereas the engine checks them midway
+through the unit after earlier relics have paid. The result is flagged inexact
+whenever a requirement flips, the flip point was estimated, or two effects
+share an engine timer.
+"""
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .game_state import GameState
+
+Condition = Tuple[str, int, bool]  # (resource, threshold, strict): resource > threshold if strict else >= threshold
+
+@dataclass
+class Forecast:
+    time: int
+    resources: Dict[str, int]
+    effect_timers: Dict[str, int]
+    exact: bool  # False when the piecewise approximation was needed (see module docstring)
+    segments: int  # Intervals of constant applying effects the horizon was split into
+
+@dataclass
+class _Effect:
+    key: str  # effect_timers key
+    resource: str
+    amount: int  # Per interval, already multiplied by the relic count
+    interval: int
+    conditions: List[Condition]
+
+def intervals_paid(timer: int, interval: int, start: int, end: int) -> Tuple[int, int]:
+    """Intervals an applying effect pays when time is stepped one unit at a time from
+    start to end, and its timer afterwards. An overdue effect (gated or jumped over)
+    pays its whole backlog on the first step, like _process_passive_effects."""
+    if end <= start:
+        return 0, timer
+    if start - timer >= interval:
+        first = start + 1
+        more = (end - first) // interval
+        return (first - timer) // interval + more, first + more * interval
+    paid = max(0, (end - timer) // interval)
+    return paid, timer + paid * interval
+
+def _collect_effects(state: 'GameState') -> Tuple[List[_Effect], bool]:
+    """Effects that can ever apply, with their requirements as resource thresholds"""
+    relic_names = {relic.name for relic in state.relics}
+    effects = []
+    keys = set()
+    shared_timer = False
+    for relic in state.relics:
+        for effect in relic.passive_effects:
+            if effect["type"] != "resource_per_time":
+                continue
+            conditions = []
+            blocked = False
+            for req in effect.get("requirements", []):
+                if isinstance(req, dict):
+                    if "resource" in req:
+                        amount = req["amount"] * (relic.count if req.get("stackable", False) else 1)
+                        conditions.append((req["resource"], amount, False))
+                    elif "relic" in req and req["relic"] not in relic_names:
+                        blocked = True  # Relics don't change without cards
+                else:
+                    conditions.append((req, 0, True))
+            if blocked:
+                continue
+            key = f"{relic.name}_{effect['resource']}"
+            shared_timer = shared_timer or key in keys
+            keys.add(key)
+            effects.append(_Effect(key, effect["resource"], effect["amount"] * relic.count,
+                                   effect["interval"], conditions))
+    return effects, shared_timer
+
+def _holds(condition: Condition, resources: Dict[str, int]) -> bool:
+    resource, threshold, strict = condition
+    value = resources[resource]
+    return value > threshold if strict else value >= threshold
+
+def forecast(state: 'GameState', target_time: int, max_segments: int = 256) -> Forecast:
+    """Resources and timers at target_time under unit stepping with no cards (see module docstring)"""
+    now = state.current_time
+    resources = dict(state.resources)
+    timers = dict(state.effect_timers)
+    if target_time <= now:
+        return Forecast(now, resources, timers, exact=True, segments=0)
+
+    effects, shared_timer = _collect_effects(state)
+    exact = not shared_timer
+    gated_conditions = [condition for effect in effects for condition in effect.conditions]
+    start = now
+    segments = 0
+    while start < target_time:
+        segments += 1
+        applying = [effect for effect in effects if all(_holds(c, resources) for c in effect.conditions)]
+        by_resource: Dict[str, List[_Effect]] = {}
+        for effect in applying:
+            by_resource.setdefault(effect.resource, []).append(effect)
+
+        def value_at(resource: str, time: int) -> int:
+            return resources[resource] + sum(
+                effect.amount * intervals_paid(timers.get(effect.key, 0), effect.interval, start, time)[0]
+                for effect in by_resource.get(resource, [])
+            )
+
+        # The segment ends where the first requirement can flip (new status applies from the next unit)
+        end = target_time
+        if segments < max_segments:
+            for condition in gated_conditions:
+                flip, estimated = _first_flip(condition, resources, by_resource.get(condition[0], []),
+                                              value_at, start, end)
+                if estimated or flip is not None:
+                    exact = False
+                if flip is not None and flip < end:
+                    end = flip
+        else:
+            exact = False  # Remaining horizon counted with the current set of applying effects
+
+        for effect in applying:
+            paid, timers[effect.key] = intervals_paid(timers.get(effect.key, 0), effect.interval, start, end)
+            resources[effect.resource] += effect.amount * paid
+        start = end
+    return Forecast(target_time, resources, timers, exact=exact, segments=segments)
+
+def _first_flip(condition: Condition, resources: Dict[str, int], contributors: List[_Effect],
+                value_at, start: int, end: int) -> Tuple[Optional[int], bool]:
+    """First time in (start, end] at which the condition differs from now (None if it doesn't
+    flip), and whether the answer was estimated rather than found exactly"""
+    if not contributors:
+        return None, False
+    resource, threshold, strict = condition
+    initial = _holds(condition, resources)
+
+    def holds_at(time: int) -> bool:
+        value = value_at(resource, time)
+        return value > threshold if strict else value >= threshold
+
+    signs = {effect.amount > 0 for effect in contributors if effect.amount != 0}
+    if len(signs) <= 1:
+        # Monotone trajectory: the condition flips at most once, so search for it
+        if holds_at(end) == initial:
+            return None, False
+        lo, hi = start, end  # holds_at(lo) == initial, holds_at(hi) != initial
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if holds_at(mid) == initial:
+                lo = mid
+            else:
+                hi = mid
+        return hi, False
+
+    # Mixed directions: estimate the crossing from the net average rate
+    rate = sum(effect.amount / effect.interval for effect in contributors)
+    value = resources[resource]
+    boundary = threshold + (1 if strict else 0)  # Smallest value for which the condition holds
+    if rate == 0 or (initial and rate > 0) or (not initial and rate < 0):
+        return None, True
+    distance = (value - boundary + 1) if initial else (boundary - value)
+    steps = max(1, int(-(-distance // abs(rate))))
+    flip = start + steps
+    return (flip if flip <= end else None), True
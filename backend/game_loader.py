@@ -1,20 +1,262 @@
-import yaml
+import json
+import hashlib
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from . import debug
+from .card_graph import CardGraph, compile_card_graph
+
+if TYPE_CHECKING:
+    from multiprocessing import shared_memory
+
+CONFIG_FILES = ("resources.yaml", "relics.yaml", "cards.yaml")
+# Parsed modes are kept as plain JSON in a per-user cache directory, named by a hash of
+# the YAML bytes and this format number, so later processes skip the YAML parse (and
+# importing yaml). Only data is stored; LoadedMode and its card graph are rebuilt from it.
+COMPILED_FORMAT = 2
+COMPILED_CACHE_ENV = "TIME_CARDS_CACHE_DIR"  # Overrides the cache directory; empty disables it
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only; loaded configs are shared between games")
+
+class FrozenDict(dict):
+    """dict that rejects mutation. Still a dict, so lookups and json.dumps are unchanged."""
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+class FrozenList(list):
+    """list that rejects mutation"""
+    __setitem__ = __delitem__ = append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    __iadd__ = __imul__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+def freeze(value: Any) -> Any:
+    """Recursively convert parsed YAML into FrozenDict/FrozenList"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+def thaw(value: Any) -> Any:
+    """Mutable deep copy of a frozen config"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+# First segment of a config path -> LoadedMode field holding that YAML file
+CONFIG_SECTIONS = {"resources": "resource_config", "relics": "relic_config", "cards": "card_config"}
+
+@dataclass(frozen=True)
+class LoadedMode:
+    """Immutable loaded configuration of a mode, shared by every game of that mode"""
+    mode: str
+    resource_config: FrozenDict
+    relic_config: FrozenDict
+    card_config: FrozenDict
+    fingerprint: str
+    card_graph: CardGraph  # next_cards links compiled at load time
+
+    def as_config(self) -> Dict:
+        """The mapping load_config returns"""
+        return {
+            'resource_config': self.resource_config,
+            'relic_config': self.relic_config,
+            'card_config': self.card_config
+        }
+
+    def get_value(self, path: str) -> Any:
+        """Config value at a dotted path such as "relics.scv.passive_effects.0.amount".
+        The first segment names the YAML file and its top-level key (resources, relics
+        or cards); list items are addressed by position."""
+        section, keys = _split_config_path(path)
+        value = getattr(self, CONFIG_SECTIONS[section])[section]
+        for key in keys:
+            value = _config_child(value, key, path)
+        return value
+
+    def patched(self, overrides: Dict[str, Any]) -> 'LoadedMode':
+        """Copy of this mode with the values at the given config paths replaced,
+        e.g. {"resources.minerals.initial_amount": 100}. Nothing is written to disk."""
+        if not overrides:
+            return self
+        config = {field: thaw(getattr(self, field)) for field in CONFIG_SECTIONS.values()}
+        for path, new_value in overrides.items():
+            section, keys = _split_config_path(path)
+            if not keys:
+                raise ValueError(f"Config path '{path}' names a whole file")
+            parent = config[CONFIG_SECTIONS[section]][section]
+            for key in keys[:-1]:
+                parent = _config_child(parent, key, path)
+            last = keys[-1]
+            if isinstance(parent, list):
+                parent[_config_child_index(parent, last, path)] = new_value
+            elif isinstance(parent, dict):
+                _config_child(parent, last, path)  # Only existing values can be patched
+                parent[last] = new_value
+            else:
+                raise ValueError(f"Config path '{path}' goes through a non-container value")
+        cards_changed = any(_split_config_path(path)[0] == "cards" for path in overrides)
+        return LoadedMode(
+            mode=self.mode,
+            resource_config=freeze(config['resource_config']),
+            relic_config=freeze(config['relic_config']),
+            card_config=freeze(config['card_config']),
+            fingerprint=GameLoader.config_fingerprint(config),
+            card_graph=GameLoader.compile_card_graph(config['card_config']) if cards_changed else self.card_graph
+        )
+
+def _split_config_path(path: str) -> Tuple[str, List[str]]:
+    section, *keys = path.split(".")
+    if section not in CONFIG_SECTIONS:
+        raise ValueError(f"Config path '{path}' must start with one of {', '.join(CONFIG_SECTIONS)}")
+    return section, keys
+
+def _config_child_index(value: List, key: str, path: str) -> int:
+    try:
+        index = int(key)
+        value[index]
+    except (ValueError, IndexError):
+        raise ValueError(f"Config path '{path}': no list item '{key}'") from None
+    return index
+
+def _config_child(value: Any, key: str, path: str) -> Any:
+    if isinstance(value, list):
+        return value[_config_child_index(value, key, path)]
+    if isinstance(value, dict) and key in value:
+        return value[key]
+    raise ValueError(f"Config path '{path}': no key '{key}'")
+
+# (resolved config path, mode) -> (config file mtimes, LoadedMode). Forked workers inherit it.
+_MODE_CACHE: Dict[Tuple[str, str], Tuple[Tuple[int, ...], LoadedMode]] = {}
+_MODE_CACHE_LOCK = threading.Lock()
+
+def _mode_key(mode: str, config_path: Path) -> Tuple[str, str]:
+    return (str(Path(config_path).resolve()), mode)
+
+def _mode_mtimes(mode: str, config_path: Path) -> Tuple[int, ...]:
+    mode_path = Path(config_path) / mode
+    try:
+        return tuple((mode_path / name).stat().st_mtime_ns for name in CONFIG_FILES)
+    except OSError:
+        return ()
+
+def compiled_cache_dir() -> Optional[Path]:
+    """Where parsed modes are cached: $TIME_CARDS_CACHE_DIR, else the user cache directory"""
+    override = os.environ.get(COMPILED_CACHE_ENV)
+    if override is not None:
+        return Path(override) if override else None
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "time-cards" / "modes"
+
+def _read_config_files(mode: str, config_path: Path) -> Dict[str, bytes]:
+    mode_path = Path(config_path) / mode
+    try:
+        files = {}
+        for name in CONFIG_FILES:
+            with open(mode_path / name, 'rb') as f:
+                files[name] = f.read()
+        return files
+    except OSError as e:
+        raise RuntimeError(f"Error loading game configuration for mode '{mode}': {str(e)}")
+
+def _content_key(files: Dict[str, bytes]) -> str:
+    """Hash of the YAML bytes (not their mtimes, which copies and extracts keep)"""
+    digest = hashlib.sha256(f"format {COMPILED_FORMAT}".encode())
+    for name in CONFIG_FILES:
+        digest.update(f"\0{name}\0{len(files[name])}\0".encode())
+        digest.update(files[name])
+    return digest.hexdigest()
+
+def _cache_slot(mode_key: Tuple[str, str]) -> str:
+    """File name prefix of one mode directory's cache entries"""
+    return hashlib.sha256("\0".join(mode_key).encode()).hexdigest()[:16]
+
+def _read_compiled(slot: str, key: str) -> Optional[Dict]:
+    """The parsed config cached under key, None if there is none (or it is unreadable)"""
+    cache_dir = compiled_cache_dir()
+    if cache_dir is None:
+        return None
+    try:
+        with open(cache_dir / f"{slot}-{key}.json", 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        # A truncated file is rebuilt from the YAML
+        if debug.enabled:
+            print(f"[DEBUG][GameLoader] Ignoring compiled cache {key}: {e}")
+        return None
+    if not isinstance(data, dict) or data.get("format") != COMPILED_FORMAT or data.get("key") != key:
+        return None
+    return data["config"]
+
+def _write_compiled(slot: str, key: str, config: Dict) -> None:
+    """Cache a parsed config as JSON, replacing the entries of earlier content of the
+    same mode directory. Configs JSON can't hold exactly (YAML dates, non-string keys)
+    are not cached; an unwritable cache directory just goes without."""
+    cache_dir = compiled_cache_dir()
+    if cache_dir is None:
+        return
+    try:
+        text = json.dumps({"format": COMPILED_FORMAT, "key": key, "config": config}, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return
+    if json.loads(text)["config"] != config:
+        return
+    path = cache_dir / f"{slot}-{key}.json"
+    temp_path = cache_dir / f"{slot}-{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)  # Concurrent writers of the same key write the same content
+        for old_path in cache_dir.glob(f"{slot}-*.json"):
+            if old_path != path:
+                old_path.unlink(missing_ok=True)  # Earlier edits of this mode
+    except OSError as e:
+        if debug.enabled:
+            print(f"[DEBUG][GameLoader] Could not write compiled cache {key}: {e}")
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
 
 class GameLoader:
     """Handles loading game configurations and initializing game states"""
     
     @staticmethod
-    def get_available_modes() -> List[str]:
+    def get_available_modes(config_path: Path = Path("config")) -> List[str]:
         """Get list of available game modes from config directory"""
-        config_path = Path("config")
         return [d.name for d in config_path.iterdir() if d.is_dir()]
     
     @staticmethod
-    def get_mode_description(mode: str) -> Optional[str]:
+    def get_mode_description(mode: str, config_path: Path = Path("config")) -> Optional[str]:
         """Get description for a game mode"""
-        desc_file = Path("config") / mode / "description.txt"
+        desc_file = Path(config_path) / mode / "description.txt"
         if desc_file.exists():
             try:
                 with open(desc_file, 'r', encoding='utf-8') as f:
@@ -24,33 +266,153 @@ class GameLoader:
         return None
     
     @staticmethod
-    def load_config(mode: str) -> Dict:
+    def load_config(mode: str, config_path: Path = Path("config")) -> Dict:
         """Load all configuration files for a mode"""
-        mode_path = Path("config") / mode
-        
+        return GameLoader._parse_config(mode, _read_config_files(mode, config_path))
+
+    @staticmethod
+    def _parse_config(mode: str, files: Dict[str, bytes]) -> Dict:
+        import yaml  # Only needed when a mode is parsed, not when its compiled cache is current
         try:
-            # Load resources
-            with open(mode_path / "resources.yaml", 'r', encoding='utf-8') as f:
-                resource_config = yaml.safe_load(f)
-            
-            # Load relics
-            with open(mode_path / "relics.yaml", 'r', encoding='utf-8') as f:
-                relic_config = yaml.safe_load(f)
-            
-            # Load cards
-            with open(mode_path / "cards.yaml", 'r', encoding='utf-8') as f:
-                card_config = yaml.safe_load(f)
-            
             return {
-                'resource_config': resource_config,
-                'relic_config': relic_config,
-                'card_config': card_config
+                'resource_config': yaml.safe_load(files["resources.yaml"]),
+                'relic_config': yaml.safe_load(files["relics.yaml"]),
+                'card_config': yaml.safe_load(files["cards.yaml"])
             }
         except Exception as e:
             raise RuntimeError(f"Error loading game configuration for mode '{mode}': {str(e)}")
     
     @staticmethod
-    def create_game_state(mode: str) -> Dict:
+    def config_fingerprint(config: Dict) -> str:
+        """Stable hash of a loaded configuration, used to key cached results"""
+        config_str = json.dumps(config, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(config_str.encode()).hexdigest()[:16]
+    
+    @staticmethod
+    def compile_card_graph(card_config: Dict) -> CardGraph:
+        """Resolve next_cards links; see backend/card_graph.py"""
+        graph = compile_card_graph(card_config)
+        if debug.enabled:
+            for problem in graph.problems():
+                print(f"[DEBUG][GameLoader] {problem}")
+        return graph
+
+    @staticmethod
+    def load_mode(mode: str, config_path: Path = Path("config")) -> LoadedMode:
+        """Load a mode once per process; later calls return the same immutable object
+        until one of its YAML files changes on disk. The YAML is parsed only when the
+        compiled cache (see compiled_cache_dir) has no entry for its exact content."""
+        key = _mode_key(mode, config_path)
+        mtimes = _mode_mtimes(mode, config_path)
+        with _MODE_CACHE_LOCK:
+            cached = _MODE_CACHE.get(key)
+        if cached is not None and cached[0] == mtimes:
+            return cached[1]
+        files = _read_config_files(mode, config_path)
+        content_key = _content_key(files)
+        slot = _cache_slot(key)
+        config = _read_compiled(slot, content_key)
+        if config is None:
+            config = GameLoader._parse_config(mode, files)
+            _write_compiled(slot, content_key, config)
+        loaded = LoadedMode(
+            mode=mode,
+            resource_config=freeze(config['resource_config']),
+            relic_config=freeze(config['relic_config']),
+            card_config=freeze(config['card_config']),
+            fingerprint=GameLoader.config_fingerprint(config),
+            card_graph=GameLoader.compile_card_graph(config['card_config'])
+        )
+        with _MODE_CACHE_LOCK:
+            _MODE_CACHE[key] = (mtimes, loaded)
+        return loaded
+
+    @staticmethod
+    def publish_mode(mode: str, config_path: Path = Path("config")) -> Tuple['shared_memory.SharedMemory', Dict]:
+        """Put a loaded mode into a shared memory block for worker processes.
+
+        Returns the block (the caller closes and unlinks it when the workers are done)
+        and a small picklable handle for attach_mode.
+        """
+        from multiprocessing import shared_memory
+        loaded = GameLoader.load_mode(mode, config_path)
+        data = pickle.dumps(loaded, protocol=pickle.HIGHEST_PROTOCOL)
+        block = shared_memory.SharedMemory(create=True, size=len(data))
+        block.buf[:len(data)] = data
+        handle = {
+            "key": _mode_key(mode, config_path),
+            "mtimes": _mode_mtimes(mode, config_path),
+            "fingerprint": loaded.fingerprint,
+            "name": block.name,
+            "size": len(data)
+        }
+        return block, handle
+
+    @staticmethod
+    def attach_mode(handle: Dict) -> LoadedMode:
+        """Install a published mode in this process's cache without parsing YAML.
+        Forked workers that inherited the cache skip the shared memory read."""
+        key = tuple(handle["key"])
+        with _MODE_CACHE_LOCK:
+            cached = _MODE_CACHE.get(key)
+        if cached is not None and cached[1].fingerprint == handle["fingerprint"]:
+            return cached[1]
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(name=handle["name"])
+        try:
+            loaded = pickle.loads(bytes(block.buf[:handle["size"]]))
+        finally:
+            block.close()
+        with _MODE_CACHE_LOCK:
+            _MODE_CACHE[key] = (tuple(handle["mtimes"]), loaded)
+        return loaded
+
+    @staticmethod
+    def create_game_state(mode: str, config_path: Path = Path("config")) -> Dict:
         """Create configuration data for a new game state"""
-        config_path = Path("config")
-        return GameLoader.load_config(mode) 
\ No newline at end of file
+        return GameLoader.load_config(mode, config_path)
+
+def mode_error(mode: str, config_path: Path = Path("config")) -> Optional[str]:
+    """Load a mode; None if it loads, otherwise why it doesn't, so runs over many modes
+    can go on without a broken one"""
+    try:
+        GameLoader.load_mode(mode, Path(config_path))
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+class PublishedModes(list):
+    """Handles of the published modes. `failures` maps the (mode, config_path) pairs that
+    couldn't be loaded to their error; workers that need one of them fail to build its
+    games the way a single process would."""
+    def __init__(self):
+        super().__init__()
+        self.failures: Dict[Tuple[str, str], str] = {}
+
+@contextmanager
+def published_modes(modes: Iterable[Tuple[str, Path]]) -> Iterator[PublishedModes]:
+    """Publish (mode, config_path) pairs for a worker pool; yields the handles to pass
+    to attach_modes in the pool initializer and frees the blocks afterwards. A mode that
+    fails to load is left out and recorded in the handles' failures."""
+    blocks = []
+    handles = PublishedModes()
+    try:
+        for mode, config_path in dict.fromkeys((mode, str(path)) for mode, path in modes):
+            try:
+                block, handle = GameLoader.publish_mode(mode, Path(config_path))
+            except Exception as e:
+                handles.failures[(mode, config_path)] = f"{type(e).__name__}: {e}"
+                if debug.enabled:
+                    print(f"[DEBUG] Couldn't publish mode {mode} from {config_path}: {e}")
+                continue
+            blocks.append(block)
+            handles.append(handle)
+        yield handles
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def attach_modes(handles: List[Dict]) -> None:
+    for handle in handles:
+        GameLoader.attach_mode(handle)
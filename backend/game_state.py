@@ -1,9 +1,31 @@
-import yaml
+import functools
+from collections import deque
 from typing import Dict, List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
-from .game_loader import GameLoader
+from .game_loader import GameLoader, LoadedMode
+from . import debug
+from . import events
+from .events import EventBus
+from .forecast import Forecast, forecast as forecast_passive_income
+from .profiling import NULL_PROFILER, Profiler, profiled
+from .timeseries import ResourceRecorder
 import time
+import json
+import hashlib
+
+def continuation_hash(state: Dict) -> str:
+    """Hash of the parts of a to_dict() state that determine how the game continues
+    (event history excluded); GameState.state_hash and history node ids use it"""
+    state_str = json.dumps({
+        'current_time': state.get('current_time'),
+        'resources': state.get('resources'),
+        'relics': state.get('relics'),
+        'active_cards': state.get('active_cards'),
+        'card_queue': state.get('card_queue'),
+        'effect_timers': state.get('effect_timers') or {}  # Saves from before timers were stored
+    }, sort_keys=True)
+    return hashlib.sha256(state_str.encode()).hexdigest()[:16]
 
 @dataclass
 class Card:
@@ -75,6 +97,18 @@ class Relic:
         """Create Relic object from dictionary"""
         return cls(**data)
 
+@dataclass
+class AdvanceSummary:
+    """What happened while advance_until_decision fast-forwarded"""
+    start_time: int
+    end_time: int
+    steps: int  # Time units advanced
+    # 'immediate_card', 'new_card', 'stop_time', 'game_over', 'no_cards', 'no_drawable_cards', 'max_steps'
+    stop_reason: str
+    resource_changes: Dict[str, int]
+    cards_drawn: List[str]  # Titles of cards that became active, in draw order
+    passive_ticks: int  # Relic effect events along the way
+
 @dataclass
 class PolicyRule:
     card_title: str
@@ -122,13 +156,15 @@ class Policy:
             self.is_relative = True
             self.target_time = int(time_str[1:])
             self.base_time = current_time  # 기준 시간 저장
-            print(f"[DEBUG][Policy] Set relative target_time: base_time={self.base_time}, target_time={self.target_time}")
+            if debug.enabled:
+                print(f"[DEBUG][Policy] Set relative target_time: base_time={self.base_time}, target_time={self.target_time}")
         else:
             self.is_unlimited = False
             self.is_relative = False
             self.target_time = int(time_str)
             self.base_time = None
-            print(f"[DEBUG][Policy] Set absolute target_time: {self.target_time}")
+            if debug.enabled:
+                print(f"[DEBUG][Policy] Set absolute target_time: {self.target_time}")
 
     def get_target_time(self, current_time: int) -> Optional[int]:
         """Get the actual target time based on current time"""
@@ -138,6 +174,23 @@ class Policy:
             return (self.base_time or 0) + self.target_time
         return self.target_time
 
+    def to_dict(self) -> Dict:
+        """Convert the policy rules to a serializable dictionary"""
+        return {
+            "rules": [
+                {"card_title": rule.card_title, "choice_description": rule.choice_description}
+                for rule in self.rules
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Policy':
+        """Create a Policy from a dictionary produced by to_dict"""
+        policy = cls()
+        for rule in data.get("rules", []):
+            policy.add_rule(rule["card_title"], rule["choice_description"])
+        return policy
+
     def find_matching_choice(self, card: Card) -> Optional[int]:
         """Find the index of the first matching choice for a card based on policy rules"""
         for rule in self.rules:
@@ -147,13 +200,54 @@ class Policy:
                         return i
         return None
 
+DEFAULT_UNDO_LIMIT = 1000  # Actions kept for undo()
+# Inverse ops one undo step may hold. DEFAULT_UNDO_LIMIT bounds the number of steps, this
+# bounds their size: an action recording more (a long fast-forward) can't be undone, and
+# since the steps before it can't be reached either, the undo history is cleared.
+MAX_UNDO_OPS = 200000
+_MISSING = object()  # Journal value of an absent dict key or attribute
+
+class _DiscardedJournal(list):
+    """Journal of an action past MAX_UNDO_OPS: records nothing more"""
+    def append(self, op) -> None:
+        pass
+
+_DISCARDED = _DiscardedJournal()
+
+def journaled(method):
+    """Record the inverse of every mutation made by the outermost journaled call as one undo step"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        journal = self._journal
+        if journal is not None:
+            # Nested call: the size check runs here, between the engine's smaller steps
+            if len(journal) > MAX_UNDO_OPS:
+                self._journal = _DISCARDED
+            return method(self, *args, **kwargs)
+        if self._undo_stack.maxlen == 0:
+            return method(self, *args, **kwargs)
+        self._journal = []
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            ops, self._journal = self._journal, None
+            if ops is _DISCARDED or len(ops) > MAX_UNDO_OPS:
+                self._undo_stack.clear()
+                self._redo_stack.clear()
+            elif ops:
+                self._undo_stack.append(ops)
+                self._redo_stack.clear()
+    return wrapper
+
 class GameState:
-    def __init__(self, config_path: Path, mode: str = "life", skip_card_init: bool = False):
-        # Load configurations using GameLoader
-        config = GameLoader.load_config(mode)
-        self.resource_config = config['resource_config']
-        self.relic_config = config['relic_config']
-        self.card_config = config['card_config']
+    def __init__(self, config_path: Path, mode: str = "life", skip_card_init: bool = False,
+                 loaded_mode: Optional[LoadedMode] = None):
+        # Configurations are loaded once per process and shared read-only between games
+        self.loaded_mode = loaded_mode or GameLoader.load_mode(mode, config_path)
+        self.resource_config = self.loaded_mode.resource_config
+        self.relic_config = self.loaded_mode.relic_config
+        self.card_config = self.loaded_mode.card_config
+        self.card_graph = self.loaded_mode.card_graph
             
         # Initialize game state
         self.current_time = 0
@@ -165,11 +259,16 @@ class GameState:
         else:
             self.active_cards = []
             self.card_queue = []
-        print(f"[DEBUG][GameState] Initialized active_cards: {[ (c.title, c.drawed_at, [ch['description'] for ch in c.choices]) for c in self.active_cards ]}")
+        if debug.enabled:
+            print(f"[DEBUG][GameState] Initialized active_cards: {[ (c.title, c.drawed_at, [ch['description'] for ch in c.choices]) for c in self.active_cards ]}")
         self.effect_timers = {}  # Track when effects were last applied
         self.event_history: List[GameEvent] = []  # Track game events
         self.policy = Policy()  # Initialize policy
         self._on_action_callbacks = []  # For observer pattern
+        self.events = EventBus()  # Typed event feed, see backend/events.py
+        self.profiler = NULL_PROFILER  # Replaced by enable_profiling()
+        self.recorder: Optional[ResourceRecorder] = None  # Set by enable_recording()
+        self.set_undo_limit(DEFAULT_UNDO_LIMIT)
         
     def _init_resources(self) -> Dict[str, int]:
         """Initialize resources with their starting amounts"""
@@ -192,7 +291,8 @@ class GameState:
                     card_type=card_data.get("card_type", "delayed"),
                     requirements=card_data.get("requirements")  # Pass requirements from card config
                 ))
-        print(f"[DEBUG][GameState] _init_starting_cards: {[ (c.title, c.drawed_at, [ch['description'] for ch in c.choices]) for c in starting_cards ]}")
+        if debug.enabled:
+            print(f"[DEBUG][GameState] _init_starting_cards: {[ (c.title, c.drawed_at, [ch['description'] for ch in c.choices]) for c in starting_cards ]}")
         return sorted(starting_cards, key=lambda x: x.priority)
     
     def _init_future_cards(self) -> List[Card]:
@@ -258,45 +358,71 @@ class GameState:
 
     def _check_and_draw_current_cards(self) -> None:
         """Check and draw any cards that are due at or before current time"""
-        print(f"\n[DEBUG] === Checking for cards to draw at time {self.current_time} ===")
-        print(f"[DEBUG] Current card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
+        if debug.enabled:
+            print(f"\n[DEBUG] === Checking for cards to draw at time {self.current_time} ===")
+            print(f"[DEBUG] Current card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
         
         # Find cards that are due at or before current time
         due_cards = [card for card in self.card_queue if card.drawed_at <= self.current_time]
         if due_cards:
-            print(f"[DEBUG] Found {len(due_cards)} cards due at or before time {self.current_time}")
+            if debug.enabled:
+                print(f"[DEBUG] Found {len(due_cards)} cards due at or before time {self.current_time}")
             self._draw_cards()
         else:
-            print(f"[DEBUG] No cards due at or before time {self.current_time}")
+            if debug.enabled:
+                print(f"[DEBUG] No cards due at or before time {self.current_time}")
 
     def register_on_action_callback(self, callback):
-        print("[DEBUG][CALLBACK] register_on_action_callback called")
+        if debug.enabled:
+            print("[DEBUG][CALLBACK] register_on_action_callback called")
         self._on_action_callbacks.append(callback)
-        print(f"[DEBUG][CALLBACK] callbacks after registration: {self._on_action_callbacks}")
-        print(f"[DEBUG][CALLBACK] game_state id: {id(self)}")
+        if debug.enabled:
+            print(f"[DEBUG][CALLBACK] callbacks after registration: {self._on_action_callbacks}")
+            print(f"[DEBUG][CALLBACK] game_state id: {id(self)}")
     
+    @profiled("callbacks")
     def _trigger_on_action(self, message=""):
-        print(f"[DEBUG][CALLBACK] _trigger_on_action called with message: {message}")
+        if debug.enabled:
+            print(f"[DEBUG][CALLBACK] _trigger_on_action called with message: {message}")
+        if self.events.active:
+            self.events.emit(events.ACTION, self.current_time, {"message": message}, snapshot=self._event_snapshot)
         for cb in self._on_action_callbacks:
-            print("[DEBUG][CALLBACK] Calling callback...")
+            if debug.enabled:
+                print("[DEBUG][CALLBACK] Calling callback...")
             cb(self, message=message)
 
+    def _event_snapshot(self) -> Dict:
+        """to_dict() that shares no mutable containers with this state, for other threads"""
+        state = self.to_dict()
+        state["resources"] = dict(self.resources)
+        return state
+
+    @profiled("choice")
+    @journaled
     def make_choice(self, card_index: int, choice_index: int) -> bool:
         """Apply the effects of a choice"""
-        print(f"\n[DEBUG] === Making choice for card {card_index}, choice {choice_index} ===")
-        print(f"[DEBUG] Current resources before choice: {self.resources}")
+        if debug.enabled:
+            print(f"\n[DEBUG] === Making choice for card {card_index}, choice {choice_index} ===")
+            print(f"[DEBUG] Current resources before choice: {self.resources}")
         
         if not self.can_make_choice(card_index, choice_index):
-            print("[DEBUG] Cannot make choice: requirements not met")
+            if debug.enabled:
+                print("[DEBUG] Cannot make choice: requirements not met")
             return False
             
         card = self.active_cards[card_index]
         choice = card.choices[choice_index]
         effects = choice.get("effects", {})
         
-        print(f"[DEBUG] Card: {card.title}")
-        print(f"[DEBUG] Choice: {choice['description']}")
-        print(f"[DEBUG] Effects: {effects}")
+        if debug.enabled:
+            print(f"[DEBUG] Card: {card.title}")
+            print(f"[DEBUG] Choice: {choice['description']}")
+            print(f"[DEBUG] Effects: {effects}")
+        
+        # Fail before changing anything if the choice links to a card that doesn't exist
+        for next_card in effects.get("next_cards", []):
+            if next_card["card"] not in self.card_config["cards"]:
+                raise KeyError(f"Choice '{choice['description']}' of card '{card.title}' links to unknown card '{next_card['card']}'")
         
         # Create event for this choice
         event = GameEvent(
@@ -307,21 +433,33 @@ class GameState:
             resource_changes=effects.get("resources", {}),
             requirements_met=True
         )
-        self.event_history.append(event)
+        self._list_insert("event_history", len(self.event_history), event)
+        if self.events.active:
+            self.events.emit(events.CHOICE_APPLIED, self.current_time, {
+                "card": card.title,
+                "choice": choice["description"],
+                "resource_changes": dict(effects.get("resources", {}))
+            })
         
         # Apply resource changes
         if "resources" in effects:
-            print("[DEBUG] Applying resource changes:")
+            if debug.enabled:
+                print("[DEBUG] Applying resource changes:")
             for resource, change in effects["resources"].items():
                 old_value = self.resources[resource]
-                self.resources[resource] += change
-                print(f"[DEBUG] {resource}: {old_value} -> {self.resources[resource]} (change: {change})")
+                self._add_resource(resource, change)
+                if debug.enabled:
+                    print(f"[DEBUG] {resource}: {old_value} -> {self.resources[resource]} (change: {change})")
         
-        print(f"[DEBUG] Resources after choice: {self.resources}")
+        if debug.enabled:
+            print(f"[DEBUG] Resources after choice: {self.resources}")
+        if self.recorder is not None:
+            self.recorder.record(self.current_time, self.resources)
                 
         # Add/remove relics
         if "relics" in effects:
-            print("[DEBUG] Processing relic changes:")
+            if debug.enabled:
+                print("[DEBUG] Processing relic changes:")
             if "gain" in effects["relics"]:
                 for relic_id in effects["relics"]["gain"]:
                     if relic_id in self.relic_config["relics"]:
@@ -330,28 +468,43 @@ class GameState:
                         existing_relic = next((r for r in self.relics if r.name == relic_data["name"]), None)
                         if existing_relic:
                             old_count = existing_relic.count
-                            existing_relic.count += 1
-                            print(f"[DEBUG] Increased {relic_data['name']} count: {old_count} -> {existing_relic.count}")
+                            self._add_to_field(existing_relic, "count", 1)
+                            if debug.enabled:
+                                print(f"[DEBUG] Increased {relic_data['name']} count: {old_count} -> {existing_relic.count}")
+                            if self.events.active:
+                                self.events.emit(events.RELIC_GAINED, self.current_time,
+                                                 {"relic": relic_data["name"], "count": existing_relic.count})
                         else:
-                            self.relics.append(Relic(
+                            self._list_insert("relics", len(self.relics), Relic(
                                 name=relic_data["name"],
                                 description=relic_data["description"],
                                 passive_effects=relic_data["passive_effects"]
                             ))
-                            print(f"[DEBUG] Added new relic: {relic_data['name']}")
+                            if debug.enabled:
+                                print(f"[DEBUG] Added new relic: {relic_data['name']}")
+                            if self.events.active:
+                                self.events.emit(events.RELIC_GAINED, self.current_time,
+                                                 {"relic": relic_data["name"], "count": 1})
             if "lose" in effects["relics"]:
                 for relic_id in effects["relics"]["lose"]:
-                    self.relics = [r for r in self.relics if r.name != relic_id]
-                    print(f"[DEBUG] Removed relic: {relic_id}")
+                    if self.events.active and any(r.name == relic_id for r in self.relics):
+                        self.events.emit(events.RELIC_LOST, self.current_time, {"relic": relic_id})
+                    for index in reversed(range(len(self.relics))):
+                        if self.relics[index].name == relic_id:
+                            self._list_remove("relics", index)
+                    if debug.enabled:
+                        print(f"[DEBUG] Removed relic: {relic_id}")
                     
         # Queue next cards
         if "next_cards" in effects:
-            print("[DEBUG] Queueing next cards:")
+            if debug.enabled:
+                print("[DEBUG] Queueing next cards:")
             for next_card in effects["next_cards"]:
                 card_data = self.card_config["cards"][next_card["card"]]
                 draw_time = self.current_time + next_card["time_offset"]
-                print(f"[DEBUG] Queueing card {next_card['card']} for time {draw_time} (current: {self.current_time}, offset: {next_card['time_offset']})")
-                self.card_queue.append(Card(
+                if debug.enabled:
+                    print(f"[DEBUG] Queueing card {next_card['card']} for time {draw_time} (current: {self.current_time}, offset: {next_card['time_offset']})")
+                self._list_insert("card_queue", len(self.card_queue), Card(
                     title=card_data["title"],
                     description=card_data["description"],
                     drawed_at=draw_time,
@@ -367,19 +520,22 @@ class GameState:
         # Handle stacked cards
         if card.stack_count > 1:
             # Decrease stack count instead of removing the card
-            card.stack_count -= 1
-            print(f"[DEBUG] Decreased stack count for {card.title} to {card.stack_count}")
+            self._add_to_field(card, "stack_count", -1)
+            if debug.enabled:
+                print(f"[DEBUG] Decreased stack count for {card.title} to {card.stack_count}")
         else:
             # Remove the card that was chosen
-            self.active_cards.pop(card_index)
-            print(f"[DEBUG] Removed card from active cards: {card.title}")
+            self._list_remove("active_cards", card_index)
+            if debug.enabled:
+                print(f"[DEBUG] Removed card from active cards: {card.title}")
         
         # If there are other cards at the same time, automatically select the highest priority one
         # BUT only if they were already active before this choice was made
         if self.active_cards:
             # Stop auto-choice if any immediate cards remain
             if any(card.card_type == "immediate" for card in self.active_cards):
-                print("[DEBUG] Stopping auto-choice due to immediate cards")
+                if debug.enabled:
+                    print("[DEBUG] Stopping auto-choice due to immediate cards")
                 return True
                 
             # Get the current time to identify newly drawn cards
@@ -390,21 +546,25 @@ class GameState:
             if existing_cards:
                 # Only auto-select if this wasn't an auto-selected choice
                 if not hasattr(self, '_auto_selecting'):
-                    self._auto_selecting = True
+                    self._set_attr("_auto_selecting", True)
                     highest_priority_card = max(existing_cards, key=lambda x: (x.priority, -x.drawed_at))
                     highest_priority_index = self.active_cards.index(highest_priority_card)
-                    print(f"[DEBUG] Auto-selecting highest priority existing card: {highest_priority_card.title}")
+                    if debug.enabled:
+                        print(f"[DEBUG] Auto-selecting highest priority existing card: {highest_priority_card.title}")
                     # Find the first available choice
                     for choice_idx in range(len(highest_priority_card.choices)):
                         if self.can_make_choice(highest_priority_index, choice_idx):
-                            print(f"[DEBUG] Auto-making choice {choice_idx} for {highest_priority_card.title}")
+                            if debug.enabled:
+                                print(f"[DEBUG] Auto-making choice {choice_idx} for {highest_priority_card.title}")
                             self.make_choice(highest_priority_index, choice_idx)
                             break
-                    self._auto_selecting = False
+                    self._set_attr("_auto_selecting", False)
             else:
-                print("[DEBUG] No existing cards to auto-select")
+                if debug.enabled:
+                    print("[DEBUG] No existing cards to auto-select")
         
-        print(f"[DEBUG] === End of make_choice ===\n")
+        if debug.enabled:
+            print(f"[DEBUG] === End of make_choice ===\n")
         self._trigger_on_action(message="Card choice")
         return True
     
@@ -415,9 +575,7 @@ class GameState:
             for effect in relic.passive_effects:
                 if effect["type"] == "resource_per_time":
                     key = f"{relic.name}_{effect['resource']}"
-                    if key not in self.effect_timers:
-                        self.effect_timers[key] = 0
-                    time_since_last = self.current_time - self.effect_timers[key]
+                    time_since_last = self.current_time - self.effect_timers.get(key, 0)
                     remaining = effect["interval"] - (time_since_last % effect["interval"])
                     countdowns[key] = {
                         "relic": relic.name,
@@ -428,47 +586,54 @@ class GameState:
                     }
         return countdowns
 
+    def forecast(self, target_time: int) -> 'Forecast':
+        """Resources at target_time from passive relic income alone, computed in closed form.
+        See backend/forecast.py for how requirement-gated effects are approximated."""
+        return forecast_passive_income(self, target_time)
+
+    @profiled("draw")
+    @journaled
     def _draw_cards(self) -> None:
         """Draw new cards for the current time"""
         # Draw new cards
         new_active_cards = []
         cards_to_remove = []  # Track cards that should be removed from queue
-        print(f"\n[DEBUG] === Drawing cards at time {self.current_time} ===")
-        print(f"[DEBUG] Initial active cards: {[(card.title, card.drawed_at, card.stack_count) for card in self.active_cards]}")
-        print(f"[DEBUG] Initial card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
+        if debug.enabled:
+            print(f"\n[DEBUG] === Drawing cards at time {self.current_time} ===")
+            print(f"[DEBUG] Initial active cards: {[(card.title, card.drawed_at, card.stack_count) for card in self.active_cards]}")
+            print(f"[DEBUG] Initial card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
         
         for card in self.card_queue:
-            print(f"\n[DEBUG] Processing card in queue: {card.title}")
-            print(f"[DEBUG] Card drawed_at: {card.drawed_at}")
-            print(f"[DEBUG] Current time: {self.current_time}")
+            if debug.enabled:
+                print(f"\n[DEBUG] Processing card in queue: {card.title}")
+                print(f"[DEBUG] Card drawed_at: {card.drawed_at}")
+                print(f"[DEBUG] Current time: {self.current_time}")
             
             # Check if this exact card instance is already active
             card_already_active = False
             for active_card in self.active_cards:
                 if active_card is card:  # Check if it's the same card instance
                     card_already_active = True
-                    print(f"[DEBUG] Found exact card instance already active: {active_card.title} (time {active_card.drawed_at})")
+                    if debug.enabled:
+                        print(f"[DEBUG] Found exact card instance already active: {active_card.title} (time {active_card.drawed_at})")
                     break
             
-            print(f"[DEBUG] Card already in active cards: {card_already_active}")
+            if debug.enabled:
+                print(f"[DEBUG] Card already in active cards: {card_already_active}")
             
             if card.drawed_at <= self.current_time:
-                print(f"[DEBUG] Card {card.title} is due to be drawn")
-                print(f"[DEBUG] Card requirements: {card.requirements}")
-                print(f"[DEBUG] Current relics: {[r.name for r in self.relics]}")
+                if debug.enabled:
+                    print(f"[DEBUG] Card {card.title} is due to be drawn")
+                    print(f"[DEBUG] Card requirements: {card.requirements}")
+                    print(f"[DEBUG] Current relics: {[r.name for r in self.relics]}")
                 
                 # Check if card has requirements
                 can_draw = True
-                if card.requirements is not None:
-                    # Check relic requirements
-                    if 'relics' in card.requirements:
-                        required_relics = {r.lower() for r in card.requirements['relics']}
-                        player_relics = {r.name.lower() for r in self.relics}
-                        print(f"[DEBUG] Required relics: {required_relics}")
-                        print(f"[DEBUG] Player relics: {player_relics}")
-                        if not required_relics.issubset(player_relics):
-                            can_draw = False
-                            print(f"[DEBUG] Card {card.title} cannot be drawn: missing required relics")
+                if not self._requirements_met(card):
+                    can_draw = False
+                    if debug.enabled:
+                        print(f"[DEBUG] Card {card.title} cannot be drawn: missing required relics "
+                              f"{card.requirements['relics']}")
                 if can_draw:
                     if not card_already_active:
                         # Check if we have a similar card already active (only check title)
@@ -479,37 +644,59 @@ class GameState:
                         )
                         if similar_card:
                             # Stack the card
-                            similar_card.stack_count += 1
-                            print(f"[DEBUG] Stacked card {card.title} (new count: {similar_card.stack_count})")
+                            self._add_to_field(similar_card, "stack_count", 1)
+                            if debug.enabled:
+                                print(f"[DEBUG] Stacked card {card.title} (new count: {similar_card.stack_count})")
+                            if self.events.active:
+                                self.events.emit(events.CARD_STACKED, self.current_time,
+                                                 {"card": card.title, "stack_count": similar_card.stack_count})
                             cards_to_remove.append(card)  # Add to removal list when stacked
                         else:
                             # Add as new card
                             new_active_cards.append(card)
-                            print(f"[DEBUG] Card {card.title} will be drawn")
+                            if debug.enabled:
+                                print(f"[DEBUG] Card {card.title} will be drawn")
                     else:
-                        print(f"[DEBUG] Card {card.title} (time {card.drawed_at}) already in active cards, skipping")
+                        if debug.enabled:
+                            print(f"[DEBUG] Card {card.title} (time {card.drawed_at}) already in active cards, skipping")
             else:
-                print(f"[DEBUG] Card {card.title} is not due yet (drawed_at: {card.drawed_at})")
+                if debug.enabled:
+                    print(f"[DEBUG] Card {card.title} is not due yet (drawed_at: {card.drawed_at})")
         
-        print(f"\n[DEBUG] New cards to draw: {[(card.title, card.drawed_at) for card in new_active_cards]}")
-        print(f"[DEBUG] Cards to remove from queue: {[(card.title, card.drawed_at) for card in cards_to_remove]}")
+        if debug.enabled:
+            print(f"\n[DEBUG] New cards to draw: {[(card.title, card.drawed_at) for card in new_active_cards]}")
+            print(f"[DEBUG] Cards to remove from queue: {[(card.title, card.drawed_at) for card in cards_to_remove]}")
         
         # Remove cards that were either drawn or stacked
-        self.card_queue = [
-            card for card in self.card_queue
-            if card not in new_active_cards and card not in cards_to_remove
-        ]
-        print(f"[DEBUG] Remaining card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
+        for index in reversed(range(len(self.card_queue))):
+            card = self.card_queue[index]
+            if card in new_active_cards or card in cards_to_remove:
+                self._list_remove("card_queue", index)
+        if debug.enabled:
+            print(f"[DEBUG] Remaining card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
         
-        self.active_cards.extend(sorted(new_active_cards, key=lambda x: x.priority))
-        print(f"[DEBUG] Final active cards: {[(card.title, card.drawed_at, card.stack_count) for card in self.active_cards]}")
-        print(f"[DEBUG] === End of drawing cards ===\n")
+        for card in sorted(new_active_cards, key=lambda x: x.priority):
+            self._list_insert("active_cards", len(self.active_cards), card)
+        if self.events.active:
+            for card in new_active_cards:
+                self.events.emit(events.CARD_DRAWN, self.current_time, {
+                    "card": card.title,
+                    "card_type": card.card_type,
+                    "priority": card.priority,
+                    "drawed_at": card.drawed_at
+                })
+        if debug.enabled:
+            print(f"[DEBUG] Final active cards: {[(card.title, card.drawed_at, card.stack_count) for card in self.active_cards]}")
+            print(f"[DEBUG] === End of drawing cards ===\n")
 
+    @profiled("passive_effects")
+    @journaled
     def _process_passive_effects(self) -> None:
         """Process passive effects from relics"""
-        print(f"\n[DEBUG] === Processing passive effects at time {self.current_time} ===")
-        print(f"[DEBUG] Current resources before effects: {self.resources}")
-        print(f"[DEBUG] Current relics: {[(r.name, r.count) for r in self.relics]}")
+        if debug.enabled:
+            print(f"\n[DEBUG] === Processing passive effects at time {self.current_time} ===")
+            print(f"[DEBUG] Current resources before effects: {self.resources}")
+            print(f"[DEBUG] Current relics: {[(r.name, r.count) for r in self.relics]}")
         
         # Apply passive effects from relics
         for relic in self.relics:
@@ -528,25 +715,28 @@ class GameState:
                                         required_amount *= relic.count
                                     if self.resources[req["resource"]] < required_amount:
                                         can_apply = False
-                                        print(f"[DEBUG] Cannot apply effect: {req['resource']} < {required_amount}")
+                                        if debug.enabled:
+                                            print(f"[DEBUG] Cannot apply effect: {req['resource']} < {required_amount}")
                                         break
                                 # Check relic requirements
                                 elif "relic" in req:
                                     if not any(r.name == req["relic"] for r in self.relics):
                                         can_apply = False
-                                        print(f"[DEBUG] Cannot apply effect: missing required relic {req['relic']}")
+                                        if debug.enabled:
+                                            print(f"[DEBUG] Cannot apply effect: missing required relic {req['relic']}")
                                         break
                             else:
                                 # Simple requirement (just resource name)
                                 if self.resources[req] <= 0:
                                     can_apply = False
-                                    print(f"[DEBUG] Cannot apply effect: {req} <= 0")
+                                    if debug.enabled:
+                                        print(f"[DEBUG] Cannot apply effect: {req} <= 0")
                                     break
                     
                     if can_apply:
                         key = f"{relic.name}_{effect['resource']}"
                         if key not in self.effect_timers:
-                            self.effect_timers[key] = 0
+                            self._set_timer(key, 0)
                         
                         # Calculate how many intervals have passed
                         time_since_last = self.current_time - self.effect_timers[key]
@@ -562,17 +752,34 @@ class GameState:
                                 resource_changes={effect["resource"]: effect["amount"] * intervals * relic.count},
                                 requirements_met=True
                             )
-                            self.event_history.append(event)
+                            self._list_insert("event_history", len(self.event_history), event)
                             
                             # Apply the effect for each interval
                             amount = effect["amount"] * intervals * relic.count
-                            self.resources[effect["resource"]] += amount
+                            self._add_resource(effect["resource"], amount)
                             # Update the timer
-                            self.effect_timers[key] = self.current_time
-                            print(f"[DEBUG] Applied {amount} {effect['resource']} from {relic.name} (intervals: {intervals})")
+                            self._set_timer(key, self.current_time)
+                            if self.events.active:
+                                self.events.emit(events.PASSIVE_TICK, self.current_time, {
+                                    "relic": relic.name,
+                                    "resource": effect["resource"],
+                                    "amount": amount,
+                                    "intervals": intervals
+                                })
+                            if debug.enabled:
+                                print(f"[DEBUG] Applied {amount} {effect['resource']} from {relic.name} (intervals: {intervals})")
         
-        print(f"[DEBUG] Resources after effects: {self.resources}")
-        print(f"[DEBUG] === End of processing passive effects ===\n")
+        if debug.enabled:
+            print(f"[DEBUG] Resources after effects: {self.resources}")
+            print(f"[DEBUG] === End of processing passive effects ===\n")
+
+    @journaled
+    def _requirements_met(self, card: Card) -> bool:
+        """Whether the player holds the relics a queued card needs to be drawn"""
+        if card.requirements is None or 'relics' not in card.requirements:
+            return True
+        required_relics = {r.lower() for r in card.requirements['relics']}
+        return required_relics.issubset({r.name.lower() for r in self.relics})
 
     def _advance_time_core(self, target_time: int) -> bool:
         """Core time advancement logic that ensures consistent behavior across all modes.
@@ -583,37 +790,49 @@ class GameState:
         Returns:
             bool: True if time was advanced successfully, False otherwise
         """
-        print(f"\n[DEBUG] === _advance_time_core called ===")
-        print(f"[DEBUG] Current time: {self.current_time}")
-        print(f"[DEBUG] Target time: {target_time}")
-        print(f"[DEBUG] Active cards: {[(card.title, card.drawed_at) for card in self.active_cards]}")
-        print(f"[DEBUG] Card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
-        print(f"[DEBUG] Current resources: {self.resources}")
+        if debug.enabled:
+            print(f"\n[DEBUG] === _advance_time_core called ===")
+            print(f"[DEBUG] Current time: {self.current_time}")
+            print(f"[DEBUG] Target time: {target_time}")
+            print(f"[DEBUG] Active cards: {[(card.title, card.drawed_at) for card in self.active_cards]}")
+            print(f"[DEBUG] Card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
+            print(f"[DEBUG] Current resources: {self.resources}")
         
         # Check for immediate cards
         immediate_cards = [card for card in self.active_cards if card.card_type == "immediate"]
         if immediate_cards:
-            print(f"[DEBUG] Cannot advance time: {len(immediate_cards)} immediate cards need to be handled")
-            print(f"[DEBUG] Immediate cards: {[card.title for card in immediate_cards]}")
+            if debug.enabled:
+                print(f"[DEBUG] Cannot advance time: {len(immediate_cards)} immediate cards need to be handled")
+                print(f"[DEBUG] Immediate cards: {[card.title for card in immediate_cards]}")
             return False
             
         if not self.active_cards and not self.card_queue:
-            print("[DEBUG] No more cards to process")
+            if debug.enabled:
+                print("[DEBUG] No more cards to process")
             return False
             
         # Advance time and process passive effects
-        print(f"[DEBUG] Advancing time from {self.current_time} to {target_time}")
-        self.current_time = target_time
+        if debug.enabled:
+            print(f"[DEBUG] Advancing time from {self.current_time} to {target_time}")
+        previous_time = self.current_time
+        self._set_attr("current_time", target_time)
+        if self.events.active:
+            self.events.emit(events.TIME_ADVANCED, self.current_time, {"from": previous_time, "to": target_time})
         self._process_passive_effects()
         
         # Draw cards for the new time
-        print(f"[DEBUG] Drawing cards for new time {self.current_time}")
+        if debug.enabled:
+            print(f"[DEBUG] Drawing cards for new time {self.current_time}")
         self._draw_cards()
+        if self.recorder is not None:
+            self.recorder.record(self.current_time, self.resources)
         
-        print(f"[DEBUG] Final resources: {self.resources}")
-        print(f"[DEBUG] === End of _advance_time_core ===")
+        if debug.enabled:
+            print(f"[DEBUG] Final resources: {self.resources}")
+            print(f"[DEBUG] === End of _advance_time_core ===")
         return True
 
+    @journaled
     def advance_time(self, mode: str = "auto") -> bool:
         """Move time forward and process passive effects. Returns True if time was advanced.
         
@@ -623,30 +842,38 @@ class GameState:
                 - manual: Advance if no immediate cards
                 - advance_cards: Jump to next card time
         """
-        print(f"\n[DEBUG][TIME] ===== advance_time called with mode: {mode} =====")
-        print(f"[DEBUG][TIME] Current time: {self.current_time}")
-        print(f"[DEBUG][TIME] Active cards: {[(card.title, card.drawed_at) for card in self.active_cards]}")
-        print(f"[DEBUG][TIME] Card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
+        if debug.enabled:
+            print(f"\n[DEBUG][TIME] ===== advance_time called with mode: {mode} =====")
+            print(f"[DEBUG][TIME] Current time: {self.current_time}")
+            print(f"[DEBUG][TIME] Active cards: {[(card.title, card.drawed_at) for card in self.active_cards]}")
+            print(f"[DEBUG][TIME] Card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
         
         # Handle different modes
         if mode == "auto":
-            print("[DEBUG] Auto mode: checking for any active cards")
+            if debug.enabled:
+                print("[DEBUG] Auto mode: checking for any active cards")
             if self.active_cards:
-                print(f"[DEBUG] Have active cards at time {self.current_time}, not advancing time")
+                if debug.enabled:
+                    print(f"[DEBUG] Have active cards at time {self.current_time}, not advancing time")
                 return False
             target_time = self.current_time + 1
         elif mode == "manual":
-            print("[DEBUG] Manual mode: advancing by 1 time unit")
+            if debug.enabled:
+                print("[DEBUG] Manual mode: advancing by 1 time unit")
             target_time = self.current_time + 1
         elif mode == "advance_cards":
-            print("[DEBUG] Advance cards mode: finding next card time")
+            if debug.enabled:
+                print("[DEBUG] Advance cards mode: finding next card time")
             if not self.card_queue:
-                print("[DEBUG] No more cards in queue")
+                if debug.enabled:
+                    print("[DEBUG] No more cards in queue")
                 return False
             target_time = min(card.drawed_at for card in self.card_queue)
-            print(f"[DEBUG] Jumping to next card time: {target_time}")
+            if debug.enabled:
+                print(f"[DEBUG] Jumping to next card time: {target_time}")
         else:
-            print(f"[DEBUG] Invalid mode: {mode}")
+            if debug.enabled:
+                print(f"[DEBUG] Invalid mode: {mode}")
             return False
             
         # Use core time advancement logic
@@ -655,19 +882,24 @@ class GameState:
 
     def is_game_over(self) -> bool:
         """Check if the game is over"""
+        return self.game_over_cause() is not None
+
+    def game_over_cause(self) -> Optional[str]:
+        """Why the game is over ("no_cards", "<resource>_below_min" or "<resource>_above_max"),
+        None while it goes on"""
         # No more cards to play
         if not self.active_cards and not self.card_queue:
-            return True
+            return "no_cards"
             
         # Check resource-based game over conditions
         for resource, amount in self.resources.items():
             config = self.resource_config["resources"][resource]
             if "min_amount" in config and amount < config["min_amount"]:
-                return True
+                return f"{resource}_below_min"
             if "max_amount" in config and amount > config["max_amount"]:
-                return True
+                return f"{resource}_above_max"
                 
-        return False
+        return None
 
     def to_dict(self) -> Dict:
         """Convert GameState to serializable dictionary"""
@@ -677,6 +909,7 @@ class GameState:
             "relics": [relic.to_dict() for relic in self.relics],
             "active_cards": [card.to_dict() for card in self.active_cards],
             "card_queue": [card.to_dict() for card in self.card_queue],
+            "effect_timers": dict(self.effect_timers),
             "event_history": [
                 {
                     "timestamp": event.timestamp,
@@ -699,6 +932,8 @@ class GameState:
         state.relics = [Relic.from_dict(r_data) for r_data in data["relics"]]
         state.active_cards = [Card.from_dict(c_data) for c_data in data["active_cards"]]
         state.card_queue = [Card.from_dict(q_data) for q_data in data["card_queue"]]
+        # Saves from before timers were stored restart every passive effect from 0
+        state.effect_timers = dict(data.get("effect_timers", {}))
         # Restore event history
         if "event_history" in data:
             state.event_history = [
@@ -714,64 +949,300 @@ class GameState:
             ]
         return state 
 
+    def enable_profiling(self, profiler: Optional[Profiler] = None, trace: bool = False) -> Profiler:
+        """Start collecting per-phase timings. Pass a profiler to share it (e.g. with a StateManager)."""
+        self.profiler = profiler or Profiler(trace=trace)
+        return self.profiler
+
+    def disable_profiling(self) -> None:
+        self.profiler = NULL_PROFILER
+
+    def stats(self) -> Dict:
+        """Counters and timings per engine phase (empty while profiling is disabled)"""
+        return self.profiler.stats()
+
+    def enable_recording(self, recorder: Optional[ResourceRecorder] = None, max_points: int = 65536) -> ResourceRecorder:
+        """Record resource values over time. Pass a recorder to keep one series across loaded states."""
+        self.recorder = recorder or ResourceRecorder(self.resources, max_points=max_points)
+        self.recorder.record(self.current_time, self.resources)
+        return self.recorder
+
+    def disable_recording(self) -> None:
+        self.recorder = None
+
+    def fork(self) -> 'GameState':
+        """Create an independent copy of the mutable game state.
+
+        The copy shares the (read-only) loaded configuration with this state, so
+        forking is cheap enough to do per simulated choice. The policy is shared;
+        callbacks and event subscriptions are not copied.
+        """
+        state = self.__class__.__new__(self.__class__)
+        state.loaded_mode = self.loaded_mode
+        state.resource_config = self.resource_config
+        state.relic_config = self.relic_config
+        state.card_config = self.card_config
+        state.card_graph = self.card_graph
+        state.current_time = self.current_time
+        state.resources = dict(self.resources)
+        state.relics = [replace(relic) for relic in self.relics]
+        state.active_cards = [replace(card) for card in self.active_cards]
+        state.card_queue = [replace(card) for card in self.card_queue]
+        state.effect_timers = dict(self.effect_timers)
+        state.event_history = list(self.event_history)
+        state.policy = self.policy
+        state._on_action_callbacks = []
+        state.events = EventBus()
+        state.profiler = NULL_PROFILER
+        state.recorder = None
+        state.set_undo_limit(self._undo_stack.maxlen)
+        # make_choice keys its auto-select guard on the attribute existing at all
+        if hasattr(self, '_auto_selecting'):
+            state._auto_selecting = self._auto_selecting
+        return state
+
+    @profiled("hashing")
+    def state_hash(self) -> str:
+        """Hash of everything that determines how the game continues (event history excluded)"""
+        return continuation_hash({
+            'current_time': self.current_time,
+            'resources': self.resources,
+            'relics': [relic.to_dict() for relic in self.relics],
+            'active_cards': [card.to_dict() for card in self.active_cards],
+            'card_queue': [card.to_dict() for card in self.card_queue],
+            'effect_timers': self.effect_timers
+        })
+
+    # --- Undo journal ---
+    # Engine mutations go through these helpers so the outermost journaled call can
+    # record them as one compact, invertible step.
+
+    def set_undo_limit(self, limit: int) -> None:
+        """Keep up to `limit` actions for undo; 0 turns recording off (e.g. for search forks)"""
+        self._undo_stack = deque(maxlen=limit)
+        self._redo_stack = []
+        self._journal = None
+
+    def _add_resource(self, resource: str, delta: int) -> None:
+        self.resources[resource] += delta
+        if self._journal is not None:
+            self._journal.append(("resource", resource, delta))
+
+    def _add_to_field(self, obj, field_name: str, delta: int) -> None:
+        setattr(obj, field_name, getattr(obj, field_name) + delta)
+        if self._journal is not None:
+            self._journal.append(("field", obj, field_name, delta))
+
+    def _set_attr(self, name: str, value) -> None:
+        if self._journal is not None:
+            self._journal.append(("attr", name, getattr(self, name, _MISSING), value))
+        setattr(self, name, value)
+
+    def _set_timer(self, key: str, value: int) -> None:
+        if self._journal is not None:
+            self._journal.append(("timer", key, self.effect_timers.get(key, _MISSING), value))
+        self.effect_timers[key] = value
+
+    def _list_insert(self, list_name: str, index: int, item) -> None:
+        getattr(self, list_name).insert(index, item)
+        if self._journal is not None:
+            self._journal.append(("insert", list_name, index, item))
+
+    def _list_remove(self, list_name: str, index: int) -> None:
+        item = getattr(self, list_name).pop(index)
+        if self._journal is not None:
+            self._journal.append(("remove", list_name, index, item))
+
+    def _apply_op(self, op, forward: bool) -> None:
+        kind = op[0]
+        if kind == "resource":
+            self.resources[op[1]] += op[2] if forward else -op[2]
+        elif kind == "field":
+            _, obj, field_name, delta = op
+            setattr(obj, field_name, getattr(obj, field_name) + (delta if forward else -delta))
+        elif kind in ("attr", "timer"):
+            _, name, old, new = op
+            value = new if forward else old
+            if kind == "attr":
+                if value is _MISSING:
+                    delattr(self, name)
+                else:
+                    setattr(self, name, value)
+            elif value is _MISSING:
+                del self.effect_timers[name]
+            else:
+                self.effect_timers[name] = value
+        else:
+            _, list_name, index, item = op
+            target = getattr(self, list_name)
+            if (kind == "insert") == forward:
+                target.insert(index, item)
+            else:
+                target.pop(index)
+
+    def can_undo(self) -> bool:
+        return bool(self._undo_stack)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo_stack)
+
+    def undo(self) -> bool:
+        """Revert the last action (a choice, time advance or policy step). Returns False if there is none."""
+        if not self._undo_stack:
+            return False
+        ops = self._undo_stack.pop()
+        for op in reversed(ops):
+            self._apply_op(op, forward=False)
+        self._redo_stack.append(ops)
+        if self.recorder is not None:
+            self.recorder.record(self.current_time, self.resources)
+        return True
+
+    def redo(self) -> bool:
+        """Re-apply the last undone action. Any new action clears the redo stack."""
+        if not self._redo_stack:
+            return False
+        ops = self._redo_stack.pop()
+        for op in ops:
+            self._apply_op(op, forward=True)
+        self._undo_stack.append(ops)
+        if self.recorder is not None:
+            self.recorder.record(self.current_time, self.resources)
+        return True
+
+    @journaled
     def manual_time_advance(self, amount: int) -> bool:
         """Manually advance time by the specified amount"""
-        print(f"\n[DEBUG][TIME] ===== manual_time_advance called =====")
-        print(f"[DEBUG][TIME] Attempting to advance time by {amount} units from {self.current_time}")
+        if debug.enabled:
+            print(f"\n[DEBUG][TIME] ===== manual_time_advance called =====")
+            print(f"[DEBUG][TIME] Attempting to advance time by {amount} units from {self.current_time}")
         
         # Check for immediate cards first
         immediate_cards = [card for card in self.active_cards if card.card_type == "immediate"]
         if immediate_cards:
-            print(f"[DEBUG] Cannot advance time: {len(immediate_cards)} immediate cards need to be handled")
-            print(f"[DEBUG] Immediate cards: {[card.title for card in immediate_cards]}")
+            if debug.enabled:
+                print(f"[DEBUG] Cannot advance time: {len(immediate_cards)} immediate cards need to be handled")
+                print(f"[DEBUG] Immediate cards: {[card.title for card in immediate_cards]}")
             return False
             
         # Advance time step by step
         for i in range(amount):
-            print(f"[DEBUG] Manual advance iteration {i+1}/{amount}")
-            print(f"[DEBUG] Current time before advance: {self.current_time}")
-            print(f"[DEBUG] Current active cards: {[(card.title, card.drawed_at) for card in self.active_cards]}")
-            print(f"[DEBUG] Current card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
+            if debug.enabled:
+                print(f"[DEBUG] Manual advance iteration {i+1}/{amount}")
+                print(f"[DEBUG] Current time before advance: {self.current_time}")
+                print(f"[DEBUG] Current active cards: {[(card.title, card.drawed_at) for card in self.active_cards]}")
+                print(f"[DEBUG] Current card queue: {[(card.title, card.drawed_at) for card in self.card_queue]}")
             
             # Use core time advancement logic for each step
             if not self._advance_time_core(self.current_time + 1):
-                print(f"[DEBUG] Failed to advance time at iteration {i+1}")
+                if debug.enabled:
+                    print(f"[DEBUG] Failed to advance time at iteration {i+1}")
                 return False
                 
-            print(f"[DEBUG] Successfully advanced to time {self.current_time}")
-            print(f"[DEBUG] Active cards after advance: {[(card.title, card.drawed_at) for card in self.active_cards]}")
-            print(f"[DEBUG] Card queue after advance: {[(card.title, card.drawed_at) for card in self.card_queue]}")
+            if debug.enabled:
+                print(f"[DEBUG] Successfully advanced to time {self.current_time}")
+                print(f"[DEBUG] Active cards after advance: {[(card.title, card.drawed_at) for card in self.active_cards]}")
+                print(f"[DEBUG] Card queue after advance: {[(card.title, card.drawed_at) for card in self.card_queue]}")
         
-        print(f"[DEBUG] ===== End of manual_time_advance =====")
+        if debug.enabled:
+            print(f"[DEBUG] ===== End of manual_time_advance =====")
         return True 
 
+    @journaled
+    def advance_until_decision(self, stop_time: Optional[int] = None, stop_on_new_card: bool = True,
+                               max_steps: int = 1000000) -> AdvanceSummary:
+        """Advance one time unit at a time (like manual_time_advance) until the player has
+        something to decide: an immediate card, a newly drawn card (if stop_on_new_card),
+        stop_time, or the game ending. One undo step reverts the whole advance (an advance
+        recording more than MAX_UNDO_OPS clears the undo history instead).
+
+        Without a stop_time it also stops when advancing can't bring a card: the game was
+        already over, or no queued card is left but ones waiting for relics, which only
+        choices grant."""
+        start_time = self.current_time
+        start_resources = dict(self.resources)
+        history_start = len(self.event_history)
+        cards_drawn = []
+        steps = 0
+        stop_reason = "max_steps"
+        already_over = self.is_game_over()
+        while True:
+            if any(card.card_type == "immediate" for card in self.active_cards):
+                stop_reason = "immediate_card"
+                break
+            if stop_time is None:
+                if already_over:
+                    stop_reason = "game_over"
+                    break
+                if (self.active_cards or self.card_queue) and \
+                        not any(self._requirements_met(card) for card in self.card_queue):
+                    stop_reason = "no_drawable_cards"
+                    break
+            if steps > 0 and stop_on_new_card and cards_drawn:
+                stop_reason = "new_card"
+                break
+            if stop_time is not None and self.current_time >= stop_time:
+                stop_reason = "stop_time"
+                break
+            if not already_over and self.is_game_over():  # Only a game that ends on the way stops it
+                stop_reason = "game_over"
+                break
+            if steps >= max_steps:
+                break
+            before = {card.title: card.stack_count for card in self.active_cards}
+            if not self._advance_time_core(self.current_time + 1):
+                stop_reason = "no_cards"
+                break
+            steps += 1
+            for card in self.active_cards:
+                cards_drawn.extend([card.title] * max(0, card.stack_count - before.get(card.title, 0)))
+        if debug.enabled:
+            print(f"[DEBUG][TIME] advance_until_decision: {start_time} -> {self.current_time} ({stop_reason})")
+        return AdvanceSummary(
+            start_time=start_time,
+            end_time=self.current_time,
+            steps=steps,
+            stop_reason=stop_reason,
+            resource_changes={name: amount - start_resources.get(name, 0)
+                              for name, amount in self.resources.items()
+                              if amount != start_resources.get(name, 0)},
+            cards_drawn=cards_drawn,
+            passive_ticks=sum(1 for event in self.event_history[history_start:] if event.event_type == 'relic_effect')
+        )
+
+    @journaled
     def execute_policy(self) -> bool:
         """Execute the current policy. Returns True if policy execution should continue."""
-        print(f"\n[DEBUG][POLICY] === Executing policy at time {self.current_time} ===")
-        print(f"[DEBUG][POLICY] Policy state: is_unlimited={self.policy.is_unlimited}, is_relative={self.policy.is_relative}, base_time={self.policy.base_time}, target_time={self.policy.target_time}")
+        if debug.enabled:
+            print(f"\n[DEBUG][POLICY] === Executing policy at time {self.current_time} ===")
+            print(f"[DEBUG][POLICY] Policy state: is_unlimited={self.policy.is_unlimited}, is_relative={self.policy.is_relative}, base_time={self.policy.base_time}, target_time={self.policy.target_time}")
         target_time = self.policy.get_target_time(self.current_time)
-        print(f"[DEBUG][POLICY] Policy get_target_time(current_time={self.current_time}) -> {target_time}")
+        if debug.enabled:
+            print(f"[DEBUG][POLICY] Policy get_target_time(current_time={self.current_time}) -> {target_time}")
         if target_time is not None and self.current_time >= target_time:
-            print(f"[DEBUG][POLICY] Reached target time {target_time}, stopping policy execution at current_time {self.current_time}")
+            if debug.enabled:
+                print(f"[DEBUG][POLICY] Reached target time {target_time}, stopping policy execution at current_time {self.current_time}")
             return False
 
         # Check if we have any active cards
         if not self.active_cards:
-            print("[DEBUG] No active cards, advancing time")
+            if debug.enabled:
+                print("[DEBUG] No active cards, advancing time")
             return self.advance_time(mode="auto")
 
         # Find the first card that has a matching policy choice
-        found_match = False
-        for i, card in enumerate(self.active_cards):
-            choice_index = self.policy.find_matching_choice(card)
-            if choice_index is not None and self.can_make_choice(i, choice_index):
+        match = self._find_policy_choice()
+        if match is not None:
+            i, choice_index = match
+            if debug.enabled:
+                card = self.active_cards[i]
                 print(f"[DEBUG] Found matching policy choice for {card.title}: {card.choices[choice_index]['description']}")
-                self.make_choice(i, choice_index)
-                found_match = True
-                return True
+            self.make_choice(i, choice_index)
+            return True
 
         # If we get here, we have cards but none match the policy or are selectable
-        print("[DEBUG] No matching policy choices found or none are selectable.")
+        if debug.enabled:
+            print("[DEBUG] No matching policy choices found or none are selectable.")
         # Check if any card is selectable at all
         any_selectable = False
         for i, card in enumerate(self.active_cards):
@@ -782,32 +1253,40 @@ class GameState:
             if any_selectable:
                 break
         if not any_selectable:
-            print("[DEBUG] No selectable choices for any active card. Advancing time (manual mode).")
+            if debug.enabled:
+                print("[DEBUG] No selectable choices for any active card. Advancing time (manual mode).")
             advanced = self.manual_time_advance(1)
             if not advanced:
-                print("[DEBUG] Time could not be advanced (manual). Stopping policy execution to prevent infinite loop.")
+                if debug.enabled:
+                    print("[DEBUG] Time could not be advanced (manual). Stopping policy execution to prevent infinite loop.")
                 return False
             return True
         else:
-            print("[DEBUG] There are selectable choices, but none match the policy. Stopping policy execution.")
+            if debug.enabled:
+                print("[DEBUG] There are selectable choices, but none match the policy. Stopping policy execution.")
             return False
 
+    @profiled("policy_lookup")
+    def _find_policy_choice(self) -> Optional[tuple]:
+        """Return (card_index, choice_index) of the first active card the policy can play"""
+        for i, card in enumerate(self.active_cards):
+            choice_index = self.policy.find_matching_choice(card)
+            if choice_index is not None and self.can_make_choice(i, choice_index):
+                return i, choice_index
+        return None
+
     def run_policy(self) -> None:
-        """Run the policy until it stops"""
+        """Run the policy until it stops. Each policy step is its own undo step, so a
+        long run keeps at most DEFAULT_UNDO_LIMIT of them instead of one huge entry."""
         iteration = 0
         while True:
-            print(f"[DEBUG][POLICY] run_policy loop iteration {iteration}, current_time={self.current_time}")
+            if debug.enabled:
+                print(f"[DEBUG][POLICY] run_policy loop iteration {iteration}, current_time={self.current_time}")
             should_continue = self.execute_policy()
-            print(f"[DEBUG][POLICY] run_policy loop iteration {iteration} result: should_continue={should_continue}, current_time={self.current_time}")
+            if debug.enabled:
+                print(f"[DEBUG][POLICY] run_policy loop iteration {iteration} result: should_continue={should_continue}, current_time={self.current_time}")
             iteration += 1
             if not should_continue:
-                print(f"[DEBUG][POLICY] run_policy exiting at iteration {iteration}, current_time={self.current_time}")
-                break 
-
-def save_callback(game_state, message=""):
-    try:
-        print(f"[DEBUG][CALLBACK] save_callback called with message: {message}")
-        print(f"[DEBUG][CALLBACK] save_callback: state_manager id={{id(state_manager)}}, game_state id={{id(game_state)}}")
-        state_manager.save_state(game_state, message=message or "Policy action")
-    except Exception as e:
-        print(f"[DEBUG][CALLBACK] save_callback exception: {e}") 
\ No newline at end of file
+                if debug.enabled:
+                    print(f"[DEBUG][POLICY] run_policy exiting at iteration {iteration}, current_time={self.current_time}")
+                break
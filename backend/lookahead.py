@@ -0,0 +1,131 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from .game_state import GameState
+
+@dataclass
+class Projection:
+    """Outcome of simulating one choice a number of time units ahead"""
+    card_index: int
+    choice_index: int
+    horizon: int
+    start_time: int
+    end_time: int  # Time the simulation actually reached
+    resources: Dict[str, int]
+    relics: Dict[str, int]  # Relic name -> count
+    stop_reason: str = "horizon"  # 'horizon', 'immediate_card', 'no_cards', 'game_over'
+
+def simulate_choice(state: GameState, card_index: int, choice_index: int, horizon: int) -> Projection:
+    """Make a choice on a fork of the state and advance it up to `horizon` time units.
+
+    Time is advanced one unit at a time (like manual advance), so queued next_cards,
+    relic gains and passive income are all applied. The simulation stops early when an
+    immediate card has to be handled or the game is over.
+    """
+    sim = state.fork()
+    sim.set_undo_limit(0)
+    start_time = sim.current_time
+    sim.make_choice(card_index, choice_index)
+    target_time = start_time + horizon
+    stop_reason = "horizon"
+    while sim.current_time < target_time:
+        if sim.is_game_over():
+            stop_reason = "game_over"
+            break
+        if not sim._advance_time_core(sim.current_time + 1):
+            if any(card.card_type == "immediate" for card in sim.active_cards):
+                stop_reason = "immediate_card"
+            else:
+                stop_reason = "no_cards"
+            break
+    return Projection(
+        card_index=card_index,
+        choice_index=choice_index,
+        horizon=horizon,
+        start_time=start_time,
+        end_time=sim.current_time,
+        resources=dict(sim.resources),
+        relics={relic.name: relic.count for relic in sim.relics},
+        stop_reason=stop_reason
+    )
+
+class LookaheadPool:
+    """Simulates every legal choice of the active cards in background threads.
+
+    Results are cached per (state hash, card, choice, horizon) so previews for a state
+    that was already seen are available immediately. Scheduling a new state cancels
+    the work queued for the previous one.
+    """
+    def __init__(self, horizon: int = 10, max_workers: int = 2, max_cached: int = 512):
+        self.horizon = horizon
+        self.max_cached = max_cached
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lookahead")
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, int, int, int], Projection]" = OrderedDict()
+        self._pending: Dict[Tuple[str, int, int, int], Future] = {}
+        self.current_hash: Optional[str] = None
+
+    def schedule(self, state: GameState) -> str:
+        """Queue simulations for all legal choices of the state. Returns the state hash."""
+        state_hash = state.state_hash()
+        if state_hash != self.current_hash:
+            self.cancel_pending()
+            self.current_hash = state_hash
+
+        # Simulations run on their own fork of this snapshot, never on the live state
+        snapshot = state.fork()
+        for card_index, card in enumerate(snapshot.active_cards):
+            for choice_index in range(len(card.choices)):
+                if not snapshot.can_make_choice(card_index, choice_index):
+                    continue
+                key = (state_hash, card_index, choice_index, self.horizon)
+                with self._lock:
+                    if key in self._cache or key in self._pending:
+                        continue
+                    future = self._executor.submit(simulate_choice, snapshot, card_index, choice_index, self.horizon)
+                    self._pending[key] = future
+                future.add_done_callback(lambda f, k=key: self._on_done(k, f))
+        return state_hash
+
+    def _on_done(self, key: Tuple[str, int, int, int], future: Future) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._cache[key] = future.result()
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def get(self, state_hash: str, card_index: int, choice_index: int) -> Optional[Projection]:
+        """Return the cached projection for a choice, or None if it is not ready yet"""
+        key = (state_hash, card_index, choice_index, self.horizon)
+        with self._lock:
+            projection = self._cache.get(key)
+            if projection is not None:
+                self._cache.move_to_end(key)
+            return projection
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def set_horizon(self, horizon: int) -> None:
+        """Change how far ahead choices are simulated; cached results for other horizons stay valid"""
+        if horizon != self.horizon:
+            self.cancel_pending()
+            self.horizon = horizon
+
+    def cancel_pending(self) -> None:
+        """Cancel queued simulations that have not started yet"""
+        with self._lock:
+            pending = list(self._pending.items())
+        for key, future in pending:
+            if future.cancel():
+                with self._lock:
+                    self._pending.pop(key, None)
+
+    def shutdown(self) -> None:
+        self.cancel_pending()
+        self._executor.shutdown(wait=False, cancel_futures=True)
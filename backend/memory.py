@@ -0,0 +1,279 @@
+"""
+Memory accounting.
+Attributes the bytes a session holds to its components: the parts of the game state
+(event_history, card_queue, active_cards, relics, effect_timers, resources, the undo
+journal, the resource recorder) and of its history (the state_dict_json snapshots of
+the StateNodes, the rest of the nodes, the cache of materialized states). Sizes are
+deep: sys.getsizeof summed over everything a component references, each object
+counted once, and the mode's configuration (which cards share) left out.
+
+A MemoryProfile samples the components over game time into growth curves. While it
+runs with tracemalloc, it also reports the source lines whose allocations grew since
+the first sample, which catches memory no component accounts for.
+
+    python -m backend.memory --mode 0507_terran --steps 20000 --budget 50000000
+
+plays a GUI-like session (undo journal, resource recorder and a history save after
+every action) with a random policy and fails if the tracked total ends over budget.
+"""
+import argparse
+import json
+import sys
+import threading
+import tracemalloc
+import types
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+from . import debug
+from .game_state import GameState
+from .runner import RANDOM_POLICY, RunSpec, iter_run
+from .state_history import StateManager
+
+GAME_COMPONENTS = ("event_history", "card_queue", "active_cards", "relics", "effect_timers", "resources")
+_ATOMS = (str, bytes, int, float, bool, type(None), array)
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+           type(threading.Lock()), threading.Thread)
+
+def deep_size(obj, seen: Set[int]) -> int:
+    """sys.getsizeof of obj and everything it references that isn't in `seen` yet
+    (seen is updated, so measuring several objects with one set counts shared parts once)"""
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, _ATOMS) or isinstance(item, _OPAQUE):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        else:
+            attributes = getattr(item, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for cls in type(item).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    value = getattr(item, slot, None)
+                    if value is not None:
+                        stack.append(value)
+    return total
+
+def shared_ids(game: GameState) -> Set[int]:
+    """Ids of the mode configuration, loaded once per process and referenced by every
+    card; measuring with a copy of this set leaves it out"""
+    seen: Set[int] = set()
+    deep_size(game.loaded_mode, seen)
+    return seen
+
+def measure(game: GameState, manager: Optional[StateManager] = None,
+            shared: Optional[Set[int]] = None) -> Dict[str, int]:
+    """Deep bytes per component of a game (and its history)"""
+    seen = set(shared if shared is not None else shared_ids(game))
+    sizes = {name: deep_size(getattr(game, name), seen) for name in GAME_COMPONENTS}
+    sizes["undo_journal"] = deep_size(game._undo_stack, seen) + deep_size(game._redo_stack, seen)
+    sizes["recorder"] = deep_size(game.recorder, seen) if game.recorder is not None else 0
+    if manager is not None:
+        with manager.lock:
+            nodes = list(manager.nodes.values())
+            snapshots = [node.state_dict_json for node in nodes]
+            sizes["state_dict_json"] = sum(deep_size(snapshot, seen) for snapshot in snapshots)
+            sizes["history_nodes"] = deep_size(manager.nodes, seen) + deep_size(manager._summaries, seen)
+        with manager.cache._lock:
+            entries = list(manager.cache._entries.values())
+        sizes["state_cache"] = deep_size(entries, seen)
+    return sizes
+
+class MemoryProfile:
+    """Growth curves of the memory components over game time"""
+    def __init__(self, interval: int = 50, trace_allocations: bool = False, frames: int = 1):
+        self.interval = interval  # Game time units between samples taken by maybe_sample
+        self.samples: List[Dict] = []
+        self.frames = frames
+        self._started_tracing = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._shared: Optional[Set[int]] = None
+        self._shared_mode = None
+        if trace_allocations:
+            self.start_tracing()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self) -> None:
+        """Track allocations with tracemalloc (slows Python code down noticeably)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._baseline = tracemalloc.take_snapshot()
+
+    def stop_tracing(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._baseline = None
+
+    def sample(self, game: GameState, manager: Optional[StateManager] = None, step: Optional[int] = None) -> Dict:
+        """Measure every component now and add the point to the curves"""
+        if self._shared_mode is not game.loaded_mode:
+            self._shared = shared_ids(game)
+            self._shared_mode = game.loaded_mode
+        components = measure(game, manager, self._shared)
+        sample = {
+            "time": game.current_time,
+            "step": step,
+            "components": components,
+            "total": sum(components.values())
+        }
+        if manager is not None:
+            sample["history_nodes_count"] = len(manager.nodes)
+            sample["event_count"] = len(game.event_history)
+        if tracemalloc.is_tracing():
+            sample["traced_bytes"], sample["traced_peak"] = tracemalloc.get_traced_memory()
+        self.samples.append(sample)
+        return sample
+
+    def maybe_sample(self, game: GameState, manager: Optional[StateManager] = None) -> Optional[Dict]:
+        """Sample when game time has moved `interval` units past the last sample (or back)"""
+        if self.samples:
+            last = self.samples[-1]["time"]
+            if last <= game.current_time < last + self.interval:
+                return None
+        return self.sample(game, manager)
+
+    def clear(self) -> None:
+        self.samples = []
+        if tracemalloc.is_tracing():
+            self._baseline = tracemalloc.take_snapshot()
+
+    def growth(self) -> Dict[str, Dict[str, float]]:
+        """Per component: bytes now, and bytes gained per game time unit and per step
+        between the first and the last sample"""
+        if not self.samples:
+            return {}
+        first, last = self.samples[0], self.samples[-1]
+        elapsed = last["time"] - first["time"]
+        steps = (last["step"] - first["step"]) if last["step"] is not None and first["step"] is not None else 0
+        rows = {}
+        for name, size in last["components"].items():
+            gained = size - first["components"].get(name, 0)
+            rows[name] = {
+                "bytes": size,
+                "per_time_unit": gained / elapsed if elapsed > 0 else 0.0,
+                "per_step": gained / steps if steps > 0 else 0.0
+            }
+        return rows
+
+    def top_allocations(self, limit: int = 10) -> List[Dict]:
+        """Source lines whose traced allocations grew the most since tracing started"""
+        if self._baseline is None or not tracemalloc.is_tracing():
+            return []
+        # Leave out the profiler's own bookkeeping
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                  tracemalloc.Filter(False, "<frozen *>")]
+        current = tracemalloc.take_snapshot().filter_traces(ignore)
+        stats = current.compare_to(self._baseline.filter_traces(ignore), "lineno")
+        return [
+            {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             "size_diff": stat.size_diff, "count_diff": stat.count_diff, "size": stat.size}
+            for stat in stats[:limit] if stat.size_diff > 0
+        ]
+
+    def report(self, limit: int = 10) -> Dict:
+        last = self.samples[-1] if self.samples else None
+        return {
+            "samples": self.samples,
+            "growth": self.growth(),
+            "total": last["total"] if last else 0,
+            "traced_bytes": last.get("traced_bytes") if last else None,
+            "top_allocations": self.top_allocations(limit)
+        }
+
+    def save(self, path: str, limit: int = 10) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(limit), f, indent=2)
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def format_report(report: Dict) -> Iterable[str]:
+    total = report["total"] or 1
+    yield f"{'Component':<16} {'Bytes':>12} {'Share':>7} {'Per time unit':>14} {'Per step':>10}"
+    for name, row in sorted(report["growth"].items(), key=lambda item: -item[1]["bytes"]):
+        yield (f"{name:<16} {format_bytes(row['bytes']):>12} {row['bytes'] / total:>7.1%} "
+               f"{format_bytes(row['per_time_unit']):>14} {format_bytes(row['per_step']):>10}")
+    yield f"{'total':<16} {format_bytes(report['total']):>12}"
+    if report["traced_bytes"] is not None:
+        yield f"tracemalloc: {format_bytes(report['traced_bytes'])} traced"
+    for allocation in report["top_allocations"]:
+        yield f"  +{format_bytes(allocation['size_diff'])} ({allocation['count_diff']:+d} blocks) {allocation['location']}"
+
+def profile_session(spec: RunSpec, sample_every: int = 100, history: bool = True, recorder: bool = True,
+                    trace_allocations: bool = False) -> MemoryProfile:
+    """Play a run the way a GUI session holds it and sample its memory every
+    `sample_every` steps (and once at the end)"""
+    game = GameState(Path(spec.config_path), spec.mode)
+    if recorder:
+        game.enable_recording()
+    manager = None
+    if history:
+        manager = StateManager(Path(spec.config_path), spec.mode, prefetch=False)
+        manager.initialize(game)
+    profile = MemoryProfile(trace_allocations=trace_allocations)
+    profile.sample(game, manager, step=0)
+    step = 0
+    for record in iter_run(spec, game):
+        if record["record"] != "step":
+            break
+        step = record["step"]
+        if manager is not None and record["ok"]:
+            manager.save_state(game, message=record["action"]["type"])
+        if step % sample_every == 0:
+            profile.sample(game, manager, step=step)
+    if profile.samples[-1]["step"] != step:
+        profile.sample(game, manager, step=step)
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per component over a GUI-like session")
+    parser.add_argument("--mode", required=True)
+    parser.add_argument("--config", default="config")
+    parser.add_argument("--steps", type=int, default=10000)
+    parser.add_argument("--policy", default=RANDOM_POLICY, help="Policy JSON file or 'random'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample-every", type=int, default=100, help="Steps between samples")
+    parser.add_argument("--no-history", action="store_true", help="Don't keep a StateManager history")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report allocation growth by source line")
+    parser.add_argument("--budget", type=int, help="Fail if the tracked total ends above this many bytes")
+    parser.add_argument("--out", help="Write the report with the growth curves as JSON")
+    args = parser.parse_args()
+
+    debug.set_debug(False)
+    spec = RunSpec(mode=args.mode, policy=args.policy, seed=args.seed, max_steps=args.steps, config_path=args.config)
+    profile = profile_session(spec, args.sample_every, history=not args.no_history,
+                              trace_allocations=args.tracemalloc)
+    report = profile.report()
+    last = profile.samples[-1]
+    print(f"{args.mode}: {last['step']} steps to time {last['time']}, {len(profile.samples)} samples")
+    for line in format_report(report):
+        print(line)
+    if args.out:
+        profile.save(args.out)
+    if args.budget is not None:
+        over = report["total"] > args.budget
+        print(f"{'OVER BUDGET' if over else 'Within budget'}: {report['total']} of {args.budget} bytes")
+        sys.exit(1 if over else 0)
+
+if __name__ == "__main__":
+    main()
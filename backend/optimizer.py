@@ -0,0 +1,276 @@
+"""
+Policy search over rule sets.
+Candidates assign a choice (or no rule) to every card title; each candidate is
+played headless with run_policy to a target time, in a process
+pool, and scored by a user objective over the final resources and relics.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from . import debug
+from .game_loader import GameLoader, attach_modes, published_modes
+from .game_state import GameState, Policy
+
+Rules = Tuple[Tuple[str, str], ...]  # Ordered (card_title, choice_description) pairs
+
+_SAFE_BUILTINS = {"min": min, "max": max, "abs": abs, "sum": sum, "len": len, "round": round}
+
+# Initial game state per (config_path, mode), forked for every evaluation in this process
+_TEMPLATES: Dict[Tuple[str, str], GameState] = {}
+
+def policy_hash(rules: Rules) -> str:
+    """Hash of an ordered rule list"""
+    return hashlib.sha256(json.dumps(rules, ensure_ascii=False).encode()).hexdigest()[:16]
+
+def canonical_rules(rules: Rules) -> Rules:
+    """The rules sorted by card title. Only the order among rules of one title changes
+    which choice a policy makes, and the stable sort keeps it, so reordered but
+    equivalent candidates share one policy_hash."""
+    return tuple(sorted(rules, key=lambda rule: rule[0]))
+
+def rules_to_policy(rules: Rules) -> Policy:
+    policy = Policy()
+    for card_title, choice_description in rules:
+        policy.add_rule(card_title, choice_description)
+    return policy
+
+def policy_to_rules(policy: Policy) -> Rules:
+    return tuple((rule.card_title, rule.choice_description) for rule in policy.rules)
+
+def _fresh_game(mode: str, config_path: str) -> GameState:
+    key = (config_path, mode)
+    if key not in _TEMPLATES:
+        _TEMPLATES[key] = GameState(Path(config_path), mode)
+        _TEMPLATES[key].set_undo_limit(0)  # Forks keep the limit
+    return _TEMPLATES[key].fork()
+
+def evaluate_rules(rules: Rules, mode: str, target_time: int, config_path: str = "config") -> Dict:
+    """Play a rule set with run_policy up to target_time and return the final outcome"""
+    game = _fresh_game(mode, config_path)
+    game.policy = rules_to_policy(rules)
+    game.policy.set_target_time(str(target_time))
+    error = None
+    try:
+        game.run_policy()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {
+        "resources": dict(game.resources),
+        "relics": {relic.name: relic.count for relic in game.relics},
+        "time": game.current_time,
+        "game_over": game.is_game_over(),
+        "error": error
+    }
+
+class Objective:
+    """Scores an outcome. Either a Python expression over resource names plus
+    `relics` (name -> count), `time` and `game_over`, e.g. "minerals + 2 * gas",
+    or a callable taking the outcome dict."""
+    FIXED_NAMES = ("relics", "time", "game_over")
+
+    def __init__(self, objective: Union[str, Callable[[Dict], float]]):
+        self.objective = objective
+        self._code = compile(objective, "<objective>", "eval") if isinstance(objective, str) else None
+
+    def check_names(self, resources: Iterable[str]) -> None:
+        """Raise ValueError if the expression reads a name that is neither a resource
+        nor one of the names the namespace provides (which would fail only in score())"""
+        if not isinstance(self.objective, str):
+            return
+        tree = ast.parse(self.objective, mode="eval")
+        read = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+        bound = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)}
+        unknown = read - bound - set(resources) - set(self.FIXED_NAMES) - set(_SAFE_BUILTINS)
+        if unknown:
+            raise ValueError(f"Unknown names in objective: {', '.join(sorted(unknown))} "
+                             f"(resources: {', '.join(sorted(resources))})")
+
+    def __call__(self, outcome: Dict) -> float:
+        if outcome["error"] is not None:
+            return -math.inf
+        if self._code is None:
+            return float(self.objective(outcome))
+        namespace = dict(outcome["resources"])
+        namespace.update(relics=outcome["relics"], time=outcome["time"], game_over=outcome["game_over"])
+        return float(eval(self._code, {"__builtins__": _SAFE_BUILTINS}, namespace))
+
+@dataclass
+class OptimizationResult:
+    best_rules: Rules
+    best_score: float
+    best_outcome: Dict
+    evaluations: int = 0  # Candidates actually played
+    cache_hits: int = 0
+    history: List[float] = field(default_factory=list)  # Best score after each generation
+
+    @property
+    def best_policy(self) -> Policy:
+        return rules_to_policy(self.best_rules)
+
+def _worker_init(mode_handles: List[Dict]) -> None:
+    debug.set_debug(False)
+    attach_modes(mode_handles)
+
+class PolicyOptimizer:
+    """Population-based local search over per-title choices"""
+    def __init__(self, mode: str, target_time: int, objective: Union[str, Callable[[Dict], float]],
+                 config_path: str = "config", jobs: int = 1, population: int = 16,
+                 generations: int = 10, elite: int = 4, seed: int = 0):
+        self.mode = mode
+        self.target_time = target_time
+        self.objective = Objective(objective)
+        self.config_path = config_path
+        self.jobs = jobs
+        self.population = population
+        self.generations = generations
+        self.elite = elite
+        self.rng = random.Random(seed)
+
+        loaded = GameLoader.load_mode(mode, Path(config_path))
+        self.objective.check_names(loaded.resource_config["resources"])
+        self.config_hash = loaded.fingerprint
+        self.choices_by_title = self._collect_choices(loaded.card_config)
+        # Outcomes keyed by (policy hash, config hash, target time)
+        self.memo: Dict[Tuple[str, str, int], Dict] = {}
+
+    @staticmethod
+    def _collect_choices(card_config: Dict) -> Dict[str, List[str]]:
+        """Choice descriptions available per card title (titles can repeat across card ids)"""
+        choices: Dict[str, List[str]] = {}
+        for card_data in card_config["cards"].values():
+            descriptions = choices.setdefault(card_data["title"], [])
+            for choice in card_data.get("choices", []):
+                if choice["description"] not in descriptions:
+                    descriptions.append(choice["description"])
+        return {title: descs for title, descs in choices.items() if descs}
+
+    def random_rules(self) -> Rules:
+        return canonical_rules(tuple((title, self.rng.choice(descriptions))
+                                     for title, descriptions in self.choices_by_title.items()))
+
+    def mutate(self, rules: Rules) -> Rules:
+        """Change one title's choice (or add/drop its rule)"""
+        mutated = list(rules)
+        titles = list(self.choices_by_title)
+        title = self.rng.choice(titles)
+        positions = [i for i, (t, _) in enumerate(mutated) if t == title]
+        options = self.choices_by_title[title]
+        if positions:
+            position = positions[0]
+            current = mutated[position][1]
+            alternatives = [desc for desc in options if desc != current]
+            if alternatives and self.rng.random() < 0.8:
+                mutated[position] = (title, self.rng.choice(alternatives))
+            else:
+                mutated.pop(position)
+        else:
+            mutated.append((title, self.rng.choice(options)))
+        return canonical_rules(tuple(mutated))
+
+    def _key(self, rules: Rules) -> Tuple[str, str, int]:
+        return (policy_hash(rules), self.config_hash, self.target_time)
+
+    def _evaluate_batch(self, candidates: List[Rules], executor: Optional[ProcessPoolExecutor],
+                        result: OptimizationResult) -> None:
+        todo = []
+        for rules in candidates:
+            key = self._key(rules)
+            if key in self.memo:
+                result.cache_hits += 1
+            elif rules not in todo:
+                todo.append(rules)
+        args = ([rules for rules in todo], [self.mode] * len(todo),
+                [self.target_time] * len(todo), [self.config_path] * len(todo))
+        outcomes = executor.map(evaluate_rules, *args) if executor else map(evaluate_rules, *args)
+        for rules, outcome in zip(todo, outcomes):
+            self.memo[self._key(rules)] = outcome
+            result.evaluations += 1
+
+    def score(self, rules: Rules) -> float:
+        return self.objective(self.memo[self._key(rules)])
+
+    def optimize(self, initial: Optional[Policy] = None,
+                 on_generation: Optional[Callable[[int, OptimizationResult], None]] = None) -> OptimizationResult:
+        """Search for the best policy. The initial policy (if any) seeds the population."""
+        population = []
+        if initial is not None and initial.rules:
+            population.append(canonical_rules(policy_to_rules(initial)))
+        while len(population) < self.population:
+            population.append(self.random_rules())
+
+        result = OptimizationResult(best_rules=(), best_score=-math.inf, best_outcome={})
+        executor = None
+        with published_modes([(self.mode, self.config_path)] if self.jobs > 1 else []) as handles:
+            if self.jobs > 1:
+                executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_worker_init, initargs=(handles,))
+            try:
+                self._search(population, executor, result, on_generation)
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+        return result
+
+    def _search(self, population: List[Rules], executor: Optional[ProcessPoolExecutor],
+                result: OptimizationResult,
+                on_generation: Optional[Callable[[int, OptimizationResult], None]]) -> None:
+        for generation in range(self.generations):
+            self._evaluate_batch(population, executor, result)
+            # Prefer fewer rules on equal scores, then the rules themselves so ties (and the
+            # elites) don't depend on set or hash order
+            ranked = sorted(dict.fromkeys(population), key=lambda rules: (-self.score(rules), len(rules), rules))
+            best = ranked[0]
+            if self.score(best) > result.best_score:
+                result.best_rules = best
+                result.best_score = self.score(best)
+                result.best_outcome = self.memo[self._key(best)]
+            result.history.append(result.best_score)
+            if on_generation is not None:
+                on_generation(generation, result)
+
+            elites = ranked[:self.elite]
+            population = list(elites)
+            while len(population) < self.population:
+                population.append(self.mutate(self.rng.choice(elites)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Search for the best policy for a game mode")
+    parser.add_argument("--mode", required=True)
+    parser.add_argument("--until", type=int, required=True, help="Target time run_policy plays to")
+    parser.add_argument("--objective", required=True,
+                        help="Expression over resource names, relics, time, game_over, e.g. 'minerals + 2 * gas'")
+    parser.add_argument("--initial", help="Policy JSON file to start the search from")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--population", type=int, default=16)
+    parser.add_argument("--generations", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="best_policy.json", help="Where to write the best policy")
+    args = parser.parse_args()
+
+    debug.set_debug(False)
+    try:
+        optimizer = PolicyOptimizer(args.mode, args.until, args.objective, jobs=args.jobs,
+                                    population=args.population, generations=args.generations, seed=args.seed)
+    except (SyntaxError, ValueError) as e:
+        parser.error(str(e))
+    initial = None
+    if args.initial:
+        with open(args.initial, 'r', encoding='utf-8') as f:
+            initial = Policy.from_dict(json.load(f))
+    result = optimizer.optimize(
+        initial,
+        on_generation=lambda generation, res: print(f"generation {generation}: best {res.best_score}")
+    )
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(result.best_policy.to_dict(), f, indent=2, ensure_ascii=False)
+    print(f"Best score {result.best_score} after {result.evaluations} evaluations "
+          f"({result.cache_hits} cache hits); policy written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Coalesced, asynchronous history persistence.
+A HistoryWriter listens to a GameState's actions during long runs (run_policy).
+A coalescing policy decides which intermediate states become history nodes; those
+are forked on the engine thread and then serialized, hashed and inserted into the
+StateManager on a background thread. New nodes are optionally appended to an NDJSON
+journal on disk in batches, which load_journal turns back into a StateManager.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+from . import debug
+from .game_state import GameState
+from .state_history import StateManager, StateNode
+
+EVERY_CHOICE = "every_choice"
+EVERY_N = "every_n"
+EVERY_TIME_UNIT = "every_time_unit"
+BRANCH_POINTS = "branch_points"
+COALESCE_KINDS = (EVERY_CHOICE, EVERY_N, EVERY_TIME_UNIT, BRANCH_POINTS)
+
+@dataclass
+class CoalescePolicy:
+    """Which states reach the history: every action, every n-th action, the first
+    action of each time unit, or states where more than one choice could be made"""
+    kind: str = EVERY_CHOICE
+    n: int = 10
+
+    def __post_init__(self):
+        if self.kind not in COALESCE_KINDS:
+            raise ValueError(f"Unknown coalescing policy: {self.kind}")
+        if self.n < 1:
+            raise ValueError("n must be at least 1")
+
+def count_playable_choices(game: GameState, limit: int = 2) -> int:
+    """Number of choices that can be made right now, counting at most `limit`"""
+    count = 0
+    for i, card in enumerate(game.active_cards):
+        for j in range(len(card.choices)):
+            if game.can_make_choice(i, j):
+                count += 1
+                if count >= limit:
+                    return count
+    return count
+
+_STOP = object()
+
+class HistoryWriter:
+    """Turns actions of an attached game into history nodes off the engine thread"""
+    def __init__(self, state_manager: StateManager, policy: Optional[CoalescePolicy] = None,
+                 journal_path: Optional[str] = None, batch_size: int = 64,
+                 flush_interval: float = 1.0, max_pending: int = 256):
+        self.state_manager = state_manager
+        self.policy = policy or CoalescePolicy()
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Bounded so a slow disk or serializer eventually slows the engine instead of using unbounded memory
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._batch: List[Dict] = []
+        self._last_write = time.monotonic()
+        self._game: Optional[GameState] = None
+        self._since_commit = 0
+        self._last_commit_time: Optional[int] = None
+        self._error: Optional[BaseException] = None
+        self.stats = {"actions": 0, "committed": 0, "coalesced": 0, "written": 0, "batches": 0}
+
+        if journal_path and (not os.path.exists(journal_path) or os.path.getsize(journal_path) == 0):
+            # A new journal starts with the existing tree so it can be replayed on its own
+            with state_manager.lock:
+                nodes = list(state_manager.nodes.values())
+                self._batch.extend(self._record(node, node.parent_id, node.parents.get(node.parent_id, node.message))
+                                   for node in nodes)
+                # Merge edges last: a second parent can be newer than the node it leads to
+                self._batch.extend(self._record(node, parent_id, message)
+                                   for node in nodes for parent_id, message in list(node.parents.items())[1:])
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    # --- Engine thread ---
+
+    def attach(self, game: GameState) -> None:
+        self._game = game
+        self._last_commit_time = game.current_time
+        game.register_on_action_callback(self.on_action)
+
+    def detach(self) -> None:
+        if self._game is not None:
+            self._game._on_action_callbacks = [cb for cb in self._game._on_action_callbacks if cb != self.on_action]
+            self._game = None
+
+    def on_action(self, game: GameState, message: str = "") -> None:
+        self.stats["actions"] += 1
+        self._since_commit += 1
+        if self._should_commit(game):
+            self.commit(game, message)
+        else:
+            self.stats["coalesced"] += 1
+
+    def _should_commit(self, game: GameState) -> bool:
+        kind = self.policy.kind
+        if kind == EVERY_CHOICE:
+            return True
+        if kind == EVERY_N:
+            return self._since_commit >= self.policy.n
+        if kind == EVERY_TIME_UNIT:
+            return game.current_time != self._last_commit_time
+        return count_playable_choices(game) > 1
+
+    def commit(self, game: GameState, message: str = "") -> None:
+        """Queue the game's current state as a history node"""
+        if self._error is not None:
+            raise RuntimeError("History writer failed") from self._error
+        skipped = self._since_commit - 1
+        if skipped > 0:
+            message = f"{message or 'Policy action'} (+{skipped} coalesced)"
+        self._queue.put((game.fork(), message or "Policy action"))
+        self._since_commit = 0
+        self._last_commit_time = game.current_time
+
+    def flush(self) -> None:
+        """Wait until every queued state is in the StateManager and the journal is written"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        if self._error is not None:
+            raise RuntimeError("History writer failed") from self._error
+
+    def close(self) -> None:
+        """Commit the attached game's final state if it was coalesced away, then stop"""
+        if self._game is not None and self._since_commit > 0:
+            self.commit(self._game, "Policy run finished")
+        self.detach()
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError("History writer failed") from self._error
+
+    # --- Writer thread ---
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._write_batch()
+                continue
+            if item is _STOP:
+                self._write_batch()
+                return
+            if isinstance(item, threading.Event):
+                self._write_batch()
+                item.set()
+                continue
+            if self._error is not None:
+                continue
+            try:
+                snapshot, message = item
+                node = StateNode(json.dumps(snapshot.to_dict()), message=message)
+                with self.state_manager.lock:
+                    parent_id = self.state_manager.current_node_id
+                    node_id = self.state_manager.add_node(node)
+                    # The edge just taken, also for revisited states
+                    record = self._record(self.state_manager.nodes[node_id], parent_id, message)
+                self.stats["committed"] += 1
+                if self.journal_path:
+                    self._batch.append(record)
+                    if len(self._batch) >= self.batch_size or time.monotonic() - self._last_write >= self.flush_interval:
+                        self._write_batch()
+            except Exception as e:
+                self._error = e
+                if debug.enabled:
+                    print(f"[DEBUG][HistoryWriter] failed: {e}")
+
+    @staticmethod
+    def _record(node: StateNode, parent_id: Optional[str], message: str) -> Dict:
+        return {
+            "node_id": node.node_id,
+            "parent_id": parent_id,
+            "message": message,
+            "last_played": node.last_played,
+            "state_dict_json": node.state_dict_json
+        }
+
+    def _write_batch(self) -> None:
+        self._last_write = time.monotonic()
+        if not self._batch or not self.journal_path:
+            self._batch = []
+            return
+        try:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(record) + "\n" for record in self._batch))
+        except OSError as e:
+            self._error = e
+            return
+        self.stats["written"] += len(self._batch)
+        self.stats["batches"] += 1
+        self._batch = []
+
+def load_journal(path: str, config_path: Path, mode: str) -> StateManager:
+    """Rebuild a StateManager from a HistoryWriter journal; the last record becomes current"""
+    manager = StateManager(config_path, mode)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            node_id = record["node_id"]
+            parent_id = record["parent_id"]
+            if node_id in manager.nodes:
+                manager.nodes[node_id].last_played = record["last_played"]
+            else:
+                node = StateNode(record["state_dict_json"], message=record["message"])
+                node.node_id = node_id
+                node.last_played = record["last_played"]
+                if parent_id in manager.nodes:
+                    node.original_depth = manager.nodes[parent_id].original_depth + 1
+                manager.nodes[node_id] = node
+                if parent_id is None and manager.root_node_id is None:
+                    manager.root_node_id = node_id
+            if parent_id in manager.nodes:
+                manager.link(parent_id, node_id, record["message"])
+            manager.current_node_id = node_id
+    return manager
@@ -0,0 +1,181 @@
+"""
+Per-phase engine instrumentation.
+A Profiler keeps counters and timings per phase (draw, passive effects, choice
+resolution, policy lookup, serialization, hashing, callbacks) and can record the
+spans as a Chrome trace-event file. Engine objects hold NULL_PROFILER by default,
+whose only cost is the `enabled` check in `profiled`.
+"""
+import functools
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, List
+
+class PhaseStats:
+    """Count, total and a bounded sample of durations for one phase"""
+    def __init__(self, max_samples: int, rng: random.Random):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+        self._max_samples = max_samples
+        self._rng = rng
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        # Reservoir sampling keeps percentiles representative of the whole run
+        if len(self.samples) < self._max_samples:
+            self.samples.append(duration)
+        else:
+            slot = self._rng.randrange(self.count)
+            if slot < self._max_samples:
+                self.samples[slot] = duration
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q / 100 * len(ordered)))
+        return ordered[index]
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "p50_s": self.percentile(50),
+            "p90_s": self.percentile(90),
+            "p99_s": self.percentile(99),
+            "max_s": self.max
+        }
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+class Profiler:
+    """Collects phase timings and counters; optionally records trace events"""
+    enabled = True
+
+    def __init__(self, trace: bool = False, max_samples: int = 2048, max_trace_events: int = 1_000_000):
+        self.trace = trace
+        self.max_samples = max_samples
+        self.max_trace_events = max_trace_events
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.phases: Dict[str, PhaseStats] = {}
+            self.counters: Dict[str, int] = {}
+            self.trace_events: List[Dict] = []
+            self.dropped_trace_events = 0
+            self.origin = time.perf_counter()
+
+    def phase(self, name: str) -> _Span:
+        """Context manager timing one occurrence of a phase"""
+        return _Span(self, name)
+
+    def record(self, name: str, start: float, duration: float) -> None:
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats(self.max_samples, self._rng)
+            stats.add(duration)
+            if self.trace:
+                if len(self.trace_events) < self.max_trace_events:
+                    self.trace_events.append({
+                        "name": name,
+                        "cat": "engine",
+                        "ph": "X",
+                        "ts": (start - self.origin) * 1e6,
+                        "dur": duration * 1e6,
+                        "pid": os.getpid(),
+                        "tid": threading.get_ident()
+                    })
+                else:
+                    self.dropped_trace_events += 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def stats(self) -> Dict:
+        """Snapshot of all phase statistics and counters"""
+        with self._lock:
+            return {
+                "phases": {name: stats.to_dict() for name, stats in sorted(self.phases.items())},
+                "counters": dict(self.counters)
+            }
+
+    def export_chrome_trace(self, path: str) -> None:
+        """Write the recorded spans as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+        with self._lock:
+            data = {
+                "traceEvents": list(self.trace_events),
+                "displayTimeUnit": "ms",
+                "otherData": {"dropped_events": self.dropped_trace_events}
+            }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+class _NullProfiler:
+    """Profiler stand-in used while profiling is disabled"""
+    enabled = False
+    _span = _NullSpan()
+
+    def phase(self, name: str) -> _NullSpan:
+        return self._span
+
+    def record(self, name: str, start: float, duration: float) -> None:
+        pass
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def stats(self) -> Dict:
+        return {"phases": {}, "counters": {}}
+
+NULL_PROFILER = _NullProfiler()
+
+def profiled(phase: str):
+    """Decorator timing a method as `phase` on `self.profiler` when profiling is enabled"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if not profiler.enabled:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                profiler.record(phase, start, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,234 @@
+"""
+Headless game runner.
+Plays a mode without the GUI, driven by a policy (optionally with a seeded random
+fallback) or by a recorded action log, and reports per-step records and a summary.
+"""
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from . import debug
+from .game_loader import attach_modes, mode_error, published_modes
+from .game_state import GameState, Policy
+
+RANDOM_POLICY = "random"
+
+@dataclass
+class RunSpec:
+    """Everything needed to reproduce one headless run (kept picklable for worker processes)"""
+    mode: str
+    stop_time: Optional[int] = None  # Absolute game time to stop at, None for unlimited
+    policy: Optional[str] = None  # Path to a policy JSON file, or "random"
+    actions: Optional[str] = None  # Path to an NDJSON action log to replay instead of a policy
+    seed: Optional[int] = None  # Seeds the random fallback for cards no rule matches
+    max_steps: int = 100000
+    config_path: str = "config"
+    profile: bool = False  # Include per-phase engine stats in the summary
+    trace_path: Optional[str] = None  # Write a Chrome trace of the run here
+
+def load_policy(path: str) -> Policy:
+    """Load a policy from a JSON file written by Policy.to_dict (a bare rule list also works)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"rules": data}
+    return Policy.from_dict(data)
+
+def load_actions(path: str) -> List[Dict]:
+    """Load an action log. Each NDJSON line needs an "action" key; other keys are ignored."""
+    actions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "action" in record:
+                actions.append(record["action"])
+    return actions
+
+def legal_choices(game: GameState) -> List[tuple]:
+    """All (card_index, choice_index) pairs that can be chosen right now"""
+    return [
+        (i, j)
+        for i, card in enumerate(game.active_cards)
+        for j in range(len(card.choices))
+        if game.can_make_choice(i, j)
+    ]
+
+def choose_action(game: GameState, rng: Optional[random.Random]) -> Optional[Dict]:
+    """Pick the next action with game.policy the way GameState.execute_policy would.
+
+    When no rule matches but choices are available, a random legal choice is taken if
+    an rng is given; otherwise None is returned and the run stops.
+    """
+    if not game.active_cards:
+        return {"type": "advance", "mode": "auto"}
+
+    match = game._find_policy_choice()
+    if match is not None:
+        return {"type": "choice", "card": match[0], "choice": match[1]}
+
+    choices = legal_choices(game)
+    if not choices:
+        return {"type": "manual_advance", "amount": 1}
+    if rng is not None:
+        card_index, choice_index = rng.choice(choices)
+        return {"type": "choice", "card": card_index, "choice": choice_index}
+    return None
+
+def apply_action(game: GameState, action: Dict) -> bool:
+    """Apply an action record to the game. Returns False if the engine refused it."""
+    action_type = action["type"]
+    if action_type == "choice":
+        return game.make_choice(action["card"], action["choice"])
+    if action_type == "advance":
+        return game.advance_time(mode=action.get("mode", "auto"))
+    if action_type == "manual_advance":
+        return game.manual_time_advance(action.get("amount", 1))
+    raise ValueError(f"Unknown action type: {action_type}")
+
+def describe_action(game: GameState, action: Dict) -> Dict:
+    """Add card title and choice description to a choice action (before it is applied)"""
+    if action["type"] != "choice":
+        return dict(action)
+    card = game.active_cards[action["card"]]
+    return dict(action, card_title=card.title,
+                choice_description=card.choices[action["choice"]]["description"])
+
+def iter_run(spec: RunSpec, game: Optional[GameState] = None) -> Iterator[Dict]:
+    """Run a game and yield one record per step, followed by a final summary record"""
+    if game is None:
+        game = GameState(Path(spec.config_path), spec.mode)
+        game.set_undo_limit(0)
+    rng = random.Random(spec.seed) if spec.seed is not None or spec.policy == RANDOM_POLICY else None
+    if spec.policy and spec.policy != RANDOM_POLICY:
+        game.policy = load_policy(spec.policy)
+    if spec.profile or spec.trace_path:
+        game.enable_profiling(trace=bool(spec.trace_path))
+    actions = iter(load_actions(spec.actions)) if spec.actions else None
+
+    step = 0
+    stop_reason = "max_steps"
+    while step < spec.max_steps:
+        if spec.stop_time is not None and game.current_time >= spec.stop_time:
+            stop_reason = "stop_time"
+            break
+        if game.is_game_over():
+            stop_reason = "game_over"
+            break
+        if actions is not None:
+            action = next(actions, None)
+            if action is None:
+                stop_reason = "end_of_actions"
+                break
+        else:
+            action = choose_action(game, rng)
+            if action is None:
+                stop_reason = "no_matching_rule"
+                break
+
+        record_action = describe_action(game, action)
+        try:
+            ok = apply_action(game, action)
+        except Exception as e:
+            # Config errors (e.g. a next_cards link to a missing card) end this run only
+            summary = finish_run(spec, game, step, "error")
+            summary["error"] = f"{type(e).__name__}: {e}"
+            yield summary
+            return
+        step += 1
+        yield {
+            "record": "step",
+            "step": step,
+            "time": game.current_time,
+            "action": record_action,
+            "ok": ok,
+            "resources": dict(game.resources)
+        }
+        if not ok and action["type"] != "choice":
+            stop_reason = "stuck"
+            break
+
+    yield finish_run(spec, game, step, stop_reason)
+
+def finish_run(spec: RunSpec, game: GameState, steps: int, stop_reason: str) -> Dict:
+    """Build the summary record and write the trace, if one was requested"""
+    summary = summarize(spec, game, steps, stop_reason)
+    if spec.profile:
+        summary["stats"] = game.stats()
+    if spec.trace_path:
+        game.profiler.export_chrome_trace(spec.trace_path)
+    return summary
+
+def summarize(spec: RunSpec, game: GameState, steps: int, stop_reason: str) -> Dict:
+    return {
+        "record": "summary",
+        "spec": asdict(spec),
+        "steps": steps,
+        "stop_reason": stop_reason,
+        "game_over": game.is_game_over(),
+        "final_time": game.current_time,
+        "resources": dict(game.resources),
+        "relics": {relic.name: relic.count for relic in game.relics}
+    }
+
+def failed_summary(spec: RunSpec, error: str) -> Dict:
+    """Summary record of a run whose mode couldn't be loaded"""
+    return {"record": "summary", "spec": asdict(spec), "steps": 0, "stop_reason": "error", "error": error}
+
+def run_game(spec: RunSpec, on_step: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Run a game to completion and return its summary record"""
+    for record in iter_run(spec):
+        if record["record"] == "summary":
+            return record
+        if on_step is not None:
+            on_step(record)
+
+def _worker_init(mode_handles: List[Dict]) -> None:
+    debug.set_debug(False)
+    attach_modes(mode_handles)
+
+def _run_in_worker(spec: RunSpec, with_steps: bool) -> List[Dict]:
+    if with_steps:
+        return list(iter_run(spec))
+    return [run_game(spec)]
+
+def run_many(specs: Iterable[RunSpec], jobs: int = 1, with_steps: bool = False) -> Iterator[Dict]:
+    """Run many specs, in a process pool when jobs > 1.
+
+    Records of a run are yielded together; with several jobs runs are yielded in
+    completion order, so every record carries the index of its spec as "run". Runs of
+    a mode that can't be loaded yield only a failed_summary record.
+    """
+    specs = list(specs)
+    if jobs <= 1:
+        errors: Dict[tuple, Optional[str]] = {}
+        for run_index, spec in enumerate(specs):
+            key = (spec.mode, str(spec.config_path))
+            if key not in errors:
+                errors[key] = mode_error(spec.mode, Path(spec.config_path))
+            if errors[key] is not None:
+                yield dict(failed_summary(spec, errors[key]), run=run_index)
+                continue
+            for record in (iter_run(spec) if with_steps else [run_game(spec)]):
+                yield dict(record, run=run_index)
+        return
+
+    # Workers take the parsed modes from shared memory instead of re-reading the YAML
+    with published_modes((spec.mode, spec.config_path) for spec in specs) as handles, \
+            ProcessPoolExecutor(max_workers=jobs, initializer=_worker_init, initargs=(handles,)) as executor:
+        failed = {run_index: handles.failures.get((spec.mode, str(spec.config_path)))
+                  for run_index, spec in enumerate(specs)}
+        futures = {
+            executor.submit(_run_in_worker, spec, with_steps): run_index
+            for run_index, spec in enumerate(specs) if failed[run_index] is None
+        }
+        for run_index, error in failed.items():
+            if error is not None:
+                yield dict(failed_summary(specs[run_index], error), run=run_index)
+        for future in as_completed(futures):
+            for record in future.result():
+                yield dict(record, run=futures[future])
@@ -0,0 +1,447 @@
+"""
+Asyncio HTTP server for the /api/v1 contract.
+Hosts many GameState sessions in memory. Each session has its own StateManager and
+lock; all sessions of a mode are forked from one loaded template so they share its
+config. Engine work runs in a thread pool so slow policy runs don't block the loop.
+
+Run with `python -m backend.server --port 8000`.
+"""
+import argparse
+import asyncio
+import json
+import re
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+from . import debug
+from .events import BLOCK, DROP_OLDEST, EVENT_KINDS, Subscription
+from .game_loader import GameLoader
+from .game_state import GameState, Policy
+from .runner import apply_action, legal_choices
+from .state_history import StateManager
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"
+}
+MAX_BODY = 1024 * 1024
+MAX_POLICY_SPAN = 1000  # Game time units one run_policy or manual_advance request may cover
+MAX_SESSIONS = 10000
+SESSION_TTL = 30 * 60.0  # Seconds a session may sit unused before it is evicted
+# With overflow=block, a stalled event stream holds a session's engine for at most this
+# many seconds in total; after that the stream drops its oldest events instead
+STREAM_STALL_BUDGET = 1.0
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.errors = errors or []
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, List[str]]
+    headers: Dict[str, str]
+    body: bytes
+    params: Tuple[str, ...] = ()
+
+    def json(self) -> Dict:
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise HttpError(400, "Request body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Request body must be a JSON object")
+        return data
+
+@dataclass
+class StreamResponse:
+    """Handler result streamed as a chunked NDJSON body instead of the JSON envelope"""
+    subscription: Subscription
+
+    async def lines(self) -> AsyncIterator[bytes]:
+        async for event in self.subscription:
+            yield event.to_json().encode() + b"\n"
+
+    def close(self) -> None:
+        self.subscription.close()
+
+@dataclass
+class Session:
+    session_id: str
+    token: str
+    mode: str
+    game: GameState
+    state_manager: StateManager
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    created: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+
+def state_payload(session: Session) -> Dict:
+    """Public view of a session's game (event history is served separately)"""
+    game = session.game
+    state = game.to_dict()
+    state.pop("event_history")
+    return {
+        "session_id": session.session_id,
+        "mode": session.mode,
+        "state": state,
+        "game_over": game.is_game_over(),
+        "legal_choices": [list(pair) for pair in legal_choices(game)],
+        "node_id": session.state_manager.current_node_id
+    }
+
+class GameServer:
+    """Routes /api/v1 requests to in-memory sessions"""
+    def __init__(self, config_path: Path = Path("config"), workers: int = 8, max_sessions: int = MAX_SESSIONS,
+                 session_ttl: float = SESSION_TTL, max_policy_span: int = MAX_POLICY_SPAN):
+        self.config_path = Path(config_path)
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.max_policy_span = max_policy_span
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="engine")
+        self.sessions: Dict[str, Session] = {}
+        self.tokens: Dict[str, str] = {}  # token -> session id
+        self.players: Dict[str, Dict] = {}
+        self._templates: Dict[str, asyncio.Future] = {}  # mode -> initial GameState shared by sessions
+        self.routes: List[Tuple[str, re.Pattern, Callable[[Request], Awaitable[Tuple[int, Dict, str]]]]] = [
+            ("POST", re.compile(r"^/api/v1/sessions$"), self.create_session),
+            ("DELETE", re.compile(r"^/api/v1/sessions$"), self.delete_session),
+            ("GET", re.compile(r"^/api/v1/game/state$"), self.get_state),
+            ("POST", re.compile(r"^/api/v1/game/action$"), self.post_action),
+            ("GET", re.compile(r"^/api/v1/game/history$"), self.get_history),
+            ("GET", re.compile(r"^/api/v1/game/events$"), self.stream_events),
+            ("POST", re.compile(r"^/api/v1/players$"), self.create_player),
+            ("GET", re.compile(r"^/api/v1/players/([^/]+)$"), self.get_player),
+            ("PUT", re.compile(r"^/api/v1/players/([^/]+)$"), self.update_player),
+        ]
+
+    async def run_engine(self, fn, *args):
+        """Run blocking engine work in the thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def template_for(self, mode: str) -> GameState:
+        """Initial state of a mode, loaded once and shared by every session of that mode"""
+        if mode not in self._templates:
+            if mode not in GameLoader.get_available_modes(self.config_path):
+                raise HttpError(400, f"Unknown mode '{mode}'")
+            loop = asyncio.get_running_loop()
+            self._templates[mode] = loop.run_in_executor(self.executor, GameState, self.config_path, mode)
+        try:
+            return await self._templates[mode]
+        except RuntimeError as e:
+            self._templates.pop(mode, None)
+            raise HttpError(500, str(e))
+
+    def session_for(self, request: Request) -> Session:
+        """Find the session of the request's bearer token"""
+        auth = request.headers.get("authorization", "")
+        scheme, _, token = auth.partition(" ")
+        if scheme.lower() != "bearer" or token not in self.tokens:
+            raise HttpError(401, "Missing or invalid session token")
+        session = self.sessions[self.tokens[token]]
+        session.last_used = time.time()
+        return session
+
+    # --- Session management ---
+
+    def _remove_session(self, session: Session) -> None:
+        self.sessions.pop(session.session_id, None)
+        self.tokens.pop(session.token, None)
+        for subscription in session.game.events.subscriptions:
+            subscription.close()
+
+    def evict_idle(self) -> int:
+        """Drop sessions unused for session_ttl seconds (skipping any busy with a request)"""
+        cutoff = time.time() - self.session_ttl
+        idle = [session for session in self.sessions.values()
+                if session.last_used < cutoff and not session.lock.locked()]
+        for session in idle:
+            self._remove_session(session)
+        return len(idle)
+
+    async def evict_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self.session_ttl / 4))
+            self.evict_idle()
+
+    async def create_session(self, request: Request):
+        body = request.json()
+        mode = body.get("mode")
+        if not mode:
+            raise HttpError(400, "Field 'mode' is required", ["mode"])
+        if len(self.sessions) >= self.max_sessions and not self.evict_idle():
+            raise HttpError(503, f"Session limit of {self.max_sessions} reached")
+        template = await self.template_for(mode)
+
+        def build():
+            game = template.fork()
+            manager = StateManager(self.config_path, mode)
+            manager.initialize(game)
+            return game, manager
+
+        game, manager = await self.run_engine(build)
+        session = Session(session_id=secrets.token_hex(8), token=secrets.token_urlsafe(24),
+                          mode=mode, game=game, state_manager=manager)
+        self.sessions[session.session_id] = session
+        self.tokens[session.token] = session.session_id
+        data = state_payload(session)
+        data["token"] = session.token
+        return 201, data, "Session created"
+
+    async def delete_session(self, request: Request):
+        session = self.session_for(request)
+        async with session.lock:
+            self._remove_session(session)
+        return 200, {"session_id": session.session_id}, "Session deleted"
+
+    # --- Game state ---
+
+    async def get_state(self, request: Request):
+        session = self.session_for(request)
+        async with session.lock:
+            return 200, state_payload(session), ""
+
+    async def post_action(self, request: Request):
+        session = self.session_for(request)
+        action = request.json()
+        action_type = action.get("type")
+        if action_type not in ("choice", "advance", "manual_advance", "run_policy"):
+            raise HttpError(400, "Field 'type' must be one of choice, advance, manual_advance, run_policy", ["type"])
+        if action_type == "choice" and not all(isinstance(action.get(key), int) for key in ("card", "choice")):
+            raise HttpError(400, "Choice actions need integer 'card' and 'choice'", ["card", "choice"])
+        if action_type == "manual_advance":
+            amount = action.get("amount", 1)
+            if not isinstance(amount, int) or isinstance(amount, bool) or not 0 < amount <= self.max_policy_span:
+                raise HttpError(400, f"'amount' must be an integer from 1 to {self.max_policy_span}", ["amount"])
+
+        def act():
+            game = session.game
+            if action_type == "run_policy":
+                if "rules" in action:
+                    game.policy = Policy.from_dict({"rules": action["rules"]})
+                game.policy.set_target_time(f"+{span}", game.current_time)
+                before = game.current_time
+                game.run_policy()
+                ok = True
+                message = f"Ran policy from {before} to {game.current_time}"
+            else:
+                ok = apply_action(game, action)
+                message = f"{action_type} at time {game.current_time}"
+            if ok:
+                session.state_manager.save_state(game, message=message)
+            return ok
+
+        async with session.lock:
+            if action_type == "run_policy":
+                span = self.policy_span(action.get("until", "+10"), session.game.current_time)
+            try:
+                ok = await self.run_engine(act)
+            except (KeyError, ValueError) as e:
+                raise HttpError(409, f"Action failed: {e}")
+            data = state_payload(session)
+        data["ok"] = ok
+        return 200, data, "" if ok else "Action was not allowed in the current state"
+
+    def policy_span(self, until: Union[str, int], current_time: int) -> int:
+        """Time units a run_policy request may run for: "+N" (relative) or "N" (absolute),
+        capped at max_policy_span. Unlimited runs ("-1") would pin an engine thread."""
+        text = str(until).strip()
+        try:
+            value = int(text[1:]) if text.startswith("+") else int(text)
+        except ValueError:
+            raise HttpError(400, "'until' must be +N (relative) or N (absolute game time)", ["until"])
+        span = value if text.startswith("+") else value - current_time
+        if span < 0 or text == "-1":
+            raise HttpError(400, "'until' must not be before the current time (unlimited runs are not served)",
+                            ["until"])
+        return min(span, self.max_policy_span)
+
+    async def get_history(self, request: Request):
+        session = self.session_for(request)
+        async with session.lock:
+            return 200, {
+                "current_node_id": session.state_manager.current_node_id,
+                "root_node_id": session.state_manager.root_node_id,
+                "nodes": session.state_manager.get_tree_structure()
+            }, ""
+
+    async def stream_events(self, request: Request):
+        """Engine events of the session as NDJSON. Query: kinds (comma-separated),
+        maxsize, overflow (drop_oldest or block)."""
+        session = self.session_for(request)
+        kinds = [kind for kind in request.query.get("kinds", [""])[0].split(",") if kind]
+        unknown = [kind for kind in kinds if kind not in EVENT_KINDS]
+        if unknown:
+            raise HttpError(400, f"Unknown event kinds: {', '.join(unknown)}", ["kinds"])
+        overflow = request.query.get("overflow", [DROP_OLDEST])[0]
+        if overflow not in (BLOCK, DROP_OLDEST):
+            raise HttpError(400, "overflow must be drop_oldest or block", ["overflow"])
+        try:
+            maxsize = int(request.query.get("maxsize", ["1024"])[0])
+        except ValueError:
+            raise HttpError(400, "maxsize must be an integer", ["maxsize"])
+        subscription = session.game.events.subscribe(maxsize=max(1, maxsize), overflow=overflow,
+                                                     kinds=kinds or None, stall_budget=STREAM_STALL_BUDGET)
+        return 200, StreamResponse(subscription), ""
+
+    # --- Player management ---
+
+    async def create_player(self, request: Request):
+        body = request.json()
+        if not body.get("name"):
+            raise HttpError(400, "Field 'name' is required", ["name"])
+        player = {"id": secrets.token_hex(6), "name": body["name"], "created": time.time()}
+        self.players[player["id"]] = player
+        return 201, player, "Player created"
+
+    async def get_player(self, request: Request):
+        player = self.players.get(request.params[0])
+        if player is None:
+            raise HttpError(404, "Player not found")
+        return 200, player, ""
+
+    async def update_player(self, request: Request):
+        player = self.players.get(request.params[0])
+        if player is None:
+            raise HttpError(404, "Player not found")
+        body = request.json()
+        if "name" in body:
+            player["name"] = body["name"]
+        return 200, player, "Player updated"
+
+    # --- HTTP plumbing ---
+
+    async def dispatch(self, request: Request) -> Tuple[int, Union[Dict, StreamResponse]]:
+        allowed = False
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            allowed = True
+            if method != request.method:
+                continue
+            request.params = match.groups()
+            try:
+                status, data, message = await handler(request)
+            except HttpError as e:
+                return e.status, {"status": "error", "data": {}, "message": e.message, "errors": e.errors}
+            except Exception as e:
+                return 500, {"status": "error", "data": {}, "message": f"{type(e).__name__}: {e}", "errors": []}
+            if isinstance(data, StreamResponse):
+                return status, data
+            return status, {"status": "success", "data": data, "message": message, "errors": []}
+        if allowed:
+            return 405, {"status": "error", "data": {}, "message": "Method not allowed", "errors": []}
+        return 404, {"status": "error", "data": {}, "message": "Not found", "errors": []}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    # The body is left unread, so the connection can't be reused
+                    await self.write_json(writer, 413, {"status": "error", "data": {},
+                                                        "message": f"Request body over {MAX_BODY} bytes",
+                                                        "errors": []}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                url = urlsplit(target)
+                request = Request(method=method.upper(), path=url.path, query=parse_qs(url.query),
+                                  headers=headers, body=body)
+                status, payload = await self.dispatch(request)
+                if isinstance(payload, StreamResponse):
+                    await self.write_stream(writer, status, payload)
+                    break
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self.write_json(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def write_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def write_stream(self, writer: asyncio.StreamWriter, status: int, stream: StreamResponse) -> None:
+        """Send a chunked NDJSON response until the client disconnects"""
+        try:
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/x-ndjson\r\n"
+                f"Transfer-Encoding: chunked\r\n"
+                f"Connection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            async for line in stream.lines():
+                writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            stream.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=4096)
+        print(f"Serving /api/v1 on http://{host}:{port}")
+        evictor = asyncio.create_task(self.evict_periodically())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the game over the /api/v1 HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=8, help="Threads for engine work")
+    parser.add_argument("--config", default="config", help="Config directory")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--session-ttl", type=float, default=SESSION_TTL, help="Seconds before an idle session is evicted")
+    parser.add_argument("--max-policy-span", type=int, default=MAX_POLICY_SPAN,
+                        help="Game time units one run_policy or manual_advance request may cover")
+    args = parser.parse_args()
+
+    debug.set_debug(False)
+    server = GameServer(Path(args.config), workers=args.workers, max_sessions=args.max_sessions,
+                        session_ttl=args.session_ttl, max_policy_span=args.max_policy_span)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
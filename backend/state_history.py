@@ -1,39 +1,255 @@
 import uuid
 import time
+import threading
 import json
-import hashlib
-from typing import Dict, Optional, List
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, List, Set, Tuple
 from pathlib import Path
-from backend.game_state import GameState
+from backend.game_state import GameState, Policy, continuation_hash
+from backend import debug
+from backend.profiling import NULL_PROFILER, Profiler
 
 class StateNode:
-    """Represents a single state in the game's history"""
+    """Represents a single state in the game's history.
+
+    Ids are hashes of everything that determines how the game continues (time and
+    effect timers included, see GameState.state_hash), so a state reached along
+    several lines is one node with several parents. `parents` maps each parent id to the action that led from it (in
+    the order the edges were found; the first is the primary parent) and `message`
+    stays the action the state was first reached with.
+    """
     def __init__(self, state_dict_json: str, parent_id: Optional[str] = None, message: str = ""):
-        # Generate state hash from the state data
-        state_dict = json.loads(state_dict_json)
-        # Create a hashable string from the state
-        state_str = json.dumps({
-            'resources': state_dict['resources'],
-            'relics': state_dict['relics'],
-            'active_cards': state_dict['active_cards'],
-            'card_queue': state_dict['card_queue']
-        }, sort_keys=True)  # sort_keys to ensure consistent ordering
-        self.node_id = hashlib.sha256(state_str.encode()).hexdigest()[:8]  # Use first 8 chars for readability
+        self.node_id = continuation_hash(json.loads(state_dict_json))
         
-        self.parent_id = parent_id
+        self.parents: Dict[str, str] = {parent_id: message} if parent_id else {}
         self.child_ids: List[str] = []
         self.last_played = time.time()  # Renamed from timestamp to last_played
         self.message = message
         self.state_dict_json = state_dict_json
+        self.label: Optional[str] = None  # Set by the user; labelled nodes survive garbage collection
+        # Depth below its parent when the node was added; unlike the DAG depth it doesn't
+        # shrink when garbage collection splices out ancestors, so keep_every_n stays stable
+        self.original_depth = 0
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        """The primary parent: the one the state was first reached from"""
+        return next(iter(self.parents), None)
+
+    @property
+    def is_merge(self) -> bool:
+        return len(self.parents) > 1
+
+@dataclass
+class _DagIndex:
+    """Memoized per-node facts about the history DAG, rebuilt after merges and removals"""
+    depth: Dict[str, int]  # Fewest actions from a root
+    level: Dict[str, int]  # Most actions from a root; ancestors always have a lower level
+    via: Dict[str, Optional[str]]  # Parent on a shortest path from a root
+    paths: Dict[str, int]  # Number of distinct paths from a root
+    ancestors: Dict[Tuple[str, str], bool]  # Memoized is_ancestor answers
+    lift: List[Dict[str, Optional[str]]] = field(default_factory=list)  # lift[k][node]: 2**k steps up `via`
+
+@dataclass(frozen=True)
+class StateSummary:
+    """The parts of a snapshot compare looks at, decoded once per node"""
+    time: int
+    resources: Tuple[Tuple[str, int], ...]
+    relics: Tuple[Tuple[str, int], ...]  # (name, count)
+    active_cards: Tuple[str, ...]  # Titles, repeated for stacked cards
+    card_queue: Tuple[Tuple[str, int], ...]  # (title, drawed_at)
+
+    @classmethod
+    def from_json(cls, state_dict_json: str) -> 'StateSummary':
+        data = json.loads(state_dict_json)
+        return cls(
+            time=data['current_time'],
+            resources=tuple(data['resources'].items()),
+            relics=tuple((relic['name'], relic['count']) for relic in data['relics']),
+            active_cards=tuple(card['title'] for card in data['active_cards']
+                               for _ in range(card.get('stack_count', 1))),
+            card_queue=tuple((card['title'], card['drawed_at']) for card in data['card_queue'])
+        )
+
+def _changed(a: Dict, b: Dict) -> Dict:
+    return {key: (a.get(key, 0), b.get(key, 0)) for key in list(a) + [key for key in b if key not in a]
+            if a.get(key, 0) != b.get(key, 0)}
+
+def _only(a: Counter, b: Counter) -> Tuple[List, List]:
+    return sorted((a - b).elements()), sorted((b - a).elements())
+
+@dataclass
+class StateComparison:
+    node_a: str
+    node_b: str
+    ancestor: Optional[str]  # Lowest common ancestor on the shortest-path tree; None if unrelated
+    time: Tuple[int, int]
+    resources: Dict[str, Tuple[int, int]]  # Only what differs, as (a, b)
+    relics: Dict[str, Tuple[int, int]]  # Counts, 0 when missing
+    active_cards: Tuple[List[str], List[str]]  # Titles only in a, only in b
+    card_queue: Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]
+    actions_a: List[str]  # Actions from the ancestor to node_a
+    actions_b: List[str]
+
+    @property
+    def identical(self) -> bool:
+        return self.node_a == self.node_b
+
+    def describe(self) -> List[str]:
+        """Human readable lines"""
+        lines = [f"{self.node_a} (t={self.time[0]}) vs {self.node_b} (t={self.time[1]})"]
+        if self.ancestor is None:
+            lines.append("No common ancestor")
+        else:
+            lines.append(f"Common ancestor {self.ancestor}, {len(self.actions_a)} and "
+                         f"{len(self.actions_b)} actions ago")
+        for name, (a, b) in self.resources.items():
+            lines.append(f"Resource {name}: {a} -> {b} ({b - a:+d})")
+        for name, (a, b) in self.relics.items():
+            lines.append(f"Relic {name}: {a} -> {b} ({b - a:+d})")
+        queued = [[f"{title} (t={drawed_at})" for title, drawed_at in cards] for cards in self.card_queue]
+        for label, (only_a, only_b) in (("Active cards", self.active_cards), ("Queued cards", queued)):
+            if only_a:
+                lines.append(f"{label} only in {self.node_a}: {', '.join(only_a)}")
+            if only_b:
+                lines.append(f"{label} only in {self.node_b}: {', '.join(only_b)}")
+        for node_id, actions in ((self.node_a, self.actions_a), (self.node_b, self.actions_b)):
+            if actions:
+                lines.append(f"Actions to {node_id}:")
+                lines.extend(f"  {action}" for action in actions)
+        return lines
+
+@dataclass
+class RetentionPolicy:
+    """Which history nodes survive garbage collection. The root, the current node, branch
+    points and nodes reached from several parents are always kept; any other node is kept
+    if one of the enabled rules keeps it."""
+    keep_branch_tips: bool = True  # Leaves, where each explored line ends
+    keep_every_n: int = 0  # Every n-th node by depth, so linear runs keep a sparse trail (0: off)
+    keep_labelled: bool = True
+    keep_last: int = 50  # The K most recently played nodes
+    max_nodes: Optional[int] = None  # Collect in the background whenever the tree grows past this
+
+    def __post_init__(self):
+        if self.keep_every_n < 0 or self.keep_last < 0:
+            raise ValueError("keep_every_n and keep_last can't be negative")
+
+@dataclass
+class GcReport:
+    nodes_before: int
+    removed: int
+    bytes_reclaimed: int  # Serialized state size of the removed nodes
+    batches: int
+    seconds: float
+
+class StateCache:
+    """Bounded LRU of materialized states by node id.
+
+    Sizes are the length of the node's serialized state, a cheap proxy for the memory
+    a materialized copy takes. Callers always get a fork, so cached states are never
+    modified.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 512):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[GameState, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetched = 0
+
+    def __contains__(self, node_id: str) -> bool:
+        with self._lock:
+            return node_id in self._entries
+
+    def get(self, node_id: str) -> Optional[GameState]:
+        with self._lock:
+            entry = self._entries.get(node_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(node_id)
+            self.hits += 1
+        state = entry[0].fork()
+        state.policy = Policy()  # Forks share the policy; a loaded state gets its own, like from_dict
+        return state
+
+    def put(self, node_id: str, state: GameState, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(node_id, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[node_id] = (state, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def discard(self, node_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(node_id, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "prefetched": self.prefetched
+            }
 
 class StateManager:
     """Manages the tree of game states"""
-    def __init__(self, config_path: Path, mode: str):
+    def __init__(self, config_path: Path, mode: str, cache_bytes: int = 64 * 1024 * 1024,
+                 prefetch: bool = True):
         self.nodes: Dict[str, StateNode] = {}
         self.current_node_id: Optional[str] = None
         self.root_node_id: Optional[str] = None
         self.config_path = config_path
         self.mode = mode
+        self.profiler = NULL_PROFILER  # Replaced by enable_profiling()
+        self.lock = threading.RLock()  # Guards the tree; HistoryWriter inserts from its own thread
+        self.cache = StateCache(max_bytes=cache_bytes)
+        self.prefetch = prefetch  # Materialize the parent and children of a loaded node in the background
+        self._prefetcher: Optional[ThreadPoolExecutor] = None
+        self.retention: Optional[RetentionPolicy] = None  # Enables background collection past retention.max_nodes
+        self._collector: Optional[ThreadPoolExecutor] = None
+        self._collection: Optional[Future] = None
+        self.gc_stats = {"runs": 0, "removed": 0, "bytes_reclaimed": 0}
+        # revisits: saves of a state already in the history (its snapshot isn't stored again);
+        # back_edges: revisits of an ancestor, not linked because the history must stay acyclic
+        self.dag_stats = {"revisits": 0, "merges": 0, "back_edges": 0, "deduplicated_bytes": 0}
+        self._index: Optional[_DagIndex] = None
+        self._summaries: "OrderedDict[str, StateSummary]" = OrderedDict()
+
+    def enable_profiling(self, profiler: Optional[Profiler] = None, trace: bool = False) -> Profiler:
+        """Start timing serialization and hashing. Pass the game's profiler to share one trace."""
+        self.profiler = profiler or Profiler(trace=trace)
+        return self.profiler
+
+    def disable_profiling(self) -> None:
+        self.profiler = NULL_PROFILER
+
+    def stats(self) -> Dict:
+        """Counters and timings per history phase (empty while profiling is disabled)"""
+        return self.profiler.stats()
 
     def initialize(self, initial_game_state: GameState) -> None:
         """Initialize the state manager with the initial game state"""
@@ -44,102 +260,528 @@ class StateManager:
             self.nodes[root_node.node_id] = root_node
             self.root_node_id = root_node.node_id
             self.current_node_id = root_node.node_id
-            print(f"History initialized with root node: {self.root_node_id}")
+            self._index = None
+            if debug.enabled:
+                print(f"History initialized with root node: {self.root_node_id}")
 
     def save_state(self, current_game_state: GameState, message: str = "") -> str:
-        print(f"[DEBUG][STATE_MANAGER] save_state called, message: {message}")
+        if debug.enabled:
+            print(f"[DEBUG][STATE_MANAGER] save_state called, message: {message}")
         if self.current_node_id is None:
             raise Exception("StateManager not initialized.")
 
         parent_id = self.current_node_id
-        state_dict = current_game_state.to_dict()
-        state_json = json.dumps(state_dict)
+        with self.profiler.phase("serialization"):
+            state_dict = current_game_state.to_dict()
+            state_json = json.dumps(state_dict)
 
         # Create new node
-        new_node = StateNode(state_json, parent_id=parent_id, message=message)
-        
+        with self.profiler.phase("hashing"):
+            new_node = StateNode(state_json, parent_id=parent_id, message=message)
+        self.profiler.count("save_state")
+        return self.add_node(new_node)
+
+    def add_node(self, new_node: StateNode) -> str:
+        """Insert an already serialized and hashed node below the current node and make it current"""
+        with self.lock:
+            return self._add_node(new_node)
+
+    def _add_node(self, new_node: StateNode) -> str:
+        message = new_node.message
+        parent_id = self.current_node_id
+        node_id = new_node.node_id
+
         # Check if this state already exists
-        if new_node.node_id in self.nodes:
-            # Update the existing node's last_played and message
-            existing_node = self.nodes[new_node.node_id]
+        existing_node = self.nodes.get(node_id)
+        if existing_node is not None:
             existing_node.last_played = time.time()
-            existing_node.message = message
-            # Update parent-child relationship if needed
-            if parent_id and new_node.node_id not in self.nodes[parent_id].child_ids:
-                self.nodes[parent_id].child_ids.append(new_node.node_id)
-            self.current_node_id = new_node.node_id
-            print(f"[DEBUG][STATE_MANAGER] Updated existing state: {new_node.node_id}")
-            return new_node.node_id
+            self.dag_stats["revisits"] += 1
+            self.dag_stats["deduplicated_bytes"] += len(new_node.state_dict_json)
+            if parent_id and parent_id != node_id:
+                self.link(parent_id, node_id, message)
+            self.current_node_id = node_id
+            if debug.enabled:
+                print(f"[DEBUG][STATE_MANAGER] Updated existing state: {node_id}")
+            return node_id
         
         # If it's a new state, add it to the tree
-        self.nodes[new_node.node_id] = new_node
+        new_node.parents = {}
+        new_node.original_depth = self.nodes[parent_id].original_depth + 1 if parent_id else 0
+        self.nodes[node_id] = new_node
         if parent_id:
-            self.nodes[parent_id].child_ids.append(new_node.node_id)
-        self.current_node_id = new_node.node_id
-        print(f"[DEBUG][STATE_MANAGER] Saved new state: {new_node.node_id}")
-        return new_node.node_id
+            self.link(parent_id, node_id, message)
+        else:
+            self._index = None
+        self.current_node_id = node_id
+        if debug.enabled:
+            print(f"[DEBUG][STATE_MANAGER] Saved new state: {node_id}")
+        if self.retention is not None and self.retention.max_nodes is not None \
+                and len(self.nodes) > self.retention.max_nodes:
+            self.collect_in_background()
+        return node_id
+
+    def link(self, parent_id: str, child_id: str, message: str = "") -> bool:
+        """Record that `message` leads from one state to another. Returns False when the
+        edge is already known or would close a cycle (the child is an ancestor of the parent)."""
+        with self.lock:
+            parent = self.nodes[parent_id]
+            child = self.nodes[child_id]
+            if parent_id in child.parents:
+                return False
+            if parent_id == child_id or (child.child_ids and self.is_ancestor(child_id, parent_id)):
+                self.dag_stats["back_edges"] += 1
+                return False
+            merge = bool(child.parents)
+            child.parents[parent_id] = message
+            parent.child_ids.append(child_id)
+            index = self._index
+            if merge or child.child_ids or index is None or parent_id not in index.depth:
+                self._index = None
+                if merge:
+                    self.dag_stats["merges"] += 1
+                    if debug.enabled:
+                        print(f"[DEBUG][STATE_MANAGER] Lines merge at {child_id} "
+                              f"({len(child.parents)} parents)")
+            else:
+                # A new leaf: extend the index instead of rebuilding it
+                index.depth[child_id] = index.depth[parent_id] + 1
+                index.level[child_id] = index.level[parent_id] + 1
+                index.via[child_id] = parent_id
+                index.paths[child_id] = index.paths[parent_id]
+                if index.lift and index.depth[child_id] >= 2 ** len(index.lift):
+                    index.lift = []  # Deeper than the tables reach; rebuilt on next use
+                if index.lift:
+                    above = parent_id
+                    for table in index.lift:
+                        table[child_id] = above
+                        above = table.get(above) if above is not None else None
+            return True
+
+    def _dag_index(self) -> _DagIndex:
+        """Depth, level, shortest-path parent and path count of every node, in one
+        topological pass after the history changed shape"""
+        if self._index is not None:
+            return self._index
+        indegree = {node_id: sum(1 for parent_id in node.parents if parent_id in self.nodes)
+                    for node_id, node in self.nodes.items()}
+        ready = deque(node_id for node_id, count in indegree.items() if count == 0)
+        depth: Dict[str, int] = {}
+        level: Dict[str, int] = {}
+        via: Dict[str, Optional[str]] = {}
+        paths: Dict[str, int] = {}
+        while ready:
+            node_id = ready.popleft()
+            parents = [parent_id for parent_id in self.nodes[node_id].parents if parent_id in self.nodes]
+            if parents:
+                nearest = min(parents, key=lambda parent_id: depth[parent_id])
+                depth[node_id] = depth[nearest] + 1
+                level[node_id] = max(level[parent_id] for parent_id in parents) + 1
+                via[node_id] = nearest
+                paths[node_id] = sum(paths[parent_id] for parent_id in parents)
+            else:
+                depth[node_id], level[node_id], via[node_id], paths[node_id] = 0, 0, None, 1
+            for child_id in self.nodes[node_id].child_ids:
+                if child_id in indegree:
+                    indegree[child_id] -= 1
+                    if indegree[child_id] == 0:
+                        ready.append(child_id)
+        self._index = _DagIndex(depth, level, via, paths, {})
+        return self._index
+
+    def depth(self, node_id: str) -> int:
+        """Fewest actions from the root to the node"""
+        with self.lock:
+            return self._dag_index().depth[node_id]
+
+    def path_count(self, node_id: str) -> int:
+        """Number of distinct action sequences from the root to the node"""
+        with self.lock:
+            return self._dag_index().paths[node_id]
+
+    def is_ancestor(self, ancestor_id: str, node_id: str) -> bool:
+        """Whether some path from the root to node_id passes through ancestor_id first"""
+        with self.lock:
+            if ancestor_id == node_id or ancestor_id not in self.nodes or node_id not in self.nodes:
+                return False
+            index = self._dag_index()
+            if ancestor_id not in index.level or node_id not in index.level:
+                self._index = None  # Nodes inserted before they were linked
+                index = self._dag_index()
+            key = (ancestor_id, node_id)
+            if key not in index.ancestors:
+                # Walk up from node_id, skipping nodes whose level rules them out
+                floor = index.level[ancestor_id]
+                found = False
+                seen = {node_id}
+                pending = [node_id]
+                while pending and not found:
+                    for parent_id in self.nodes[pending.pop()].parents:
+                        if parent_id == ancestor_id:
+                            found = True
+                            break
+                        if parent_id in self.nodes and parent_id not in seen and index.level[parent_id] > floor:
+                            seen.add(parent_id)
+                            pending.append(parent_id)
+                index.ancestors[key] = found
+            return index.ancestors[key]
+
+    def path_to(self, node_id: str) -> List[str]:
+        """Node ids of a shortest path from the root to the node (both included)"""
+        with self.lock:
+            if node_id not in self.nodes:
+                raise ValueError(f"Node {node_id} not found.")
+            via = self._dag_index().via
+            path = [node_id]
+            while via[path[-1]] is not None:
+                path.append(via[path[-1]])
+        path.reverse()
+        return path
+
+    def all_paths(self, node_id: str, limit: int = 1000) -> List[List[str]]:
+        """Every path from the root to the node, up to `limit` of them (see path_count)"""
+        with self.lock:
+            if node_id not in self.nodes:
+                raise ValueError(f"Node {node_id} not found.")
+            paths = []
+            pending = [[node_id]]
+            while pending and len(paths) < limit:
+                partial = pending.pop()
+                parents = [parent_id for parent_id in self.nodes[partial[-1]].parents if parent_id in self.nodes]
+                if not parents:
+                    paths.append(list(reversed(partial)))
+                for parent_id in reversed(parents):
+                    pending.append(partial + [parent_id])
+        return paths
+
+    def _lifting(self, index: _DagIndex) -> List[Dict[str, Optional[str]]]:
+        """Binary lifting tables over the shortest-path tree, built on first use"""
+        if not index.lift:
+            tables = [dict(index.via)]
+            for _ in range(max(index.depth.values(), default=0).bit_length() - 1):
+                previous = tables[-1]
+                tables.append({node_id: previous[above] if above is not None else None
+                               for node_id, above in previous.items()})
+            index.lift = tables
+        return index.lift
+
+    def _lift(self, tables: List[Dict[str, Optional[str]]], node_id: str, steps: int) -> Optional[str]:
+        k = 0
+        while steps and node_id is not None:
+            if steps & 1:
+                node_id = tables[k][node_id]
+            steps >>= 1
+            k += 1
+        return node_id
+
+    def common_ancestor(self, node_a: str, node_b: str) -> Optional[str]:
+        """Lowest common ancestor on the tree of shortest paths from the root (a node is
+        its own ancestor); None if the nodes are in unrelated trees"""
+        with self.lock:
+            for node_id in (node_a, node_b):
+                if node_id not in self.nodes:
+                    raise ValueError(f"Node {node_id} not found.")
+            index = self._dag_index()
+            tables = self._lifting(index)
+            depth = index.depth
+            if depth[node_a] < depth[node_b]:
+                node_a, node_b = node_b, node_a
+            node_a = self._lift(tables, node_a, depth[node_a] - depth[node_b])
+            if node_a == node_b:
+                return node_a
+            for table in reversed(tables):
+                if table[node_a] != table[node_b]:
+                    node_a, node_b = table[node_a], table[node_b]
+            return tables[0][node_a] if tables[0][node_a] == tables[0][node_b] else None
+
+    def _actions_since(self, ancestor_id: Optional[str], node_id: str) -> List[str]:
+        """Actions along the shortest-path tree from the ancestor (or the root) down to the node"""
+        via = self._dag_index().via
+        actions = []
+        while node_id != ancestor_id and via[node_id] is not None:
+            actions.append(self.nodes[node_id].parents.get(via[node_id], ""))
+            node_id = via[node_id]
+        actions.reverse()
+        return actions
+
+    def summary(self, node_id: str) -> StateSummary:
+        """Compact encoding of a node's state, memoized for recently compared nodes"""
+        with self.lock:
+            summary = self._summaries.get(node_id)
+            if summary is not None:
+                self._summaries.move_to_end(node_id)
+                return summary
+            if node_id not in self.nodes:
+                raise ValueError(f"Node {node_id} not found.")
+            state_dict_json = self.nodes[node_id].state_dict_json
+        summary = StateSummary.from_json(state_dict_json)
+        with self.lock:
+            self._summaries[node_id] = summary
+            while len(self._summaries) > 256:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def compare(self, node_a: str, node_b: str) -> StateComparison:
+        """Resource, relic, active card and queue differences between two nodes, and the
+        actions each took since their lowest common ancestor"""
+        with self.lock:
+            ancestor = self.common_ancestor(node_a, node_b)
+            actions_a = self._actions_since(ancestor, node_a)
+            actions_b = self._actions_since(ancestor, node_b)
+        a = self.summary(node_a)
+        b = self.summary(node_b)
+        return StateComparison(
+            node_a=node_a,
+            node_b=node_b,
+            ancestor=ancestor,
+            time=(a.time, b.time),
+            resources=_changed(dict(a.resources), dict(b.resources)),
+            relics=_changed(dict(a.relics), dict(b.relics)),
+            active_cards=_only(Counter(a.active_cards), Counter(b.active_cards)),
+            card_queue=_only(Counter(a.card_queue), Counter(b.card_queue)),
+            actions_a=actions_a,
+            actions_b=actions_b
+        )
+
+    def path_messages(self, path: List[str]) -> List[str]:
+        """The action taken along each edge of a path"""
+        with self.lock:
+            return [self.nodes[child_id].parents.get(parent_id, "") for parent_id, child_id in zip(path, path[1:])]
 
     def load_state(self, node_id: str) -> GameState:
         """Load a game state from a specific node"""
-        if node_id not in self.nodes:
-            raise ValueError(f"Node {node_id} not found.")
-
-        node_to_load = self.nodes[node_id]
-        state_dict = json.loads(node_to_load.state_dict_json)
-        loaded_game_state = GameState.from_dict(state_dict, self.config_path, self.mode)
+        with self.lock:
+            if node_id not in self.nodes:
+                raise ValueError(f"Node {node_id} not found.")
+            node_to_load = self.nodes[node_id]
+        loaded_game_state = self.cache.get(node_id)
+        if loaded_game_state is None:
+            with self.profiler.phase("deserialization"):
+                cached = self._materialize(node_to_load)
+            loaded_game_state = cached.fork()
+            loaded_game_state.policy = Policy()
+        else:
+            self.profiler.count("state_cache_hit")
+        self.profiler.count("load_state")
 
-        self.current_node_id = node_id
-        print(f"Loaded state from node: {node_id}")
+        with self.lock:
+            self.current_node_id = node_id
+        if self.prefetch:
+            self.prefetch_neighbors(node_id)
+        if debug.enabled:
+            print(f"Loaded state from node: {node_id}")
         return loaded_game_state
 
+    def _materialize(self, node: StateNode) -> GameState:
+        """Build the node's state and keep it in the cache"""
+        state = GameState.from_dict(json.loads(node.state_dict_json), self.config_path, self.mode)
+        self.cache.put(node.node_id, state, len(node.state_dict_json))
+        return state
+
+    def prefetch_neighbors(self, node_id: str) -> None:
+        """Materialize the parent and children of a node in the background"""
+        with self.lock:
+            node = self.nodes.get(node_id)
+            if node is None:
+                return
+            neighbors = [self.nodes[other] for other in list(node.parents) + node.child_ids
+                         if other in self.nodes and other not in self.cache]
+        if not neighbors:
+            return
+        if self._prefetcher is None:
+            self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-prefetch")
+        self._prefetcher.submit(self._prefetch, neighbors)
+
+    def _prefetch(self, nodes: List[StateNode]) -> None:
+        for node in nodes:
+            if node.node_id in self.cache:
+                continue
+            try:
+                self._materialize(node)
+                self.cache.prefetched += 1
+            except Exception as e:
+                if debug.enabled:
+                    print(f"[DEBUG][STATE_MANAGER] Prefetch of {node.node_id} failed: {e}")
+
+    def label_node(self, node_id: str, label: Optional[str]) -> None:
+        """Name a node (None or "" removes the label)"""
+        with self.lock:
+            if node_id not in self.nodes:
+                raise ValueError(f"Node {node_id} not found.")
+            self.nodes[node_id].label = label or None
+
+    def retained_nodes(self, policy: RetentionPolicy) -> Set[str]:
+        """Ids of the nodes the policy keeps"""
+        with self.lock:
+            keep = {node_id for node_id in (self.root_node_id, self.current_node_id) if node_id in self.nodes}
+            for node_id, node in self.nodes.items():
+                if len(node.child_ids) > 1 or node.is_merge:
+                    keep.add(node_id)  # Structure: dropping these would merge or lose branches
+                elif policy.keep_branch_tips and not node.child_ids:
+                    keep.add(node_id)
+                elif policy.keep_labelled and node.label:
+                    keep.add(node_id)
+                elif not any(parent_id in self.nodes for parent_id in node.parents):
+                    keep.add(node_id)  # Roots of detached subtrees
+            if policy.keep_last:
+                recent = sorted(self.nodes.values(), key=lambda node: node.last_played, reverse=True)
+                keep.update(node.node_id for node in recent[:policy.keep_last])
+            if policy.keep_every_n:
+                keep.update(node_id for node_id, node in self.nodes.items()
+                            if node.original_depth % policy.keep_every_n == 0)
+        return keep
+
+    def collect_garbage(self, policy: Optional[RetentionPolicy] = None, batch_size: int = 256) -> GcReport:
+        """Remove the nodes the policy doesn't keep, splicing their children onto their parent.
+        The lock is held for one batch at a time, so saves and loads go on in between."""
+        policy = policy or self.retention or RetentionPolicy()
+        started = time.perf_counter()
+        with self.lock:
+            nodes_before = len(self.nodes)
+            keep = self.retained_nodes(policy)
+            doomed = [node_id for node_id in self.nodes if node_id not in keep]
+        removed = 0
+        reclaimed = 0
+        batches = 0
+        for start in range(0, len(doomed), batch_size):
+            batches += 1
+            with self.lock:
+                for node_id in doomed[start:start + batch_size]:
+                    # The tree may have moved on since the snapshot
+                    if node_id in self.nodes and node_id not in (self.current_node_id, self.root_node_id):
+                        reclaimed += self._remove_node(node_id)
+                        removed += 1
+        report = GcReport(nodes_before, removed, reclaimed, batches, time.perf_counter() - started)
+        with self.lock:
+            self.gc_stats["runs"] += 1
+            self.gc_stats["removed"] += removed
+            self.gc_stats["bytes_reclaimed"] += reclaimed
+        if debug.enabled:
+            print(f"[DEBUG][STATE_MANAGER] Collected {removed} of {nodes_before} nodes, "
+                  f"{reclaimed} bytes in {report.seconds:.3f}s")
+        return report
+
+    def _remove_node(self, node_id: str) -> int:
+        """Unlink a node, hand its children to its parents in its place and return its size"""
+        node = self.nodes.pop(node_id)
+        for parent_id in node.parents:
+            parent = self.nodes.get(parent_id)
+            if parent is not None and node_id in parent.child_ids:
+                index = parent.child_ids.index(node_id)
+                parent.child_ids[index:index + 1] = [child_id for child_id in node.child_ids
+                                                     if child_id not in parent.child_ids]
+        for child_id in node.child_ids:
+            child = self.nodes.get(child_id)
+            if child is None or node_id not in child.parents:
+                continue
+            # The spliced edges keep the child's action; the removed node's parents take its place
+            parents = {}
+            for parent_id, message in child.parents.items():
+                if parent_id != node_id:
+                    parents.setdefault(parent_id, message)
+                    continue
+                for grandparent_id in node.parents:
+                    if grandparent_id in self.nodes:
+                        parents.setdefault(grandparent_id, message)
+            child.parents = parents
+        self._index = None
+        self.cache.discard(node_id)
+        self._summaries.pop(node_id, None)
+        return len(node.state_dict_json)
+
+    def collect_in_background(self, policy: Optional[RetentionPolicy] = None,
+                              on_done: Optional[Callable[[GcReport], None]] = None) -> Future:
+        """Run collect_garbage on a background thread; returns the running collection if
+        one is already under way"""
+        with self.lock:
+            if self._collection is not None and not self._collection.done():
+                return self._collection
+            if self._collector is None:
+                self._collector = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-gc")
+            self._collection = self._collector.submit(self.collect_garbage, policy)
+            if on_done is not None:
+                self._collection.add_done_callback(lambda future: future.exception() or on_done(future.result()))
+            return self._collection
+
     def get_tree_structure(self) -> List[Dict]:
         """Get the tree structure for visualization"""
         structure = []
-        for node_id, node in self.nodes.items():
-            structure.append({
-                'id': node.node_id,
-                'parent': node.parent_id,
-                'message': node.message,
-                'last_played': node.last_played,
-                'is_current': node.node_id == self.current_node_id,
-                'children': node.child_ids
-            })
+        with self.lock:
+            for node_id, node in self.nodes.items():
+                structure.append({
+                    'id': node.node_id,
+                    'parent': node.parent_id,
+                    'parents': list(node.parents),
+                    'message': node.message,
+                    'last_played': node.last_played,
+                    'label': node.label,
+                    'is_current': node.node_id == self.current_node_id,
+                    'children': list(node.child_ids)
+                })
         return structure
 
     def save_to_file(self, filepath: str = "game_history.json") -> None:
         """Save the entire state history to a file"""
-        data = {
-            'nodes': {
-                node_id: {
-                    'parent_id': node.parent_id,
-                    'child_ids': node.child_ids,
-                    'last_played': node.last_played,
-                    'message': node.message,
-                    'state_dict_json': node.state_dict_json
-                }
-                for node_id, node in self.nodes.items()
-            },
-            'current_node_id': self.current_node_id,
-            'root_node_id': self.root_node_id
-        }
+        with self.lock:
+            data = {
+                'nodes': {
+                    node_id: {
+                        'parent_id': node.parent_id,
+                        'parents': dict(node.parents),
+                        'child_ids': list(node.child_ids),
+                        'last_played': node.last_played,
+                        'message': node.message,
+                        'label': node.label,
+                        'original_depth': node.original_depth,
+                        'state_dict_json': node.state_dict_json
+                    }
+                    for node_id, node in self.nodes.items()
+                },
+                'current_node_id': self.current_node_id,
+                'root_node_id': self.root_node_id
+            }
         
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        with self.profiler.phase("file_save"):
+            with open(filepath, 'w') as f:
+                json.dump(data, f, indent=2)
 
     def load_from_file(self, filepath: str = "game_history.json") -> None:
         """Load the state history from a file"""
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        with self.profiler.phase("file_load"):
+            with open(filepath, 'r') as f:
+                data = json.load(f)
         
         self.nodes = {}
+        self.cache.clear()
         for node_id, node_data in data['nodes'].items():
             self.nodes[node_id] = StateNode(
                 state_dict_json=node_data['state_dict_json'],
                 parent_id=node_data['parent_id'],
                 message=node_data['message']
             )
+            self.nodes[node_id].node_id = node_id  # Older files hashed fewer fields
             self.nodes[node_id].child_ids = node_data['child_ids']
             self.nodes[node_id].last_played = node_data['last_played']
+            self.nodes[node_id].label = node_data.get('label')
+            if 'parents' in node_data:
+                self.nodes[node_id].parents = dict(node_data['parents'])
+        if any('parents' not in node_data for node_data in data['nodes'].values()):
+            # Older files only kept one parent per node; the child lists name the others
+            self._index = None
+            for node_id, node in self.nodes.items():
+                for child_id in list(node.child_ids):
+                    child = self.nodes.get(child_id)
+                    if child is not None and node_id not in child.parents:
+                        node.child_ids.remove(child_id)
+                        self.link(node_id, child_id, child.message)
         
         self.current_node_id = data['current_node_id']
-        self.root_node_id = data['root_node_id'] 
\ No newline at end of file
+        self.root_node_id = data['root_node_id']
+        self._index = None
+        if any('original_depth' not in node_data for node_data in data['nodes'].values()):
+            # Older files: take the depths as they are now
+            depth = self._dag_index().depth
+            for node_id, node in self.nodes.items():
+                node.original_depth = depth[node_id]
+        else:
+            for node_id, node_data in data['nodes'].items():
+                self.nodes[node_id].original_depth = node_data['original_depth'] 
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""
+Parameter sweeps for config balancing.
+Takes a mode and value ranges for config paths (resource initial amounts, choice
+effect amounts, relic effect amounts and intervals, ...), builds every combination by
+patching the loaded config in memory, plays each variant headless and aggregates the
+outcomes: final resources, time to game over and how often each card was played.
+Runs are spread over a process pool.
+
+A config path starts with the YAML file and follows its keys, with list items by
+position, e.g. "resources.minerals.initial_amount", "relics.scv.passive_effects.0.interval"
+or "cards.command_center.choices.0.effects.resources.minerals".
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from . import debug
+from .game_loader import GameLoader, LoadedMode, attach_modes, published_modes
+from .game_state import GameState
+from .optimizer import Objective
+from .runner import RANDOM_POLICY, RunSpec, iter_run
+
+Overrides = Tuple[Tuple[str, Any], ...]  # Sorted (config path, value) pairs of one variant
+
+@dataclass
+class SweepParam:
+    path: str
+    values: Tuple[Any, ...]
+
+def _number(text: str) -> Any:
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def parse_param(text: str) -> SweepParam:
+    """Parse "path=start:stop[:step]" (stop included) or "path=v1,v2,..." """
+    path, sep, spec = text.partition("=")
+    if not sep or not spec:
+        raise ValueError(f"Expected PATH=VALUES, got '{text}'")
+    if ":" in spec:
+        parts = [_number(part) for part in spec.split(":")]
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Expected start:stop[:step] in '{text}'")
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) == 3 else 1
+        if step <= 0:
+            raise ValueError(f"Step must be positive in '{text}'")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        values = tuple(start + i * step for i in range(max(0, count)))
+    else:
+        values = tuple(_number(part) for part in spec.split(","))
+    if not values:
+        raise ValueError(f"No values in '{text}'")
+    return SweepParam(path.strip(), values)
+
+def variants(params: List[SweepParam]) -> List[Overrides]:
+    """Every combination of parameter values"""
+    paths = [param.path for param in params]
+    return [tuple(sorted(zip(paths, combination)))
+            for combination in itertools.product(*(param.values for param in params))]
+
+@dataclass
+class SweepSpec:
+    mode: str
+    params: List[SweepParam]
+    stop_time: Optional[int] = None  # Absolute game time each run stops at
+    policy: Optional[str] = RANDOM_POLICY  # Policy JSON file, or "random"
+    runs: int = 1  # Seeded runs per variant; unmatched cards get a seeded random choice
+    objective: Optional[str] = None  # Scores runs, see optimizer.Objective
+    max_steps: int = 100000
+    config_path: str = "config"
+    jobs: int = field(default_factory=lambda: os.cpu_count() or 1)
+
+# Patched modes built in this process, keyed by (config path, mode, overrides)
+_VARIANTS: Dict[Tuple[str, str, Overrides], LoadedMode] = {}
+
+def _variant_mode(mode: str, config_path: str, overrides: Overrides) -> LoadedMode:
+    key = (config_path, mode, overrides)
+    if key not in _VARIANTS:
+        _VARIANTS[key] = GameLoader.load_mode(mode, Path(config_path)).patched(dict(overrides))
+    return _VARIANTS[key]
+
+def run_variant(mode: str, config_path: str, overrides: Overrides, run_spec: RunSpec) -> Dict:
+    """Play one run of a variant and return its outcome and card play counts"""
+    loaded = _variant_mode(mode, config_path, overrides)
+    game = GameState(Path(config_path), mode, loaded_mode=loaded)
+    game.set_undo_limit(0)
+    visits = Counter()
+    summary = None
+    for record in iter_run(run_spec, game):
+        if record["record"] == "summary":
+            summary = record
+        elif record["ok"] and record["action"]["type"] == "choice":
+            visits[record["action"]["card_title"]] += 1
+    return {
+        "seed": run_spec.seed,
+        "stop_reason": summary["stop_reason"],
+        "game_over": summary["game_over"],
+        "time": summary["final_time"],
+        "resources": summary["resources"],
+        "relics": summary["relics"],
+        "error": summary.get("error"),
+        "visits": dict(visits)
+    }
+
+def _worker_init(mode_handles: List[Dict]) -> None:
+    debug.set_debug(False)
+    attach_modes(mode_handles)
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    return {"mean": sum(values) / len(values), "min": min(values), "max": max(values)}
+
+def aggregate(overrides: Overrides, outcomes: List[Dict], objective: Optional[Objective]) -> Dict:
+    """Summary of all runs of one variant"""
+    resources = {name: _stats([outcome["resources"][name] for outcome in outcomes])
+                 for name in outcomes[0]["resources"]}
+    visits = Counter()
+    for outcome in outcomes:
+        visits.update(outcome["visits"])
+    ended = [outcome["time"] for outcome in outcomes if outcome["game_over"]]
+    result = {
+        "overrides": dict(overrides),
+        "runs": len(outcomes),
+        "errors": sum(1 for outcome in outcomes if outcome["error"]),
+        "game_over_rate": len(ended) / len(outcomes),
+        "time_to_game_over": _stats(ended) if ended else None,
+        "final_time": _stats([outcome["time"] for outcome in outcomes]),
+        "resources": resources,
+        "card_visits": {title: count / len(outcomes) for title, count in visits.most_common()}
+    }
+    if objective is not None:
+        scores = [objective(outcome) for outcome in outcomes]
+        best = max(range(len(outcomes)), key=lambda i: scores[i])
+        result["score"] = _stats(scores)
+        result["best_seed"] = outcomes[best]["seed"]
+    return result
+
+def sweep(spec: SweepSpec, on_variant: Optional[Callable[[int, Dict], None]] = None) -> Iterator[Dict]:
+    """Play every variant spec.runs times and yield one aggregate per variant (in
+    completion order when jobs > 1; each carries its index as "variant")"""
+    objective = Objective(spec.objective) if spec.objective else None
+    base = GameLoader.load_mode(spec.mode, Path(spec.config_path))
+    all_variants = variants(spec.params)
+    for overrides in all_variants:
+        base.patched(dict(overrides))  # Fail on bad paths before starting workers
+    tasks = [
+        (index, overrides, RunSpec(mode=spec.mode, stop_time=spec.stop_time, policy=spec.policy,
+                                   seed=seed, max_steps=spec.max_steps, config_path=spec.config_path))
+        for index, overrides in enumerate(all_variants)
+        for seed in range(spec.runs)
+    ]
+    pending = {index: [] for index in range(len(all_variants))}
+
+    def finished(index: int, outcome: Dict) -> Optional[Dict]:
+        pending[index].append(outcome)
+        if len(pending[index]) < spec.runs:
+            return None
+        outcomes = sorted(pending.pop(index), key=lambda o: o["seed"])
+        result = dict(aggregate(all_variants[index], outcomes, objective), variant=index)
+        if on_variant is not None:
+            on_variant(index, result)
+        return result
+
+    if spec.jobs <= 1:
+        for index, overrides, run_spec in tasks:
+            result = finished(index, run_variant(spec.mode, spec.config_path, overrides, run_spec))
+            if result is not None:
+                yield result
+        return
+
+    # Workers get the base mode from shared memory and patch it themselves
+    with published_modes([(spec.mode, spec.config_path)]) as handles, \
+            ProcessPoolExecutor(max_workers=spec.jobs, initializer=_worker_init, initargs=(handles,)) as executor:
+        futures = {
+            executor.submit(run_variant, spec.mode, spec.config_path, overrides, run_spec): index
+            for index, overrides, run_spec in tasks
+        }
+        for future in as_completed(futures):
+            result = finished(futures[future], future.result())
+            if result is not None:
+                yield result
+
+def format_row(result: Dict) -> str:
+    overrides = ", ".join(f"{path}={value}" for path, value in result["overrides"].items())
+    resources = " ".join(f"{name}={stats['mean']:.1f}" for name, stats in result["resources"].items())
+    line = f"{overrides} | game over {result['game_over_rate']:.0%} | t={result['final_time']['mean']:.1f} | {resources}"
+    if "score" in result:
+        line += f" | score {result['score']['mean']:.2f} (best {result['score']['max']:.2f})"
+    if result["errors"]:
+        line += f" | {result['errors']} errors"
+    return line
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep config values of a mode and compare outcomes")
+    parser.add_argument("--mode", required=True)
+    parser.add_argument("--param", action="append", required=True, metavar="PATH=VALUES",
+                        help="Config path and values, e.g. relics.scv.passive_effects.0.amount=5:15:5 "
+                             "or resources.minerals.initial_amount=50,100 (repeatable)")
+    parser.add_argument("--until", type=int, help="Game time each run stops at")
+    parser.add_argument("--policy", default=RANDOM_POLICY, help="Policy JSON file, or 'random'")
+    parser.add_argument("--runs", type=int, default=1, help="Seeded runs per variant")
+    parser.add_argument("--objective", help="Expression to score runs, e.g. 'minerals + 2 * gas'")
+    parser.add_argument("--max-steps", type=int, default=100000)
+    parser.add_argument("--config", default="config", help="Config directory")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", help="Write one JSON line per variant here")
+    args = parser.parse_args()
+
+    debug.set_debug(False)
+    spec = SweepSpec(mode=args.mode, params=[parse_param(text) for text in args.param],
+                     stop_time=args.until, policy=args.policy, runs=args.runs,
+                     objective=args.objective, max_steps=args.max_steps,
+                     config_path=args.config, jobs=args.jobs)
+    results = sorted(sweep(spec, on_variant=lambda index, result: print(format_row(result), flush=True)),
+                     key=lambda result: result["variant"])
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    if spec.objective:
+        best = max(results, key=lambda result: result["score"]["mean"])
+        print(f"Best variant: {format_row(best)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compact resource time series.
+A ResourceRecorder attached to a GameState (GameState.enable_recording) samples every
+resource when time advances and when a choice changes resources. Each resource is
+kept as its change points, (time, value) pairs in two array('q') buffers, so
+stretches where a value doesn't move cost nothing (run-length encoding). When a
+series grows past max_points, everything but its most recent quarter is downsampled
+to the minimum and maximum of each bucket, so memory stays bounded however long a
+run_policy session goes while peaks and dips stay visible. Older data gets coarser
+with every compaction; recent data stays at full resolution.
+
+Values are steps: a resource keeps the value of its last change point until the next.
+"""
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+Point = Tuple[int, int]
+
+def _min_max(times: array, values: array, start: int, end: int, buckets: int) -> List[Point]:
+    """Min and max point (in time order) of each of `buckets` slices of [start, end)"""
+    count = end - start
+    per = -(-count // buckets)
+    points = []
+    for lo in range(start, end, per):
+        chunk = values[lo:min(lo + per, end)]
+        low = lo + chunk.index(min(chunk))
+        high = lo + chunk.index(max(chunk))
+        for i in sorted({low, high}):
+            points.append((times[i], values[i]))
+    return points
+
+class _Series:
+    __slots__ = ("times", "values", "max_points", "compactions")
+
+    def __init__(self, max_points: int):
+        self.times = array('q')
+        self.values = array('q')
+        self.max_points = max_points
+        self.compactions = 0
+
+    def add(self, time: int, value: int) -> None:
+        values = self.values
+        if values and values[-1] == value:
+            return
+        times = self.times
+        if times and times[-1] == time:
+            values[-1] = value  # Several changes within one time unit: keep the last
+            return
+        times.append(time)
+        values.append(value)
+        if len(times) > self.max_points:
+            self._compact()
+
+    def _compact(self) -> None:
+        keep = self.max_points // 4  # Recent points kept as they are
+        old = len(self.times) - keep
+        points = _min_max(self.times, self.values, 0, old, max(1, self.max_points // 8))
+        self.times = array('q', [time for time, _ in points]) + self.times[old:]
+        self.values = array('q', [value for _, value in points]) + self.values[old:]
+        self.compactions += 1
+
+    def truncate(self, time: int) -> None:
+        """Drop the change points at or after `time`"""
+        end = bisect_right(self.times, time - 1)
+        del self.times[end:]
+        del self.values[end:]
+
+class ResourceRecorder:
+    """Per-resource values over game time in bounded, typed buffers"""
+    def __init__(self, resources: Iterable[str], max_points: int = 65536):
+        if max_points < 16:
+            raise ValueError("max_points must be at least 16")
+        self.max_points = max_points
+        self._series: Dict[str, _Series] = {name: _Series(max_points) for name in resources}
+        self.last_time = None
+        self.samples = 0
+
+    @property
+    def resources(self) -> List[str]:
+        return list(self._series)
+
+    def record(self, time: int, resources: Mapping[str, int]) -> None:
+        """Sample every resource at `time`. Going back in time (undo, a loaded state)
+        drops what was recorded after it, so the series follow the game that is played."""
+        if self.last_time is not None and time < self.last_time:
+            for series in self._series.values():
+                series.truncate(time)
+        self.last_time = time
+        self.samples += 1
+        for name, series in self._series.items():
+            series.add(time, resources.get(name, 0))
+
+    def value_at(self, resource: str, time: int) -> int:
+        series = self._series[resource]
+        index = bisect_right(series.times, time) - 1
+        if index < 0:
+            raise ValueError(f"No {resource} recorded at or before time {time}")
+        return series.values[index]
+
+    def points(self, resource: str) -> List[Point]:
+        """Every stored change point"""
+        series = self._series[resource]
+        return list(zip(series.times, series.values))
+
+    def window(self, resource: str, start: int, end: int, max_points: int = 1000) -> List[Point]:
+        """Change points in [start, end], plus the one in force at start, downsampled to
+        about max_points with min/max buckets; the last value is extended to end"""
+        series = self._series[resource]
+        times, values = series.times, series.values
+        lo = max(0, bisect_right(times, start) - 1)
+        hi = bisect_right(times, end)
+        if hi <= lo:
+            return []
+        if hi - lo <= max_points:
+            points = list(zip(times[lo:hi], values[lo:hi]))
+        else:
+            points = _min_max(times, values, lo, hi, max(1, max_points // 2))
+        last_time = min(end, self.last_time)
+        if points[-1][0] < last_time:
+            points.append((last_time, points[-1][1]))
+        return points
+
+    def clear(self) -> None:
+        for name in list(self._series):
+            self._series[name] = _Series(self.max_points)
+        self.last_time = None
+        self.samples = 0
+
+    def stats(self) -> Dict:
+        points = sum(len(series.times) for series in self._series.values())
+        return {
+            "samples": self.samples,
+            "points": points,
+            "bytes": sum(series.times.itemsize * len(series.times) * 2 for series in self._series.values()),
+            "compactions": sum(series.compactions for series in self._series.values())
+        }
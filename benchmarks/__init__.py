@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the game engine.
+Run with `python -m benchmarks run` and compare against a stored baseline with
+`python -m benchmarks compare baseline.json results.json`.
+"""
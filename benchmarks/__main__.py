@@ -0,0 +1,57 @@
+import argparse
+import sys
+from pathlib import Path
+from .bench import ALL_CASES, DEFAULT_SIZES, compare, load_results, run_benchmarks, save_results
+from .synthetic import SyntheticSpec, write_mode
+
+def parse_sizes(text: str):
+    return [int(size) for size in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Engine benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the benchmark cases")
+    run_parser.add_argument("--sizes", type=parse_sizes, default=DEFAULT_SIZES,
+                            help="Card counts of the synthetic modes, e.g. 10,1000,100000")
+    run_parser.add_argument("--cases", default=",".join(ALL_CASES), help="Comma-separated cases to run")
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds sampled per case")
+    run_parser.add_argument("--config-dir", help="Keep the generated modes in this directory")
+    run_parser.add_argument("--out", default="bench_results.json", help="Where to write the results JSON")
+
+    compare_parser = sub.add_parser("compare", help="Flag regressions against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.25,
+                                help="Allowed relative slowdown before a case counts as a regression")
+
+    gen_parser = sub.add_parser("generate", help="Write synthetic modes without running anything")
+    gen_parser.add_argument("--sizes", type=parse_sizes, default=DEFAULT_SIZES)
+    gen_parser.add_argument("--out", default="bench_modes",
+                            help="Config directory to write the modes into (pass --out config to add them "
+                                 "to the shipped modes)")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        cases = [case for case in args.cases.split(",") if case]
+        unknown = set(cases) - set(ALL_CASES)
+        if unknown:
+            parser.error(f"Unknown cases: {', '.join(sorted(unknown))}")
+        results = run_benchmarks(args.sizes, cases, args.min_time, args.config_dir)
+        save_results(results, args.out)
+        print(f"Results written to {args.out}")
+    elif args.command == "compare":
+        rows = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['case']:<28} {row['baseline_s'] * 1000:10.3f} ms -> "
+                  f"{row['current_s'] * 1000:10.3f} ms  x{row['ratio']:.2f}  {flag}")
+        regressions = [row for row in rows if row["regression"]]
+        print(f"{len(regressions)} regression(s) in {len(rows)} compared case(s)")
+        sys.exit(1 if regressions else 0)
+    elif args.command == "generate":
+        for size in args.sizes:
+            print(write_mode(SyntheticSpec.for_size(size), Path(args.out)))
+
+if __name__ == "__main__":
+    main()
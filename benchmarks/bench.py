@@ -0,0 +1,160 @@
+"""
+Engine benchmark cases and baseline comparison.
+Every case is timed per synthetic size; results are written as JSON keyed by
+"<case>/<n_cards>" so runs on different commits can be compared.
+"""
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from backend import debug
+from backend.game_loader import GameLoader
+from backend.game_state import GameState, Policy
+from backend.state_history import StateManager
+from .synthetic import SyntheticSpec, policy_rules, write_mode
+
+DEFAULT_SIZES = [10, 1000, 10000]
+ALL_CASES = [
+    "load_config", "draw_cards", "passive_effects", "make_choice", "run_policy",
+    "save_state", "load_state", "save_to_file", "load_from_file"
+]
+POLICY_TIME = 10  # Time units run_policy advances per sample
+PASSIVE_TIME = 420  # Every synthetic interval (1..7) divides this, so all effects fire
+
+def measure(fn: Callable, setup: Optional[Callable] = None, min_time: float = 0.2,
+            max_time: float = 5.0, max_repeat: int = 200) -> Dict:
+    """Time fn(setup()) repeatedly; setup is not timed.
+
+    Sampling stops after min_time once there are three samples, or after max_time.
+    """
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < max_repeat:
+        arg = setup() if setup is not None else None
+        t0 = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+        if (elapsed >= min_time and len(samples) >= 3) or elapsed >= max_time:
+            break
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+        "samples": len(samples)
+    }
+
+def bench_size(spec: SyntheticSpec, config_path: Path, cases: List[str], min_time: float) -> Dict[str, Dict]:
+    """Run the selected cases against one synthetic mode"""
+    mode = write_mode(spec, config_path)
+    results = {}
+
+    def run(case: str, fn: Callable, setup: Optional[Callable] = None) -> None:
+        if case in cases:
+            results[case] = measure(fn, setup, min_time=min_time)
+            print(f"  {case:<16} {results[case]['median_s'] * 1000:10.3f} ms "
+                  f"({results[case]['samples']} samples)", file=sys.stderr)
+
+    run("load_config", lambda _: GameLoader.load_config(mode, config_path))
+
+    base = GameState(config_path, mode)
+    # Start card taken with every relic gained and the chain queued
+    playing = base.fork()
+    playing.make_choice(0, 0)
+
+    def due_state():
+        state = base.fork()
+        state.current_time = 1
+        return state
+    run("draw_cards", lambda state: state._draw_cards(), due_state)
+
+    def passive_state():
+        state = playing.fork()
+        state.current_time = PASSIVE_TIME
+        return state
+    run("passive_effects", lambda state: state._process_passive_effects(), passive_state)
+
+    run("make_choice", lambda state: state.make_choice(0, 0), base.fork)
+
+    def policy_state():
+        state = playing.fork()
+        state.policy = Policy.from_dict({"rules": policy_rules()})
+        state.policy.set_target_time(f"+{POLICY_TIME}", state.current_time)
+        return state
+    run("run_policy", lambda state: state.run_policy(), policy_state)
+
+    manager = StateManager(config_path, mode)
+    manager.initialize(base)
+    counter = [0]
+
+    def distinct_state():
+        counter[0] += 1
+        state = playing.fork()
+        state.resources["res_0"] += counter[0]
+        return state
+    run("save_state", lambda state: manager.save_state(state, message="bench"), distinct_state)
+    if len(manager.nodes) < 2:
+        manager.save_state(distinct_state(), message="bench")
+
+    node_id = manager.current_node_id
+    run("load_state", lambda _: manager.load_state(node_id))
+
+    history_file = config_path / f"{mode}_history.json"
+    run("save_to_file", lambda _: manager.save_to_file(str(history_file)))
+    if not history_file.exists():
+        manager.save_to_file(str(history_file))
+    run("load_from_file", lambda _: StateManager(config_path, mode).load_from_file(str(history_file)))
+    return results
+
+def run_benchmarks(sizes: List[int], cases: List[str], min_time: float = 0.2,
+                   config_dir: Optional[str] = None) -> Dict:
+    """Benchmark every case at every size and return the results document"""
+    debug.set_debug(False)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_config_") as tmp:
+        config_path = Path(config_dir) if config_dir else Path(tmp)
+        for size in sizes:
+            spec = SyntheticSpec.for_size(size)
+            print(f"[{spec.name}]", file=sys.stderr)
+            for case, timing in bench_size(spec, config_path, cases, min_time).items():
+                results[f"{case}/{size}"] = timing
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes
+        },
+        "results": results
+    }
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.25, min_delta: float = 1e-4) -> List[Dict]:
+    """Compare median timings. A case regresses when it is slower by more than threshold
+    (relative) and min_delta seconds (absolute, to ignore noise on tiny timings)."""
+    rows = []
+    for key, cur in sorted(current["results"].items()):
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        ratio = cur["median_s"] / base["median_s"] if base["median_s"] > 0 else float("inf")
+        delta = cur["median_s"] - base["median_s"]
+        rows.append({
+            "case": key,
+            "baseline_s": base["median_s"],
+            "current_s": cur["median_s"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold and delta > min_delta
+        })
+    return rows
+
+def save_results(results: Dict, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+def load_results(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
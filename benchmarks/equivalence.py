@@ -0,0 +1,338 @@
+"""
+Differential equivalence harness.
+Drives a reference engine and candidate engines with the same random action
+sequences over every shipped mode and a few synthetic ones, compares canonical state
+encodings after every step and shrinks each divergence to a minimal action log.
+Run it before and after engine optimizations:
+
+    python -m benchmarks.equivalence --games 2000
+
+Actions are abstract so one sequence fits every state: "pick" takes the n-th legal
+choice (modulo their number), "raw" tries fixed card/choice indices (exercising
+refusals and the auto-select rule), "advance" and "manual" move time. Each engine
+resolves them against its own state, so a divergence shows up at the first step
+whose outcome or state differs.
+
+A candidate is an Engine subclass. The built-in ones run the engine's fast paths
+against plain GameState: no undo journal, fork() after every step, to_dict/from_dict
+after every step, and undo+redo of every action. Pass --candidate module:Class to
+check another implementation.
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from backend import debug
+from backend.game_loader import GameLoader, attach_modes, mode_error, published_modes
+from backend.game_state import GameState
+from backend.runner import legal_choices
+from .synthetic import SyntheticSpec, write_mode
+
+class Engine:
+    """Reference engine: a plain GameState with the default undo journal"""
+    name = "reference"
+
+    def __init__(self, config_path: Path, mode: str):
+        self.game = GameState(config_path, mode)
+        self.setup()
+
+    def setup(self) -> None:
+        pass
+
+    def apply(self, action: Dict) -> Tuple:
+        """Resolve and apply an abstract action; returns its outcome"""
+        kind = action["type"]
+        game = self.game
+        try:
+            if kind == "pick":
+                choices = legal_choices(game)
+                if not choices:
+                    return ("no_choice",)
+                card_index, choice_index = choices[action["n"] % len(choices)]
+                result = game.make_choice(card_index, choice_index)
+            elif kind == "raw":
+                if action["card"] >= len(game.active_cards):
+                    return ("no_card",)
+                result = game.make_choice(action["card"], action["choice"])
+            elif kind == "advance":
+                result = game.advance_time()
+            elif kind == "manual":
+                result = game.manual_time_advance(action["amount"])
+            else:
+                raise ValueError(f"Unknown action type: {kind}")
+        except (KeyError, IndexError, ValueError) as e:
+            return ("error", type(e).__name__)
+        self.after(action)
+        return ("ok", result)
+
+    def after(self, action: Dict) -> None:
+        """Hook run after every applied action"""
+
+    def encode(self) -> Tuple:
+        """Canonical encoding of everything that decides how the game continues"""
+        game = self.game
+        return (
+            game.current_time,
+            tuple(sorted(game.resources.items())),
+            tuple((relic.name, relic.count) for relic in game.relics),
+            tuple((card.title, card.drawed_at, card.priority, card.card_type, card.stack_count)
+                  for card in game.active_cards),
+            tuple((card.title, card.drawed_at, card.priority, card.card_type, card.stack_count)
+                  for card in game.card_queue),
+            tuple(sorted(game.effect_timers.items())),
+            getattr(game, "_auto_selecting", None),
+            len(game.event_history),
+            game.game_over_cause()
+        )
+
+    def final_encoding(self) -> Tuple:
+        """Checked once per game: the full event history"""
+        return tuple((event.timestamp, event.event_type, event.source, event.description,
+                      tuple(sorted(event.resource_changes.items())), event.requirements_met)
+                     for event in self.game.event_history)
+
+class NoJournalEngine(Engine):
+    """Undo recording off, as in simulations and worker runs"""
+    name = "no_journal"
+
+    def setup(self) -> None:
+        self.game.set_undo_limit(0)
+
+class ForkEngine(Engine):
+    """Continues on a fork after every action"""
+    name = "fork"
+
+    def after(self, action: Dict) -> None:
+        self.game = self.game.fork()
+
+class SerializedEngine(Engine):
+    """Round-trips through to_dict/from_dict after every action, carrying the auto-select
+    flag the way worker processes do"""
+    name = "serialized"
+
+    def __init__(self, config_path: Path, mode: str):
+        self.config_path = config_path
+        self.mode = mode
+        super().__init__(config_path, mode)
+
+    def after(self, action: Dict) -> None:
+        auto_selecting = getattr(self.game, "_auto_selecting", None)
+        self.game = GameState.from_dict(self.game.to_dict(), self.config_path, self.mode)
+        if auto_selecting is not None:
+            self.game._auto_selecting = auto_selecting
+
+class UndoRedoEngine(Engine):
+    """Undoes and redoes every action that recorded an undo step"""
+    name = "undo_redo"
+
+    def apply(self, action: Dict) -> Tuple:
+        self._steps = len(self.game._undo_stack)
+        return super().apply(action)
+
+    def after(self, action: Dict) -> None:
+        if len(self.game._undo_stack) > self._steps:
+            self.game.undo()
+            self.game.redo()
+
+BUILTIN_CANDIDATES = {engine.name: engine for engine in (NoJournalEngine, ForkEngine, SerializedEngine, UndoRedoEngine)}
+
+def load_candidate(spec: str):
+    """A built-in candidate name, or module:Class"""
+    if spec in BUILTIN_CANDIDATES:
+        return BUILTIN_CANDIDATES[spec]
+    module_name, sep, class_name = spec.partition(":")
+    if not sep:
+        raise ValueError(f"Unknown candidate '{spec}' (built-in: {', '.join(BUILTIN_CANDIDATES)})")
+    return getattr(importlib.import_module(module_name), class_name)
+
+def random_actions(rng: random.Random, count: int) -> List[Dict]:
+    actions = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.55:
+            actions.append({"type": "pick", "n": rng.randrange(1 << 16)})
+        elif roll < 0.7:
+            actions.append({"type": "raw", "card": rng.randrange(4), "choice": rng.randrange(4)})
+        elif roll < 0.9:
+            actions.append({"type": "advance"})
+        else:
+            actions.append({"type": "manual", "amount": rng.randint(1, 5)})
+    return actions
+
+def find_divergence(reference: type, candidate: type, config_path: Path, mode: str,
+                    actions: List[Dict]) -> Optional[Dict]:
+    """Play the actions on both engines; the first difference, or None"""
+    engines = [reference(config_path, mode), candidate(config_path, mode)]
+    if engines[0].encode() != engines[1].encode():
+        return {"step": 0, "what": "initial state", "reference": engines[0].encode(), "candidate": engines[1].encode()}
+    for step, action in enumerate(actions, 1):
+        outcomes = [engine.apply(action) for engine in engines]
+        if outcomes[0] != outcomes[1]:
+            return {"step": step, "what": "outcome", "reference": outcomes[0], "candidate": outcomes[1]}
+        states = [engine.encode() for engine in engines]
+        if states[0] != states[1]:
+            return {"step": step, "what": "state", "reference": states[0], "candidate": states[1]}
+    histories = [engine.final_encoding() for engine in engines]
+    if histories[0] != histories[1]:
+        return {"step": len(actions), "what": "event history"}
+    return None
+
+def shrink(actions: List[Dict], fails: Callable[[List[Dict]], bool]) -> List[Dict]:
+    """Smallest action log that still fails: drop chunks of halving size (delta debugging),
+    then simplify the parameters of what is left"""
+    chunk = max(1, len(actions) // 2)
+    while chunk >= 1:
+        start = 0
+        while start < len(actions):
+            attempt = actions[:start] + actions[start + chunk:]
+            if attempt and fails(attempt):
+                actions = attempt
+            else:
+                start += chunk
+        chunk //= 2
+    simpler = {"pick": [("n", 0), ("n", 1)], "raw": [("card", 0), ("choice", 0)], "manual": [("amount", 1)]}
+    for i, action in enumerate(actions):
+        for key, value in simpler.get(action["type"], []):
+            if action[key] != value:
+                attempt = actions[:i] + [dict(action, **{key: value})] + actions[i + 1:]
+                if fails(attempt):
+                    actions = attempt
+                    action = attempt[i]
+    return actions
+
+def diverging_candidates(reference: type, candidates: List[type], config_path: Path, mode: str,
+                         actions: List[Dict]) -> List[type]:
+    """Play the reference and every candidate in lockstep (the reference once for all
+    of them); the candidates that diverge at some point"""
+    base = reference(config_path, mode)
+    running = {candidate: candidate(config_path, mode) for candidate in candidates}
+    diverged = [candidate for candidate, engine in running.items() if engine.encode() != base.encode()]
+    for candidate in diverged:
+        del running[candidate]
+    for action in actions:
+        if not running:
+            break
+        outcome = base.apply(action)
+        state = base.encode()
+        for candidate, engine in list(running.items()):
+            if engine.apply(action) != outcome or engine.encode() != state:
+                diverged.append(candidate)
+                del running[candidate]
+    history = base.final_encoding()
+    diverged.extend(candidate for candidate, engine in running.items() if engine.final_encoding() != history)
+    return diverged
+
+def _game_actions(seed: int, game_index: int, count: int) -> List[Dict]:
+    """The action sequence of one game, independent of which process plays it"""
+    return random_actions(random.Random(seed * 1000003 + game_index), count)
+
+def _check_games(modes: List[Tuple[Path, str]], candidates: List[type], start: int, stop: int,
+                 actions_per_game: int, seed: int, reference: type, max_failures: int) -> Dict:
+    failures = []
+    played = 0
+    steps = 0
+    for game_index in range(start, stop):
+        config_path, mode = modes[game_index % len(modes)]
+        actions = _game_actions(seed, game_index, actions_per_game)
+        played += 1
+        steps += len(actions)
+        for candidate in diverging_candidates(reference, candidates, config_path, mode, actions):
+            def fails(attempt: List[Dict]) -> bool:
+                return find_divergence(reference, candidate, config_path, mode, attempt) is not None
+            first = find_divergence(reference, candidate, config_path, mode, actions)
+            minimal = shrink(actions[:max(1, first["step"])], fails)
+            failures.append({
+                "candidate": candidate.name,
+                "mode": mode,
+                "game": game_index,
+                "actions": minimal,
+                "divergence": find_divergence(reference, candidate, config_path, mode, minimal),
+                "original_length": len(actions)
+            })
+            if len(failures) >= max_failures:
+                return {"games": played, "steps": steps, "failures": failures}
+    return {"games": played, "steps": steps, "failures": failures}
+
+def _worker_init(mode_handles: List[Dict]) -> None:
+    debug.set_debug(False)
+    attach_modes(mode_handles)
+
+def check(modes: List[Tuple[Path, str]], candidates: List[type], games: int, actions_per_game: int,
+          seed: int, reference: type = Engine, max_failures: int = 10, jobs: int = 1) -> Dict:
+    """Play `games` games against every candidate, spread over the modes (and over
+    worker processes when jobs > 1; the games are the same either way). Modes that fail
+    to load are left out and reported in load_errors."""
+    load_errors = {}
+    for config_path, mode in modes:
+        error = mode_error(mode, config_path)  # Also parses the configs before timing
+        if error is not None:
+            load_errors[mode] = error
+    modes = [(config_path, mode) for config_path, mode in modes if mode not in load_errors]
+    started = time.perf_counter()
+    if not modes:
+        results = []
+    elif jobs <= 1:
+        results = [_check_games(modes, candidates, 0, games, actions_per_game, seed, reference, max_failures)]
+    else:
+        bounds = [games * i // (jobs * 4) for i in range(jobs * 4 + 1)]
+        with published_modes((mode, str(config_path)) for config_path, mode in modes) as handles, \
+                ProcessPoolExecutor(max_workers=jobs, initializer=_worker_init, initargs=(handles,)) as executor:
+            results = list(executor.map(_check_games, *zip(*[
+                (modes, candidates, start, stop, actions_per_game, seed, reference, max_failures)
+                for start, stop in zip(bounds, bounds[1:]) if stop > start
+            ])))
+    seconds = time.perf_counter() - started
+    played = sum(result["games"] for result in results)
+    failures = [failure for result in results for failure in result["failures"]][:max_failures]
+    return {"games": played, "candidates": len(candidates), "steps": sum(result["steps"] for result in results),
+            "seconds": seconds,
+            "games_per_second": played / seconds if seconds else 0.0, "failures": failures,
+            "load_errors": load_errors}
+
+def main():
+    parser = argparse.ArgumentParser(description="Check candidate engines against the reference GameState")
+    parser.add_argument("--games", type=int, default=1000, help="Games per candidate")
+    parser.add_argument("--actions", type=int, default=30, help="Actions per game")
+    parser.add_argument("--candidate", action="append",
+                        help=f"Built-in ({', '.join(BUILTIN_CANDIDATES)}) or module:Class (repeatable, default: all built-in)")
+    parser.add_argument("--mode", action="append", help="Shipped mode to include (default: all)")
+    parser.add_argument("--synthetic", default="10,50", help="Card counts of synthetic modes ('' for none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--config", default="config", help="Config directory of the shipped modes")
+    parser.add_argument("--out", help="Write minimized failures here as NDJSON")
+    args = parser.parse_args()
+
+    debug.set_debug(False)
+    candidates = [load_candidate(spec) for spec in args.candidate or BUILTIN_CANDIDATES]
+    config_path = Path(args.config)
+    modes = [(config_path, mode) for mode in args.mode or sorted(GameLoader.get_available_modes(config_path))]
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        for size in [int(size) for size in args.synthetic.split(",") if size]:
+            modes.append((Path(synthetic_dir), write_mode(SyntheticSpec.for_size(size), Path(synthetic_dir))))
+        result = check(modes, candidates, args.games, args.actions, args.seed, jobs=args.jobs)
+
+    print(f"{result['games']} games x {result['candidates']} candidates, {result['steps']} steps over {len(modes)} modes in "
+          f"{result['seconds']:.2f}s ({result['games_per_second']:.0f} games/s)")
+    for mode, error in result["load_errors"].items():
+        print(f"LOAD ERROR {mode}: {error}")
+    for failure in result["failures"]:
+        divergence = failure["divergence"] or {}
+        print(f"DIVERGENCE {failure['candidate']} on {failure['mode']}: {divergence.get('what')} at step "
+              f"{divergence.get('step')} of {len(failure['actions'])} (shrunk from {failure['original_length']})")
+        print(f"  actions: {json.dumps(failure['actions'])}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            for failure in result["failures"]:
+                f.write(json.dumps(failure, default=str) + "\n")
+    sys.exit(1 if result["failures"] or result["load_errors"] else 0)
+
+if __name__ == "__main__":
+    main()
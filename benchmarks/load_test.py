@@ -0,0 +1,177 @@
+"""
+Load generator for the /api/v1 game server.
+Each virtual client opens a keep-alive connection, creates a session and then
+alternates GET /game/state with POST /game/action (a random legal choice, or an
+advance when there is none). Reports requests/s and latency percentiles.
+
+    python -m benchmarks.load_test --clients 1000 --requests 20 --spawn
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+class Client:
+    """Minimal HTTP/1.1 keep-alive JSON client"""
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.token: Optional[str] = None
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Dict]:
+        data = json.dumps(body).encode() if body is not None else b""
+        headers = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(data)}"]
+        if body is not None:
+            headers.append("Content-Type: application/json")
+        if self.token:
+            headers.append(f"Authorization: Bearer {self.token}")
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + data)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else {}
+        return status, payload
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+async def run_client(host: str, port: int, mode: str, requests: int, rng: random.Random,
+                     latencies: List[float], errors: List[str], actions: Counter) -> None:
+    client = Client(host, port)
+
+    async def timed(method: str, path: str, body: Optional[Dict] = None) -> Dict:
+        start = time.perf_counter()
+        status, payload = await client.request(method, path, body)
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append(f"{method} {path}: {status} {payload.get('message')}")
+        return payload.get("data", {})
+
+    try:
+        await client.connect()
+        data = await timed("POST", "/api/v1/sessions", {"mode": mode})
+        client.token = data.get("token")
+        if not client.token:
+            return
+        for i in range(requests):
+            if i % 2 == 0:
+                data = await timed("GET", "/api/v1/game/state")
+                continue
+            choices = data.get("legal_choices", [])
+            if choices:
+                card, choice = rng.choice(choices)
+                action = {"type": "choice", "card": card, "choice": choice}
+            else:
+                action = {"type": "advance", "mode": "advance_cards"}
+            data = await timed("POST", "/api/v1/game/action", action)
+            actions["sent"] += 1
+            if data.get("ok") is False:
+                actions["refused"] += 1  # Refused actions do no engine work; too many skew the numbers
+        await timed("DELETE", "/api/v1/sessions")
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+        errors.append(f"connection: {type(e).__name__}: {e}")
+    finally:
+        await client.close()
+
+async def run_load(url: str, mode: str, clients: int, requests: int, concurrency: int, seed: int) -> Dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    latencies: List[float] = []
+    errors: List[str] = []
+    actions: Counter = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(index: int) -> None:
+        async with semaphore:
+            await run_client(host, port, mode, requests, random.Random(seed + index), latencies, errors, actions)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+    return {
+        "clients": clients,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "actions": actions["sent"],
+        "refused_actions": actions["refused"],
+        "elapsed_s": elapsed,
+        "requests_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(50) * 1000,
+        "p90_ms": percentile(90) * 1000,
+        "p99_ms": percentile(99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0
+    }
+
+async def wait_for_port(host: str, port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure requests/s and latency of the game server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mode", default="0507_terran")
+    parser.add_argument("--clients", type=int, default=200, help="Sessions to create in total")
+    parser.add_argument("--requests", type=int, default=20, help="State/action requests per session")
+    parser.add_argument("--concurrency", type=int, default=200, help="Clients active at once")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="Start a local server on the URL's port first")
+    parser.add_argument("--workers", type=int, default=8, help="Engine threads of a spawned server")
+    args = parser.parse_args()
+
+    server = None
+    parts = urlsplit(args.url)
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, "-m", "backend.server", "--host", parts.hostname,
+                                   "--port", str(parts.port), "--workers", str(args.workers)],
+                                  stdout=subprocess.DEVNULL)
+    try:
+        if server is not None:
+            asyncio.run(wait_for_port(parts.hostname, parts.port))
+        report = asyncio.run(run_load(args.url, args.mode, args.clients, args.requests,
+                                      args.concurrency, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
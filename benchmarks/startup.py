@@ -0,0 +1,122 @@
+"""
+Startup benchmark for fresh processes.
+Each case runs in a new interpreter, as a spawned pool worker or a CLI run starts:
+
+- interpreter: python -c pass, the floor everything else sits on
+- import: from backend.game_state import GameState
+- first_game_yaml: import plus the first GameState of a mode, parsing its YAML
+- first_game_compiled: the same with the mode in the compiled cache (no YAML)
+- spawn_pool: a spawn-context process pool attaching published modes, until every
+  worker has built a game
+
+Every in-process case also lists which heavy modules it loaded; importing the
+backend should load none of them.
+
+    python -m benchmarks.startup --repeat 10 --mode 0507_terran
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from backend import debug
+from backend.game_loader import COMPILED_CACHE_ENV, attach_modes, published_modes
+from backend.game_state import GameState
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("yaml", "asyncio", "multiprocessing", "concurrent.futures", "argparse", "PyQt6", "numpy")
+
+_CHILD = """
+import sys, time, json
+started = time.perf_counter()
+{body}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_IMPORT = "from backend.game_state import GameState"
+_FIRST_GAME = """from backend.game_state import GameState
+from pathlib import Path
+from backend import debug
+debug.set_debug(False)
+GameState(Path({config!r}), {mode!r})"""
+
+def run_child(body: str, cache_dir: Optional[str] = None) -> Dict:
+    """Run a snippet in a fresh interpreter; its own timing, the process wall time and
+    the heavy modules it loaded. cache_dir is its compiled mode cache ('' for none)."""
+    env = dict(os.environ)
+    if cache_dir is not None:
+        env[COMPILED_CACHE_ENV] = cache_dir
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", _CHILD.format(body=body, heavy=HEAVY_MODULES)], cwd=ROOT,
+                            env=env, capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - started
+    return dict(json.loads(output.strip().splitlines()[-1]), wall=wall)
+
+def _summary(runs: List[Dict]) -> Dict:
+    return {
+        "median_s": statistics.median(run["seconds"] for run in runs),
+        "min_s": min(run["seconds"] for run in runs),
+        "median_wall_s": statistics.median(run["wall"] for run in runs),
+        "loaded": sorted({module for run in runs for module in run.get("loaded", [])})
+    }
+
+def _worker_init(mode_handles: List[Dict]) -> None:
+    debug.set_debug(False)
+    attach_modes(mode_handles)
+
+def _first_game(config_path: str, mode: str) -> int:
+    return len(GameState(Path(config_path), mode).active_cards)
+
+def time_spawn_pool(config_path: Path, mode: str, jobs: int) -> Dict:
+    """Seconds from creating a spawn pool until each of its workers built a game"""
+    context = multiprocessing.get_context("spawn")
+    with published_modes([(mode, str(config_path))]) as handles:
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_worker_init,
+                                 initargs=(handles,)) as executor:
+            list(executor.map(_first_game, [str(config_path)] * jobs, [mode] * jobs))
+            seconds = time.perf_counter() - started
+    return {"seconds": seconds, "wall": seconds}
+
+def run_startup(mode: str, config_path: Path, repeat: int, jobs: int) -> Dict:
+    results = {}
+    results["interpreter"] = _summary([run_child("pass") for _ in range(repeat)])
+    results["import"] = _summary([run_child(_IMPORT) for _ in range(repeat)])
+    first_game = _FIRST_GAME.format(config=str(Path(config_path).resolve()), mode=mode)
+    results["first_game_yaml"] = _summary([run_child(first_game, cache_dir="") for _ in range(repeat)])
+    with tempfile.TemporaryDirectory() as cache_dir:
+        run_child(first_game, cache_dir=cache_dir)  # Fills the private cache
+        results["first_game_compiled"] = _summary([run_child(first_game, cache_dir=cache_dir)
+                                                   for _ in range(repeat)])
+    results["spawn_pool"] = _summary([time_spawn_pool(Path(config_path), mode, jobs) for _ in range(repeat)])
+    results["spawn_pool"]["jobs"] = jobs
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and startup time of fresh processes")
+    parser.add_argument("--mode", default="0507_terran")
+    parser.add_argument("--config", default="config")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per case")
+    parser.add_argument("--jobs", type=int, default=2, help="Workers of the spawn pool case")
+    parser.add_argument("--out", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    results = run_startup(args.mode, Path(args.config), args.repeat, args.jobs)
+    for case, row in results.items():
+        loaded = f"  loaded: {', '.join(row['loaded'])}" if row["loaded"] else ""
+        print(f"{case:<20} {row['median_s'] * 1000:9.1f} ms median {row['min_s'] * 1000:9.1f} ms min "
+              f"{row['median_wall_s'] * 1000:9.1f} ms process{loaded}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
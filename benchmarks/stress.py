@@ -0,0 +1,266 @@
+"""
+Random-play stress driver.
+Plays every shipped mode with random legal actions for millions of steps across a
+process pool and checks the engine's invariants after every step:
+
+    python -m benchmarks.stress --steps 5000000
+
+An action is a choice among the pairs can_make_choice accepts, advance_time in one of
+its modes ("auto", "manual", "advance_cards") or manual_time_advance by a random
+amount. A game ends when it is over, when an invariant breaks, when the engine raises
+(RecursionError included) or after --game-steps steps; the next one starts fresh.
+
+Each violation is written as an NDJSON action log in the runner's format: a header
+line saying what broke, then one {"action": ...} line per step up to the failing one.
+Replay it with
+
+    python play_game.py --headless --mode <mode> --actions <file> --output steps
+
+Only actions that changed the state are logged (a refused manual advance that still
+moved time is logged as the advance that happened), so the replay doesn't stop early.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from backend import debug
+from backend.game_loader import GameLoader, attach_modes, mode_error, published_modes
+from backend.game_state import GameState
+from backend.runner import apply_action, legal_choices
+
+ADVANCE_MODES = ("auto", "manual", "advance_cards")
+
+def random_action(game: GameState, rng: random.Random, max_amount: int) -> Dict:
+    """A random action in the runner's format; choices are only ever legal ones"""
+    roll = rng.random()
+    if roll < 0.6:
+        choices = legal_choices(game)
+        if choices:
+            card_index, choice_index = rng.choice(choices)
+            return {"type": "choice", "card": card_index, "choice": choice_index}
+    if roll < 0.85:
+        return {"type": "advance", "mode": rng.choice(ADVANCE_MODES)}
+    return {"type": "manual_advance", "amount": rng.randint(1, max_amount)}
+
+class Snapshot:
+    """What the invariants compare against from the step before"""
+    __slots__ = ("time", "timers")
+
+    def __init__(self, game: GameState):
+        self.time = game.current_time
+        self.timers = dict(game.effect_timers)
+
+def _drawable(game: GameState, card) -> bool:
+    """Whether _draw_cards would take this card now (relic requirements met)"""
+    if card.requirements is None or 'relics' not in card.requirements:
+        return True
+    required = {r.lower() for r in card.requirements['relics']}
+    return required.issubset({r.name.lower() for r in game.relics})
+
+def _expected_game_over(game: GameState) -> bool:
+    if not game.active_cards and not game.card_queue:
+        return True
+    for resource, amount in game.resources.items():
+        config = game.resource_config["resources"][resource]
+        if amount < config.get("min_amount", amount) or amount > config.get("max_amount", amount):
+            return True
+    return False
+
+def check_invariants(game: GameState, before: Snapshot) -> List[Tuple[str, str]]:
+    """(invariant, message) for everything that doesn't hold after a step"""
+    broken = []
+    for where in ("active_cards", "card_queue"):
+        for card in getattr(game, where):
+            if card.stack_count < 1:
+                broken.append(("stack_count", f"{where} {card.title} has stack_count {card.stack_count}"))
+    for card in game.card_queue:
+        if card.drawed_at <= game.current_time and _drawable(game, card):
+            broken.append(("queue_due", f"{card.title} (drawed_at {card.drawed_at}) still queued at time "
+                                        f"{game.current_time} with its requirements met"))
+    if game.current_time < before.time:
+        broken.append(("time_monotonic", f"time went back from {before.time} to {game.current_time}"))
+    for key, value in game.effect_timers.items():
+        if value < before.timers.get(key, value):
+            broken.append(("timer_monotonic", f"{key} went back from {before.timers[key]} to {value}"))
+        if value > game.current_time:
+            broken.append(("timer_monotonic", f"{key} is at {value}, after the current time {game.current_time}"))
+    expected = _expected_game_over(game)
+    if game.is_game_over() != expected:
+        broken.append(("game_over", f"is_game_over() is {not expected} but the resources and cards say {expected}"))
+    return broken
+
+def _logged(action: Dict, ok: bool, time_before: int, game: GameState) -> Optional[Dict]:
+    """The action to put in the replay log, None if it changed nothing"""
+    if ok or action["type"] == "choice":
+        return action
+    if game.current_time != time_before:
+        # Refused part way (an immediate card showed up): replay the part that happened
+        return {"type": "manual_advance", "amount": game.current_time - time_before}
+    return None
+
+def play_game(config_path: Path, mode: str, seed: str, max_steps: int, max_amount: int) -> Dict:
+    """Play one random game; its steps and first violation (with the replay log), if any"""
+    rng = random.Random(seed)
+    game = GameState(config_path, mode)
+    game.set_undo_limit(0)
+    log = []
+    steps = 0
+    violation = None
+    while steps < max_steps and not game.is_game_over():
+        action = random_action(game, rng, max_amount)
+        before = Snapshot(game)
+        try:
+            ok = apply_action(game, action)
+        except RecursionError:
+            violation = ("recursion", f"RecursionError in {action['type']}")
+        except Exception as e:
+            violation = ("exception", f"{type(e).__name__}: {e}")
+        steps += 1
+        if violation is None:
+            logged = _logged(action, ok, before.time, game)
+            if logged is not None:
+                log.append(logged)
+            broken = check_invariants(game, before)
+            if broken:
+                violation = broken[0]
+        else:
+            log.append(action)
+        if violation is not None:
+            invariant, message = violation
+            return {"steps": steps, "game_over": False, "violation": {
+                "invariant": invariant, "message": message, "mode": mode, "seed": seed,
+                "step": steps, "time": game.current_time, "actions": log}}
+    return {"steps": steps, "game_over": game.is_game_over(), "violation": None}
+
+def _stress_batch(modes: List[Tuple[Path, str]], seed: int, batch: int, steps: int, max_game_steps: int,
+                  max_amount: int, max_logs: int) -> Dict:
+    """Play games until `steps` steps are done; the games depend only on (seed, batch)"""
+    played = 0
+    done = 0
+    game_overs = 0
+    counts: Counter = Counter()
+    violations = []
+    started = time.perf_counter()
+    while done < steps:
+        config_path, mode = modes[(batch + played) % len(modes)]
+        result = play_game(config_path, mode, f"{seed}:{batch}:{played}", min(max_game_steps, steps - done),
+                           max_amount)
+        played += 1
+        done += result["steps"]
+        game_overs += result["game_over"]
+        violation = result["violation"]
+        if violation is not None:
+            key = (violation["mode"], violation["invariant"])
+            counts[key] += 1
+            if counts[key] <= max_logs:
+                violations.append(violation)
+    return {"games": played, "steps": done, "game_overs": game_overs, "seconds": time.perf_counter() - started,
+            "counts": counts, "violations": violations}
+
+def _worker_init(mode_handles: List[Dict]) -> None:
+    debug.set_debug(False)
+    attach_modes(mode_handles)
+
+def stress(modes: List[Tuple[Path, str]], steps: int, seed: int = 0, jobs: int = 1, batch_steps: int = 20000,
+           max_game_steps: int = 2000, max_amount: int = 10, max_logs: int = 3) -> Dict:
+    """Play `steps` random steps over the modes (in worker processes when jobs > 1;
+    the games are the same either way). Keeps up to max_logs violations per
+    (mode, invariant) and counts the rest. Modes that fail to load are left out and
+    reported in load_errors."""
+    load_errors = {}
+    for config_path, mode in modes:
+        error = mode_error(mode, config_path)  # Also parses the configs before timing
+        if error is not None:
+            load_errors[mode] = error
+    modes = [(config_path, mode) for config_path, mode in modes if mode not in load_errors]
+    batches = [(batch, min(batch_steps, steps - start))
+               for batch, start in enumerate(range(0, steps, batch_steps))] if modes else []
+    started = time.perf_counter()
+    if jobs <= 1:
+        results = [_stress_batch(modes, seed, batch, count, max_game_steps, max_amount, max_logs)
+                   for batch, count in batches]
+    else:
+        with published_modes((mode, str(config_path)) for config_path, mode in modes) as handles, \
+                ProcessPoolExecutor(max_workers=jobs, initializer=_worker_init, initargs=(handles,)) as executor:
+            futures = [executor.submit(_stress_batch, modes, seed, batch, count, max_game_steps, max_amount, max_logs)
+                       for batch, count in batches]
+            results = [future.result() for future in as_completed(futures)]
+    seconds = time.perf_counter() - started
+    counts: Counter = Counter()
+    violations = []
+    for result in results:
+        counts.update(result["counts"])
+        violations.extend(result["violations"])
+    kept: Counter = Counter()
+    logs = []
+    for violation in sorted(violations, key=lambda v: (v["mode"], v["invariant"], len(v["actions"]))):
+        key = (violation["mode"], violation["invariant"])
+        kept[key] += 1
+        if kept[key] <= max_logs:
+            logs.append(violation)  # The shortest logs of each kind
+    done = sum(result["steps"] for result in results)
+    return {
+        "steps": done,
+        "games": sum(result["games"] for result in results),
+        "game_overs": sum(result["game_overs"] for result in results),
+        "seconds": seconds,
+        "steps_per_second": done / seconds if seconds else 0.0,
+        "busy_seconds": sum(result["seconds"] for result in results),
+        "counts": {f"{mode}/{invariant}": count for (mode, invariant), count in sorted(counts.items())},
+        "violations": logs,
+        "load_errors": load_errors
+    }
+
+def write_violation(violation: Dict, out_dir: Path, index: int) -> Path:
+    """Write a violation as a replayable NDJSON action log"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    name = re.sub(r"[^\w.-]", "_", f"{violation['mode']}_{violation['invariant']}_{index}")
+    path = out_dir / f"{name}.ndjson"
+    header = {key: value for key, value in violation.items() if key != "actions"}
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(dict(header, record="violation"), ensure_ascii=False) + "\n")
+        for action in violation["actions"]:
+            f.write(json.dumps({"action": action}) + "\n")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Play random legal actions at volume and check engine invariants")
+    parser.add_argument("--steps", type=int, default=1000000, help="Total steps over all modes")
+    parser.add_argument("--mode", action="append", help="Mode to include (default: all)")
+    parser.add_argument("--config", default="config", help="Config directory of the modes")
+    parser.add_argument("--game-steps", type=int, default=2000, help="Steps before a game is restarted")
+    parser.add_argument("--max-advance", type=int, default=10, help="Largest manual_time_advance amount")
+    parser.add_argument("--batch-steps", type=int, default=20000, help="Steps per worker task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--logs", type=int, default=3, help="Action logs kept per mode and invariant")
+    parser.add_argument("--out", default="stress_violations", help="Directory for the violation action logs")
+    args = parser.parse_args()
+
+    debug.set_debug(False)
+    config_path = Path(args.config)
+    modes = [(config_path, mode) for mode in args.mode or sorted(GameLoader.get_available_modes(config_path))]
+    result = stress(modes, args.steps, args.seed, args.jobs, args.batch_steps, args.game_steps,
+                    args.max_advance, args.logs)
+
+    print(f"{result['steps']} steps in {result['games']} games ({result['game_overs']} played to game over) over "
+          f"{len(modes)} modes in {result['seconds']:.2f}s: {result['steps_per_second']:.0f} steps/s")
+    for mode, error in result["load_errors"].items():
+        print(f"LOAD ERROR {mode}: {error}")
+    for key, count in result["counts"].items():
+        print(f"VIOLATION {key}: {count} game(s)")
+    for index, violation in enumerate(result["violations"]):
+        path = write_violation(violation, Path(args.out), index)
+        print(f"  {violation['invariant']} at step {violation['step']}: {violation['message']}")
+        print(f"    replay: python play_game.py --headless --mode {violation['mode']} --actions {path} --output steps")
+    sys.exit(1 if result["counts"] or result["load_errors"] else 0)
+
+if __name__ == "__main__":
+    main()
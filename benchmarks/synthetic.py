@@ -0,0 +1,150 @@
+"""
+Synthetic game modes for benchmarking.
+Generates resources/relics/cards YAML in the normal config layout, scaled from a
+handful of cards up to 100k cards, thousands of relics and deep next_cards chains.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+import yaml
+
+try:
+    from yaml import CSafeDumper as _Dumper
+except ImportError:
+    _Dumper = yaml.SafeDumper
+
+CHAIN_TITLE = "Chain Step"
+FILLER_TITLES = 50  # Filler cards share titles so same-time draws stack
+
+@dataclass
+class SyntheticSpec:
+    """Shape of a synthetic mode"""
+    n_cards: int
+    n_relics: int
+    chain_depth: int
+    n_resources: int = 4
+
+    @property
+    def name(self) -> str:
+        return f"synthetic_c{self.n_cards}_r{self.n_relics}_d{self.chain_depth}"
+
+    @property
+    def spread(self) -> int:
+        """Time range the filler cards are scheduled over (about ten cards per time unit)"""
+        return max(20, (self.n_cards - self.chain_depth) // 10)
+
+    @classmethod
+    def for_size(cls, n_cards: int) -> 'SyntheticSpec':
+        """Default shape for a card count: relics and chain depth grow with it"""
+        return cls(
+            n_cards=n_cards,
+            n_relics=max(1, min(n_cards // 10, 5000)),
+            chain_depth=max(1, min(n_cards // 4, 1000))
+        )
+
+def build_config(spec: SyntheticSpec) -> Dict[str, Dict]:
+    """Build the three config dicts for a synthetic mode"""
+    resource_names = [f"res_{i}" for i in range(spec.n_resources)]
+    resources = {
+        name: {
+            "name": name.replace("_", " ").title(),
+            "description": "Synthetic resource",
+            "initial_amount": 100,
+            "allow_negative": True
+        }
+        for name in resource_names
+    }
+
+    relics = {}
+    for i in range(spec.n_relics):
+        effect = {
+            "type": "resource_per_time",
+            "resource": resource_names[i % spec.n_resources],
+            "amount": 1 + i % 3,
+            "interval": 1 + i % 7
+        }
+        if i % 5 == 4:
+            effect["requirements"] = [resource_names[0]]
+        relics[f"relic_{i}"] = {
+            "name": f"Relic {i}",
+            "description": "Synthetic relic",
+            "passive_effects": [effect]
+        }
+
+    cards = {
+        "start": {
+            "title": "Start",
+            "description": "Synthetic starting card",
+            "drawed_at": 0,
+            "priority": 1,
+            "choices": [
+                {
+                    "description": "Begin",
+                    "effects": {
+                        "relics": {"gain": list(relics)},
+                        "next_cards": [{"card": "chain_0", "time_offset": 1}]
+                    }
+                },
+                {"description": "Begin without relics",
+                 "effects": {"next_cards": [{"card": "chain_0", "time_offset": 1}]}}
+            ]
+        }
+    }
+
+    # A deep chain of cards that are only reachable through next_cards
+    for i in range(spec.chain_depth):
+        effects = {"resources": {resource_names[0]: 1}}
+        if i + 1 < spec.chain_depth:
+            effects["next_cards"] = [{"card": f"chain_{i + 1}", "time_offset": 1}]
+        cards[f"chain_{i}"] = {
+            "title": CHAIN_TITLE,
+            "description": f"Step {i} of the chain",
+            "priority": 2,
+            "choices": [
+                {"description": "Advance", "effects": effects},
+                {"description": "Hold", "requirements": {"resources": {resource_names[0]: 10 ** 9}}}
+            ]
+        }
+
+    # Scheduled filler cards fill the queue
+    n_fillers = max(0, spec.n_cards - spec.chain_depth - 1)
+    for i in range(n_fillers):
+        resource = resource_names[i % spec.n_resources]
+        cards[f"card_{i}"] = {
+            "title": f"Event {i % FILLER_TITLES}",
+            "description": "Synthetic scheduled card",
+            "drawed_at": 1 + (i * 7919) % spec.spread,
+            "priority": 1 + i % 3,
+            "choices": [
+                {"description": "Take", "effects": {"resources": {resource: 1}}},
+                {"description": "Skip"}
+            ]
+        }
+
+    return {
+        "resource_config": {"resources": resources},
+        "relic_config": {"relics": relics},
+        "card_config": {"cards": cards}
+    }
+
+def policy_rules() -> list:
+    """Policy rules that resolve every card of a synthetic mode"""
+    rules = [{"card_title": "Start", "choice_description": "Begin"},
+             {"card_title": CHAIN_TITLE, "choice_description": "Advance"}]
+    rules += [{"card_title": f"Event {i}", "choice_description": "Take"} for i in range(FILLER_TITLES)]
+    return rules
+
+def write_mode(spec: SyntheticSpec, config_path: Path) -> str:
+    """Write a synthetic mode under config_path and return its mode name"""
+    config = build_config(spec)
+    mode_path = Path(config_path) / spec.name
+    mode_path.mkdir(parents=True, exist_ok=True)
+    for filename, key in (("resources.yaml", "resource_config"),
+                          ("relics.yaml", "relic_config"),
+                          ("cards.yaml", "card_config")):
+        with open(mode_path / filename, 'w', encoding='utf-8') as f:
+            yaml.dump(config[key], f, Dumper=_Dumper, sort_keys=False, allow_unicode=True)
+    with open(mode_path / "description.txt", 'w', encoding='utf-8') as f:
+        f.write(f"Synthetic benchmark mode: {spec.n_cards} cards, {spec.n_relics} relics, "
+                f"chain depth {spec.chain_depth}\n")
+    return spec.name
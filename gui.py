@@ -2,16 +2,31 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QHBoxLayout, QLabel, QPushButton, QFrame, QScrollArea,
                             QGridLayout, QDialog, QSizePolicy, QGroupBox, QTreeWidget,
                             QTreeWidgetItem, QMessageBox, QRadioButton, QTextEdit, QSpinBox,
-                            QComboBox, QLineEdit)
+                            QComboBox, QLineEdit, QCheckBox, QFileDialog, QInputDialog)
 from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QFont, QColor, QPalette, QAction
+from PyQt6.QtGui import QFont, QColor, QPalette, QAction, QPainter, QPen
 from backend.game_state import GameState
-from backend.state_history import StateManager
+from backend.state_history import RetentionPolicy, StateManager
+from backend.lookahead import LookaheadPool
+from backend.profiling import Profiler
+from backend.memory import MemoryProfile, format_bytes
+from backend.timeseries import ResourceRecorder
+from backend.optimizer import PolicyOptimizer, policy_to_rules
+from backend.advisor import Advisor
+from backend.persistence import (BRANCH_POINTS, EVERY_CHOICE, EVERY_N, EVERY_TIME_UNIT, CoalescePolicy,
+                                 HistoryWriter)
+from backend.game_state import Policy
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import json
+import os
 import sys
 import time
 from backend.game_loader import GameLoader
 
+# Time units one auto jump may advance on the GUI thread (about 0.1 s of engine work)
+AUTO_JUMP_MAX_STEPS = 10000
+
 class TimelineCard(QFrame):
     def __init__(self, card, parent=None):
         super().__init__(parent)
@@ -235,6 +250,61 @@ class TimelineView(QWidget):
         final_spacer.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
         self.cards_layout.addWidget(final_spacer)
 
+class ResourceChart(QWidget):
+    """Line chart of recorded resources over the last `span` time units"""
+    COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f"]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.recorder = None
+        self.span = 100
+        self.setMinimumHeight(140)
+        
+    def set_recorder(self, recorder: ResourceRecorder):
+        self.recorder = recorder
+        self.update()
+        
+    def set_span(self, span: int):
+        self.span = span
+        self.update()
+        
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.fillRect(self.rect(), QColor("white"))
+        if self.recorder is None or self.recorder.last_time is None:
+            return
+        end = self.recorder.last_time
+        start = max(0, end - self.span)
+        width = max(1, self.width() - 10)
+        height = max(1, self.height() - 24)
+        # Only the downsampled points of the visible window are drawn, about two per pixel column
+        series = {name: self.recorder.window(name, start, end, max_points=width * 2)
+                  for name in self.recorder.resources}
+        values = [value for points in series.values() for _, value in points]
+        if not values:
+            return
+        low, high = min(values), max(values)
+        if low == high:
+            low, high = low - 1, high + 1
+        
+        def x(t):
+            return 5 + (max(t, start) - start) * width / max(1, end - start)
+        
+        def y(value):
+            return 5 + (high - value) * height / (high - low)
+        
+        for i, (name, points) in enumerate(series.items()):
+            color = QColor(self.COLORS[i % len(self.COLORS)])
+            painter.setPen(QPen(color, 1.5))
+            for (t0, v0), (t1, v1) in zip(points, points[1:]):
+                # Values are steps: hold the old value until the change point
+                painter.drawLine(int(x(t0)), int(y(v0)), int(x(t1)), int(y(v0)))
+                painter.drawLine(int(x(t1)), int(y(v0)), int(x(t1)), int(y(v1)))
+            painter.drawText(5 + i * 90, self.height() - 5, f"{name}: {points[-1][1] if points else '-'}")
+        painter.setPen(QColor("gray"))
+        painter.drawText(self.width() - 160, 15, f"t {start}-{end}, {low}..{high}")
+
 class CardDetailsDialog(QDialog):
     def __init__(self, card, parent=None):
         super().__init__(parent)
@@ -317,9 +387,14 @@ class CardDetailsDialog(QDialog):
         self.setLayout(layout)
 
 class ChoiceWidget(QFrame):
-    def __init__(self, choice, parent=None):
+    def __init__(self, choice, parent=None, game_window=None, card_index=None, choice_index=None):
         super().__init__(parent)
         self.choice = choice
+        self.game_window = game_window
+        self.card_index = card_index
+        self.choice_index = choice_index
+        self.projection_label = None
+        self.advice_label = None
         self.setup_ui()
         
     def setup_ui(self):
@@ -363,8 +438,56 @@ class ChoiceWidget(QFrame):
             eff_label.setStyleSheet("color: #4CAF50;")
             layout.addWidget(eff_label)
         
+        # Lookahead projection, filled in by the game window once it has been simulated
+        if self.game_window is not None:
+            self.projection_label = QLabel("")
+            self.projection_label.setWordWrap(True)
+            self.projection_label.setStyleSheet("color: #666666;")
+            self.projection_label.hide()
+            layout.addWidget(self.projection_label)
+            self.advice_label = QLabel("")
+            self.advice_label.setStyleSheet("color: #4A90E2;")
+            self.advice_label.hide()
+            layout.addWidget(self.advice_label)
+        
         self.setLayout(layout)
 
+    def set_projection(self, projection, resources):
+        """Show the projected resources of this choice at +N time units"""
+        if self.projection_label is None:
+            return
+        parts = []
+        for resource, amount in projection.resources.items():
+            change = amount - resources.get(resource, 0)
+            if change != 0:
+                parts.append(f"{resource}: {amount} ({change:+})")
+        text = f"At +{projection.horizon}: " + (", ".join(parts) if parts else "no change")
+        if projection.stop_reason != "horizon":
+            text += f" (stops at {projection.end_time}: {projection.stop_reason.replace('_', ' ')})"
+        self.projection_label.setText(text)
+        self.projection_label.show()
+
+    def set_advice(self, advice):
+        """Show the advisor's rank and expected objective for this choice"""
+        if self.advice_label is None:
+            return
+        if advice.rollouts == 0:
+            text = f"Advisor #{advice.rank}: choice fails"
+        else:
+            text = f"Advisor #{advice.rank}: expected {advice.mean:.1f} (best {advice.best:.1f}, {advice.rollouts} rollouts)"
+        self.advice_label.setText(text)
+        self.advice_label.show()
+
+    def enterEvent(self, event):
+        if self.game_window is not None:
+            self.game_window.hover_choice(self.card_index, self.choice_index)
+        super().enterEvent(event)
+
+    def leaveEvent(self, event):
+        if self.game_window is not None:
+            self.game_window.hover_choice(None, None)
+        super().leaveEvent(event)
+
 class CardWidget(QFrame):
     def __init__(self, card, index, parent=None):
         super().__init__(parent)
@@ -420,7 +543,9 @@ class CardWidget(QFrame):
             choice_layout = QHBoxLayout()
             
             # Choice details
-            choice_widget = ChoiceWidget(choice)
+            choice_widget = ChoiceWidget(choice, game_window=self.game_window,
+                                         card_index=self.index, choice_index=i)
+            self.game_window.choice_widgets.append(choice_widget)
             choice_layout.addWidget(choice_widget)
             
             # Button container for preview and select
@@ -499,6 +624,7 @@ class HistoryDialog(QDialog):
         # Tree widget for state history
         self.tree = QTreeWidget()
         self.tree.setHeaderLabels(["Last Played", "Message", "ID"])
+        self.tree.setSelectionMode(QTreeWidget.SelectionMode.ExtendedSelection)
         self.tree.itemDoubleClicked.connect(self.load_selected_state)
         layout.addWidget(self.tree)
         
@@ -509,6 +635,19 @@ class HistoryDialog(QDialog):
         load_btn.clicked.connect(self.load_selected_state)
         button_layout.addWidget(load_btn)
         
+        compare_btn = QPushButton("Compare")
+        compare_btn.setToolTip("Compare two selected states, or the selected state with the current one")
+        compare_btn.clicked.connect(self.compare_selected_states)
+        button_layout.addWidget(compare_btn)
+        
+        label_btn = QPushButton("Label Selected...")
+        label_btn.clicked.connect(self.label_selected_state)
+        button_layout.addWidget(label_btn)
+        
+        collect_btn = QPushButton("Clean Up History")
+        collect_btn.clicked.connect(self.collect_garbage)
+        button_layout.addWidget(collect_btn)
+        
         close_btn = QPushButton("Close")
         close_btn.clicked.connect(self.accept)
         button_layout.addWidget(close_btn)
@@ -527,9 +666,14 @@ class HistoryDialog(QDialog):
         
         # First pass: create all items
         for node_data in self.state_manager.get_tree_structure():
+            message = node_data['message']
+            if node_data['label']:
+                message = f"[{node_data['label']}] {message}"
+            if len(node_data['parents']) > 1:
+                message += f" (reached along {len(node_data['parents'])} lines)"
             item = QTreeWidgetItem([
                 time.strftime("%H:%M:%S", time.localtime(node_data['last_played'])),
-                node_data['message'],
+                message,
                 node_data['id']
             ])
             items[node_data['id']] = item
@@ -542,7 +686,7 @@ class HistoryDialog(QDialog):
         # Second pass: set up parent-child relationships
         for node_data in self.state_manager.get_tree_structure():
             item = items[node_data['id']]
-            if node_data['parent']:
+            if node_data['parent'] in items:
                 parent_item = items[node_data['parent']]
                 parent_item.addChild(item)
             else:
@@ -566,6 +710,51 @@ class HistoryDialog(QDialog):
             self.accept()  # Close dialog after successful load
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load state: {str(e)}")
+    
+    def compare_selected_states(self):
+        """Show how two states differ and what each line did since they split"""
+        node_ids = [item.text(2) for item in self.tree.selectedItems()]
+        if len(node_ids) == 1 and self.state_manager.current_node_id != node_ids[0]:
+            node_ids.append(self.state_manager.current_node_id)
+        if len(node_ids) != 2:
+            QMessageBox.warning(self, "Select States",
+                                "Select two states, or one state to compare with the current one.")
+            return
+        comparison = self.state_manager.compare(node_ids[0], node_ids[1])
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Compare States")
+        dialog.setMinimumSize(500, 400)
+        dialog_layout = QVBoxLayout()
+        text = QTextEdit()
+        text.setReadOnly(True)
+        text.setPlainText("\n".join(comparison.describe()))
+        dialog_layout.addWidget(text)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(dialog.accept)
+        dialog_layout.addWidget(close_btn)
+        dialog.setLayout(dialog_layout)
+        dialog.exec()
+    
+    def label_selected_state(self):
+        """Name the selected state so history clean-up keeps it"""
+        selected_items = self.tree.selectedItems()
+        if not selected_items:
+            QMessageBox.warning(self, "No Selection", "Please select a state to label.")
+            return
+        node_id = selected_items[0].text(2)
+        current = self.state_manager.nodes[node_id].label or ""
+        label, ok = QInputDialog.getText(self, "Label State", "Label (empty to remove):", text=current)
+        if ok:
+            self.state_manager.label_node(node_id, label.strip())
+            self.update_tree()
+    
+    def collect_garbage(self):
+        """Drop intermediate states the retention policy doesn't keep"""
+        report = self.state_manager.collect_garbage()
+        self.update_tree()
+        QMessageBox.information(self, "History Cleaned Up",
+                                f"Removed {report.removed} of {report.nodes_before} states, "
+                                f"{report.bytes_reclaimed / 1024:.1f} KiB reclaimed.")
 
 class GameLogDialog(QDialog):
     """Dialog for viewing the game event log"""
@@ -635,6 +824,185 @@ class GameLogDialog(QDialog):
                 # Add a separator
                 self.log_text.append("-" * 50)
 
+class PerformanceDialog(QDialog):
+    """Dialog showing per-phase engine timings"""
+    COLUMNS = ["Phase", "Count", "Total (ms)", "Mean (ms)", "p50 (ms)", "p90 (ms)", "p99 (ms)", "Max (ms)"]
+    
+    def __init__(self, game_window, parent=None):
+        super().__init__(parent)
+        self.game_window = game_window
+        self.setup_ui()
+        
+    def setup_ui(self):
+        self.setWindowTitle("Performance")
+        self.setMinimumSize(800, 400)
+        
+        layout = QVBoxLayout()
+        
+        # Profiling switches
+        options_layout = QHBoxLayout()
+        self.enable_check = QCheckBox("Enable profiling")
+        self.enable_check.setChecked(self.game_window.profiler is not None)
+        self.enable_check.toggled.connect(self.toggle_profiling)
+        options_layout.addWidget(self.enable_check)
+        self.trace_check = QCheckBox("Record trace")
+        self.trace_check.setChecked(self.game_window.profiler is not None and self.game_window.profiler.trace)
+        self.trace_check.toggled.connect(self.toggle_profiling)
+        options_layout.addWidget(self.trace_check)
+        layout.addLayout(options_layout)
+        
+        # Phase table
+        self.stats_tree = QTreeWidget()
+        self.stats_tree.setHeaderLabels(self.COLUMNS)
+        layout.addWidget(self.stats_tree)
+        
+        # Buttons
+        button_layout = QHBoxLayout()
+        
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.update_stats)
+        button_layout.addWidget(refresh_btn)
+        
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset_stats)
+        button_layout.addWidget(reset_btn)
+        
+        export_btn = QPushButton("Export Trace...")
+        export_btn.clicked.connect(self.export_trace)
+        button_layout.addWidget(export_btn)
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        button_layout.addWidget(close_btn)
+        
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+        
+        self.update_stats()
+    
+    def toggle_profiling(self, _checked=None):
+        self.game_window.set_profiling(self.enable_check.isChecked(), self.trace_check.isChecked())
+        self.update_stats()
+    
+    def update_stats(self):
+        """Update the table with the current phase statistics"""
+        self.stats_tree.clear()
+        for key, value in self.game_window.state_manager.cache.stats().items():
+            self.stats_tree.addTopLevelItem(QTreeWidgetItem([f"state_cache_{key}", str(value)]))
+        for key, value in self.game_window.state_manager.gc_stats.items():
+            self.stats_tree.addTopLevelItem(QTreeWidgetItem([f"history_gc_{key}", str(value)]))
+        for key, value in self.game_window.state_manager.dag_stats.items():
+            self.stats_tree.addTopLevelItem(QTreeWidgetItem([f"history_{key}", str(value)]))
+        profiler = self.game_window.profiler
+        if profiler is None:
+            return
+        stats = profiler.stats()
+        for phase, data in stats["phases"].items():
+            item = QTreeWidgetItem([phase, str(data["count"])] + [
+                f"{data[key] * 1000:.3f}"
+                for key in ("total_s", "mean_s", "p50_s", "p90_s", "p99_s", "max_s")
+            ])
+            self.stats_tree.addTopLevelItem(item)
+        for counter, value in stats["counters"].items():
+            self.stats_tree.addTopLevelItem(QTreeWidgetItem([counter, str(value)]))
+    
+    def reset_stats(self):
+        if self.game_window.profiler is not None:
+            self.game_window.profiler.reset()
+        self.update_stats()
+    
+    def export_trace(self):
+        profiler = self.game_window.profiler
+        if profiler is None or not profiler.trace:
+            QMessageBox.warning(self, "No Trace", "Enable profiling with 'Record trace' first.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Trace", "trace.json", "JSON Files (*.json)")
+        if path:
+            profiler.export_chrome_trace(path)
+
+class MemoryDialog(QDialog):
+    """Dialog showing the bytes held by each part of the game and its history"""
+    COLUMNS = ["Component", "Bytes", "Share", "Per time unit"]
+
+    def __init__(self, game_window, parent=None):
+        super().__init__(parent)
+        self.game_window = game_window
+        self.profile = game_window.memory_profile
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setWindowTitle("Memory")
+        self.setMinimumSize(700, 400)
+
+        layout = QVBoxLayout()
+
+        self.trace_check = QCheckBox("Track allocations (tracemalloc)")
+        self.trace_check.setChecked(self.profile.tracing)
+        self.trace_check.toggled.connect(self.toggle_tracing)
+        layout.addWidget(self.trace_check)
+
+        self.components_tree = QTreeWidget()
+        self.components_tree.setHeaderLabels(self.COLUMNS)
+        layout.addWidget(self.components_tree)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        # Buttons
+        button_layout = QHBoxLayout()
+
+        sample_btn = QPushButton("Sample Now")
+        sample_btn.clicked.connect(self.sample)
+        button_layout.addWidget(sample_btn)
+
+        export_btn = QPushButton("Export Report...")
+        export_btn.clicked.connect(self.export_report)
+        button_layout.addWidget(export_btn)
+
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        button_layout.addWidget(close_btn)
+
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+        self.sample()
+
+    def toggle_tracing(self, checked):
+        if checked:
+            self.profile.start_tracing()
+        else:
+            self.profile.stop_tracing()
+        self.update_report()
+
+    def sample(self):
+        self.profile.sample(self.game_window.game, self.game_window.state_manager)
+        self.update_report()
+
+    def update_report(self):
+        """Fill the table from the latest sample and the growth since the first"""
+        self.components_tree.clear()
+        report = self.profile.report()
+        total = report["total"] or 1
+        for name, row in sorted(report["growth"].items(), key=lambda item: -item[1]["bytes"]):
+            self.components_tree.addTopLevelItem(QTreeWidgetItem([
+                name, format_bytes(row["bytes"]), f"{row['bytes'] / total:.1%}",
+                format_bytes(row["per_time_unit"])
+            ]))
+        for allocation in report["top_allocations"]:
+            self.components_tree.addTopLevelItem(QTreeWidgetItem([
+                allocation["location"], f"+{format_bytes(allocation['size_diff'])}", "", ""
+            ]))
+        text = f"Total: {format_bytes(report['total'])} over {len(report['samples'])} samples"
+        if report["traced_bytes"] is not None:
+            text += f", {format_bytes(report['traced_bytes'])} traced"
+        self.summary_label.setText(text)
+
+    def export_report(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Memory Report", "memory.json", "JSON Files (*.json)")
+        if path:
+            self.profile.save(path)
+
 class TimeAdvanceDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -669,6 +1037,130 @@ class TimeAdvanceDialog(QDialog):
     def get_time_advance(self) -> int:
         return self.time_input.value()
 
+class OptimizerDialog(QDialog):
+    """Dialog for searching a better policy in the background"""
+    def __init__(self, game_window, parent=None):
+        super().__init__(parent)
+        self.game_window = game_window
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="optimizer")
+        self.future = None
+        self.result = None
+        self.progress = []  # Appended from the optimizer thread
+        self.timer = QTimer(self)
+        self.timer.setInterval(200)
+        self.timer.timeout.connect(self.check_progress)
+        self.setup_ui()
+        
+    def setup_ui(self):
+        self.setWindowTitle("Optimize Policy")
+        self.setMinimumWidth(500)
+        
+        layout = QVBoxLayout()
+        
+        # Objective
+        layout.addWidget(QLabel("Objective (resource names, relics, time, game_over):"))
+        self.objective_input = QLineEdit()
+        resource_names = list(self.game_window.game.resources)
+        self.objective_input.setPlaceholderText(" + ".join(resource_names[:2]) or "score")
+        layout.addWidget(self.objective_input)
+        
+        # Search settings
+        settings_layout = QGridLayout()
+        self.target_input = QSpinBox()
+        self.target_input.setRange(1, 1000000)
+        self.target_input.setValue(100)
+        self.generations_input = QSpinBox()
+        self.generations_input.setRange(1, 1000)
+        self.generations_input.setValue(10)
+        self.population_input = QSpinBox()
+        self.population_input.setRange(2, 1000)
+        self.population_input.setValue(16)
+        self.jobs_input = QSpinBox()
+        self.jobs_input.setRange(1, 256)
+        self.jobs_input.setValue(4)
+        for row, (label, widget) in enumerate([
+            ("Play from start until time:", self.target_input),
+            ("Generations:", self.generations_input),
+            ("Population:", self.population_input),
+            ("Worker processes:", self.jobs_input)
+        ]):
+            settings_layout.addWidget(QLabel(label), row, 0)
+            settings_layout.addWidget(widget, row, 1)
+        layout.addLayout(settings_layout)
+        
+        self.status_label = QLabel("The current policy seeds the search.")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+        
+        # Buttons
+        button_layout = QHBoxLayout()
+        self.start_btn = QPushButton("Start")
+        self.start_btn.clicked.connect(self.start)
+        button_layout.addWidget(self.start_btn)
+        self.apply_btn = QPushButton("Apply Best Policy")
+        self.apply_btn.setEnabled(False)
+        self.apply_btn.clicked.connect(self.apply)
+        button_layout.addWidget(self.apply_btn)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.reject)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+    
+    def start(self):
+        objective = self.objective_input.text().strip() or self.objective_input.placeholderText()
+        try:
+            optimizer = PolicyOptimizer(
+                self.game_window.mode, self.target_input.value(), objective,
+                jobs=self.jobs_input.value(), population=self.population_input.value(),
+                generations=self.generations_input.value()
+            )
+        except (SyntaxError, ValueError, RuntimeError) as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
+        self.start_btn.setEnabled(False)
+        self.apply_btn.setEnabled(False)
+        self.progress = []
+        self.status_label.setText("Searching...")
+        self.future = self.executor.submit(
+            optimizer.optimize, self.game_window.game.policy,
+            lambda generation, result: self.progress.append((generation, result.best_score))
+        )
+        self.timer.start()
+    
+    def check_progress(self):
+        """Show the latest generation and pick up the result when the search is done"""
+        if self.progress:
+            generation, best_score = self.progress[-1]
+            self.status_label.setText(f"Generation {generation + 1}: best score {best_score}")
+        if self.future is None or not self.future.done():
+            return
+        self.timer.stop()
+        self.start_btn.setEnabled(True)
+        try:
+            self.result = self.future.result()
+        except Exception as e:
+            self.status_label.setText(f"Search failed: {e}")
+            return
+        self.status_label.setText(
+            f"Best score {self.result.best_score} with {len(self.result.best_rules)} rules "
+            f"({self.result.evaluations} games played, {self.result.cache_hits} cache hits)"
+        )
+        self.apply_btn.setEnabled(True)
+    
+    def apply(self):
+        """Replace the game's policy rules with the best ones found"""
+        if self.result is not None:
+            self.game_window.game.policy.rules = list(self.result.best_policy.rules)
+            self.game_window.policy_panel.update_rules_list()
+        self.accept()
+    
+    def done(self, code):
+        self.timer.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        super().done(code)
+
 class PolicyPanel(QGroupBox):
     def __init__(self, game_window):
         super().__init__("Policy Panel")
@@ -704,11 +1196,39 @@ class PolicyPanel(QGroupBox):
         run_until_layout.addWidget(self.run_until_input)
         layout.addLayout(run_until_layout)
 
+        # Which intermediate states of a run are kept in the history
+        history_layout = QHBoxLayout()
+        history_layout.addWidget(QLabel("Save History:"))
+        self.history_combo = QComboBox()
+        for label, kind in (("Every choice", EVERY_CHOICE), ("Every N choices", EVERY_N),
+                            ("Every time unit", EVERY_TIME_UNIT), ("Branch points only", BRANCH_POINTS)):
+            self.history_combo.addItem(label, kind)
+        history_layout.addWidget(self.history_combo)
+        self.history_n_spin = QSpinBox()
+        self.history_n_spin.setRange(1, 10000)
+        self.history_n_spin.setValue(10)
+        self.history_n_spin.setPrefix("N = ")
+        history_layout.addWidget(self.history_n_spin)
+        layout.addLayout(history_layout)
+
         # Run policy button
         self.run_policy_btn = QPushButton("Run Policy")
         self.run_policy_btn.clicked.connect(self.run_policy)
         layout.addWidget(self.run_policy_btn)
 
+        # Policy files and optimizer
+        policy_file_layout = QHBoxLayout()
+        save_policy_btn = QPushButton("Save Policy")
+        save_policy_btn.clicked.connect(self.save_policy)
+        policy_file_layout.addWidget(save_policy_btn)
+        load_policy_btn = QPushButton("Load Policy")
+        load_policy_btn.clicked.connect(self.load_policy)
+        policy_file_layout.addWidget(load_policy_btn)
+        optimize_btn = QPushButton("Optimize...")
+        optimize_btn.clicked.connect(self.optimize_policy)
+        policy_file_layout.addWidget(optimize_btn)
+        layout.addLayout(policy_file_layout)
+
         self.setLayout(layout)
         self.update_card_choices()
 
@@ -759,6 +1279,32 @@ class PolicyPanel(QGroupBox):
             item = QTreeWidgetItem([rule.card_title, rule.choice_description])
             self.rules_list.addTopLevelItem(item)
 
+    def save_policy(self):
+        """Save the policy rules to a JSON file"""
+        path, _ = QFileDialog.getSaveFileName(self, "Save Policy", "policy.json", "JSON Files (*.json)")
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.game_window.game.policy.to_dict(), f, indent=2, ensure_ascii=False)
+
+    def load_policy(self):
+        """Load policy rules from a JSON file (e.g. written by the optimizer)"""
+        path, _ = QFileDialog.getOpenFileName(self, "Load Policy", "", "JSON Files (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                loaded = Policy.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.warning(self, "Error", f"Failed to load policy: {str(e)}")
+            return
+        self.game_window.game.policy.rules = loaded.rules
+        self.update_rules_list()
+
+    def optimize_policy(self):
+        """Open the policy optimizer"""
+        dialog = OptimizerDialog(self.game_window, self)
+        dialog.exec()
+
     def on_rule_moved(self, item, column):
         """Handle rule reordering"""
         print(f"\n[DEBUG] === Rule moved ===")
@@ -791,21 +1337,24 @@ class PolicyPanel(QGroupBox):
             QMessageBox.warning(self, "Error", "Please specify a target time")
             return
 
-        # Register save_callback before running policy (clear previous to avoid duplicates)
+        # History is saved by a writer thread, coalesced as chosen (clear previous callbacks to avoid duplicates)
         self.game_window.game._on_action_callbacks = []
-        def save_callback(game_state, message=""):
-            print(f"[DEBUG][CALLBACK] save_callback called with message: {message}")
-            print(f"[DEBUG][CALLBACK] save_callback: state_manager id={id(self.game_window.state_manager)}, game_state id={id(game_state)}")
-            self.game_window.state_manager.save_state(game_state, message=message or "Policy action")
-        self.game_window.game.register_on_action_callback(save_callback)
+        writer = HistoryWriter(
+            self.game_window.state_manager,
+            CoalescePolicy(self.history_combo.currentData(), self.history_n_spin.value())
+        )
+        writer.attach(self.game_window.game)
 
         try:
             # 현재 게임 시간 전달
             self.game_window.game.policy.set_target_time(time_str, self.game_window.game.current_time)
             self.game_window.game.run_policy()
-            self.game_window.update_display()
         except ValueError as e:
             QMessageBox.warning(self, "Error", str(e))
+        finally:
+            writer.close()
+            print(f"[DEBUG][PolicyPanel] History writer stats: {writer.stats}")
+        self.game_window.update_display()
 
 class GameWindow(QMainWindow):
     def __init__(self):
@@ -824,12 +1373,37 @@ class GameWindow(QMainWindow):
         config_path = Path("config")
         self.game = GameState(config_path, self.mode)
         self.state_manager = StateManager(config_path, self.mode)
+        self.state_manager.retention = RetentionPolicy(keep_every_n=10, max_nodes=5000)
         self.state_manager.initialize(self.game)
+        # Resource time series, kept across loaded states (going back in time truncates it)
+        self.recorder = self.game.enable_recording()
+        # Bytes per component over game time, sampled as the game moves on (View > Memory)
+        self.memory_profile = MemoryProfile(interval=50)
         
         self.auto_jump = True
+        self.profiler = None  # Shared by the game and the state manager while profiling
         self.previewing_choice = None
+        self.hovered_choice = None
         self.advance_btn = None
         
+        # Background what-if simulation of every choice on the table
+        self.lookahead = LookaheadPool(horizon=10)
+        self.lookahead_hash = None
+        self.choice_widgets = []
+        self.lookahead_timer = QTimer(self)
+        self.lookahead_timer.setInterval(100)
+        self.lookahead_timer.timeout.connect(self.refresh_projections)
+        
+        # Anytime rollout advisor, run off the GUI thread on request
+        self.advisor = None
+        self.advisor_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="advisor")
+        self.advice_future = None
+        self.advice_hash = None
+        self.advice = None  # (state hash, ranked ChoiceAdvice list) of the last finished run
+        self.advice_timer = QTimer(self)
+        self.advice_timer.setInterval(100)
+        self.advice_timer.timeout.connect(self.refresh_advice)
+        
         # Initialize UI components
         self.relics_group = None
         self.setup_ui()
@@ -892,6 +1466,65 @@ class GameWindow(QMainWindow):
         manual_time_layout.addWidget(self.manual_time_advance_btn)
         left_layout.addLayout(manual_time_layout)
         
+        # Lookahead horizon for choice previews
+        lookahead_layout = QHBoxLayout()
+        lookahead_layout.addWidget(QLabel("Preview ahead:"))
+        self.lookahead_input = QSpinBox()
+        self.lookahead_input.setMinimum(1)
+        self.lookahead_input.setMaximum(1000)
+        self.lookahead_input.setValue(self.lookahead.horizon)
+        self.lookahead_input.valueChanged.connect(self.set_lookahead_horizon)
+        lookahead_layout.addWidget(self.lookahead_input)
+        lookahead_layout.addWidget(QLabel("time units"))
+        left_layout.addLayout(lookahead_layout)
+        
+        # Passive income forecast (closed form, no simulation)
+        forecast_layout = QHBoxLayout()
+        forecast_layout.addWidget(QLabel("Passive income in:"))
+        self.forecast_input = QSpinBox()
+        self.forecast_input.setMinimum(1)
+        self.forecast_input.setMaximum(100000)
+        self.forecast_input.setValue(10)
+        self.forecast_input.valueChanged.connect(self.update_forecast_label)
+        forecast_layout.addWidget(self.forecast_input)
+        forecast_layout.addWidget(QLabel("time units"))
+        left_layout.addLayout(forecast_layout)
+        self.forecast_label = QLabel()
+        self.forecast_label.setWordWrap(True)
+        left_layout.addWidget(self.forecast_label)
+        
+        # Recorded resources over time
+        chart_layout = QHBoxLayout()
+        chart_layout.addWidget(QLabel("Chart last:"))
+        self.chart_span_input = QSpinBox()
+        self.chart_span_input.setRange(10, 1000000)
+        self.chart_span_input.setValue(100)
+        self.chart_span_input.setSuffix(" time units")
+        chart_layout.addWidget(self.chart_span_input)
+        chart_layout.addStretch()
+        left_layout.addLayout(chart_layout)
+        self.resource_chart = ResourceChart()
+        self.resource_chart.set_recorder(self.recorder)
+        self.chart_span_input.valueChanged.connect(self.resource_chart.set_span)
+        left_layout.addWidget(self.resource_chart)
+        
+        # Rollout advisor ranking the choices on the table
+        advisor_layout = QHBoxLayout()
+        advisor_layout.addWidget(QLabel("Suggest for:"))
+        self.advisor_objective_input = QLineEdit()
+        self.advisor_objective_input.setPlaceholderText(" + ".join(list(self.game.resources)[:2]) or "score")
+        advisor_layout.addWidget(self.advisor_objective_input)
+        self.advisor_budget_input = QSpinBox()
+        self.advisor_budget_input.setRange(50, 60000)
+        self.advisor_budget_input.setSingleStep(100)
+        self.advisor_budget_input.setValue(200)
+        self.advisor_budget_input.setSuffix(" ms")
+        advisor_layout.addWidget(self.advisor_budget_input)
+        self.suggest_btn = QPushButton("Suggest")
+        self.suggest_btn.clicked.connect(self.suggest_choices)
+        advisor_layout.addWidget(self.suggest_btn)
+        left_layout.addLayout(advisor_layout)
+        
         # Time control buttons (auto/advance cards)
         time_control_layout = QHBoxLayout()
         self.auto_jump_radio = QRadioButton("Auto Advance")
@@ -937,6 +1570,19 @@ class GameWindow(QMainWindow):
         history_action = QAction("View History", self)
         history_action.triggered.connect(self.show_history)
         file_menu.addAction(history_action)
+
+        # Edit menu
+        edit_menu = menubar.addMenu("Edit")
+
+        undo_action = QAction("Undo", self)
+        undo_action.setShortcut("Ctrl+Z")
+        undo_action.triggered.connect(self.undo_action)
+        edit_menu.addAction(undo_action)
+
+        redo_action = QAction("Redo", self)
+        redo_action.setShortcut("Ctrl+Shift+Z")
+        redo_action.triggered.connect(self.redo_action)
+        edit_menu.addAction(redo_action)
         
         # View menu
         view_menu = menubar.addMenu("View")
@@ -944,6 +1590,14 @@ class GameWindow(QMainWindow):
         log_action = QAction("Game Log", self)
         log_action.triggered.connect(self.show_game_log)
         view_menu.addAction(log_action)
+        
+        performance_action = QAction("Performance", self)
+        performance_action.triggered.connect(self.show_performance)
+        view_menu.addAction(performance_action)
+        
+        memory_action = QAction("Memory", self)
+        memory_action.triggered.connect(self.show_memory)
+        view_menu.addAction(memory_action)
 
     def update_display(self, force_clear_preview=False):
         """
@@ -958,37 +1612,15 @@ class GameWindow(QMainWindow):
         # Update time
         self.time_label.setText(f"Time: {self.game.current_time}")
         
-        # Get current preview state
-        preview_choice = None if force_clear_preview else self.previewing_choice
+        if force_clear_preview:
+            self.previewing_choice = None
+        self.hovered_choice = None
         
         # Update resource labels
-        for resource, amount in self.game.resources.items():
-            label = self.resource_labels[resource]
-            resource_name = self.game.resource_config['resources'][resource]['name']
-            
-            # If previewing and the previewed card still exists, show the difference
-            if preview_choice is not None:
-                card_index, choice_index = preview_choice
-                if card_index < len(self.game.active_cards):  # Check if card still exists
-                    card = self.game.active_cards[card_index]
-                    choice = card.choices[choice_index]
-                    
-                    # Calculate resource change if this choice is made
-                    change = 0
-                    if "effects" in choice and "resources" in choice["effects"]:
-                        change = choice["effects"]["resources"].get(resource, 0)
-                    
-                    # Show current value and change
-                    if change != 0:
-                        sign = "+" if change > 0 else ""
-                        label.setText(f"{resource_name}: {amount} ({sign}{change} → {amount + change})")
-                        # Color the text based on whether it's an increase or decrease
-                        label.setStyleSheet(f"color: {'#4CAF50' if change > 0 else '#FF6B6B'}")
-                        continue
-            
-            # Default display if not previewing or no change
-            label.setText(f"{resource_name}: {amount}")
-            label.setStyleSheet("")
+        self.update_resource_labels()
+        self.update_forecast_label()
+        self.resource_chart.update()
+        self.memory_profile.maybe_sample(self.game, self.state_manager)
         
         # Update relic labels
         relics_group = self.findChild(QGroupBox, "Relics")
@@ -1076,6 +1708,7 @@ class GameWindow(QMainWindow):
         print("[DEBUG] Updating active cards display...")
         for i in reversed(range(self.cards_layout.count())):
             self.cards_layout.itemAt(i).widget().setParent(None)
+        self.choice_widgets = []
             
         for i, card in enumerate(self.game.active_cards):
             print(f"[DEBUG] Adding card to display: {card.title} (time: {card.drawed_at})")
@@ -1097,9 +1730,158 @@ class GameWindow(QMainWindow):
         self.auto_jump_radio.setEnabled(True)  # Always enable the radio button
         # Don't change the checked state of auto jump radio
         
+        # Simulate the choices on the table in the background
+        self.lookahead_hash = self.lookahead.schedule(self.game)
+        self.refresh_projections()
+        self.show_advice()
+        
         print(f"[DEBUG] Active cards after update: {[(card.title, card.drawed_at) for card in self.game.active_cards]}")
         print("[DEBUG] ===== End of update_display =====")
     
+    def update_resource_labels(self):
+        """Update resource labels, including the previewed or hovered choice if any"""
+        preview_choice = self.hovered_choice or self.previewing_choice
+        projection = None
+        if preview_choice is not None and self.lookahead_hash is not None:
+            projection = self.lookahead.get(self.lookahead_hash, *preview_choice)
+        
+        for resource, amount in self.game.resources.items():
+            label = self.resource_labels[resource]
+            resource_name = self.game.resource_config['resources'][resource]['name']
+            text = f"{resource_name}: {amount}"
+            change = 0
+            
+            # If previewing and the previewed card still exists, show the difference
+            if preview_choice is not None:
+                card_index, choice_index = preview_choice
+                if card_index < len(self.game.active_cards):  # Check if card still exists
+                    card = self.game.active_cards[card_index]
+                    choice = card.choices[choice_index]
+                    
+                    # Calculate resource change if this choice is made
+                    if "effects" in choice and "resources" in choice["effects"]:
+                        change = choice["effects"]["resources"].get(resource, 0)
+                    
+                    # Show current value and change
+                    if change != 0:
+                        sign = "+" if change > 0 else ""
+                        text += f" ({sign}{change} → {amount + change})"
+            
+            # Projected value after simulating the choice N time units ahead
+            if projection is not None:
+                projected = projection.resources.get(resource, amount)
+                if projected != amount + change:
+                    text += f"  [+{projection.horizon}: {projected}]"
+                if change == 0:
+                    change = projected - amount
+            
+            label.setText(text)
+            # Color the text based on whether it's an increase or decrease
+            if change != 0:
+                label.setStyleSheet(f"color: {'#4CAF50' if change > 0 else '#FF6B6B'}")
+            else:
+                label.setStyleSheet("")
+    
+    def update_forecast_label(self):
+        """Show resources after the chosen number of time units of passive income only"""
+        forecast = self.game.forecast(self.game.current_time + self.forecast_input.value())
+        parts = []
+        for resource, amount in forecast.resources.items():
+            resource_name = self.game.resource_config['resources'][resource]['name']
+            change = amount - self.game.resources[resource]
+            if change != 0:
+                sign = "+" if change > 0 else ""
+                parts.append(f"{resource_name}: {amount} ({sign}{change})")
+        text = f"At time {forecast.time}: " + (", ".join(parts) if parts else "no passive income")
+        if not forecast.exact:
+            text += " (approximate)"
+        self.forecast_label.setText(text)
+    
+    def refresh_projections(self):
+        """Show finished lookahead results and keep polling while simulations are pending"""
+        if self.lookahead_hash is None:
+            return
+        for widget in self.choice_widgets:
+            projection = self.lookahead.get(self.lookahead_hash, widget.card_index, widget.choice_index)
+            if projection is not None:
+                widget.set_projection(projection, self.game.resources)
+        if self.hovered_choice or self.previewing_choice:
+            self.update_resource_labels()
+        if self.lookahead.has_pending():
+            self.lookahead_timer.start()
+        else:
+            self.lookahead_timer.stop()
+    
+    def hover_choice(self, card_index, choice_index):
+        """Preview a choice (including its cached lookahead) while the mouse is over it"""
+        self.hovered_choice = None if card_index is None else (card_index, choice_index)
+        self.update_resource_labels()
+    
+    def set_lookahead_horizon(self, horizon):
+        self.lookahead.set_horizon(horizon)
+        for widget in self.choice_widgets:
+            if widget.projection_label is not None:
+                widget.projection_label.hide()
+        self.lookahead_hash = self.lookahead.schedule(self.game)
+        self.refresh_projections()
+    
+    def suggest_choices(self):
+        """Rank the choices on the table with rollouts, without blocking the window"""
+        objective = self.advisor_objective_input.text().strip() or self.advisor_objective_input.placeholderText()
+        if self.advice_future is not None and not self.advice_future.done():
+            return
+        if self.advisor is None or self.advisor.objective_source != objective:
+            try:
+                advisor = Advisor(self.mode, objective, horizon=self.lookahead.horizon,
+                                  rollout_policy=self.game.policy, jobs=max(1, (os.cpu_count() or 2) - 1))
+            except SyntaxError as e:
+                QMessageBox.warning(self, "Advisor", f"Invalid objective: {e}")
+                return
+            if self.advisor is not None:
+                self.advisor_executor.submit(self.advisor.close)
+            self.advisor = advisor
+        self.advisor.horizon = self.lookahead.horizon
+        self.advisor.rules = policy_to_rules(self.game.policy)
+        snapshot = self.game.fork()
+        self.advice_hash = snapshot.state_hash()
+        self.advice_future = self.advisor_executor.submit(
+            self.advisor.advise, snapshot, self.advisor_budget_input.value() / 1000)
+        self.suggest_btn.setEnabled(False)
+        self.suggest_btn.setText("Thinking...")
+        self.advice_timer.start()
+    
+    def refresh_advice(self):
+        """Pick up the advisor result once it is ready"""
+        if self.advice_future is None or not self.advice_future.done():
+            return
+        self.advice_timer.stop()
+        future, self.advice_future = self.advice_future, None
+        self.suggest_btn.setEnabled(True)
+        self.suggest_btn.setText("Suggest")
+        try:
+            self.advice = (self.advice_hash, future.result())
+        except Exception as e:
+            QMessageBox.warning(self, "Advisor", f"Advisor failed: {e}")
+            return
+        self.show_advice()
+    
+    def show_advice(self):
+        """Label the choice widgets with the advice for the current state, if there is any"""
+        if self.advice is None or self.advice[0] != self.game.state_hash():
+            return
+        by_choice = {(advice.card_index, advice.choice_index): advice for advice in self.advice[1]}
+        for widget in self.choice_widgets:
+            advice = by_choice.get((widget.card_index, widget.choice_index))
+            if advice is not None:
+                widget.set_advice(advice)
+    
+    def closeEvent(self, event):
+        self.lookahead.shutdown()
+        if self.advisor is not None:
+            self.advisor_executor.submit(self.advisor.close)
+        self.advisor_executor.shutdown(wait=False)
+        super().closeEvent(event)
+    
     def show_card_details(self, card):
         dialog = CardDetailsDialog(card, self)
         dialog.exec()
@@ -1159,12 +1941,16 @@ class GameWindow(QMainWindow):
                 "You must handle all immediate cards before advancing time!")
             return
             
-        if self.game.advance_time(mode="auto"):
+        if self.auto_jump:
+            # Fast-forward to the next card in the engine and repaint once
+            if self.game.active_cards:
+                return
+            summary = self.game.advance_until_decision(max_steps=AUTO_JUMP_MAX_STEPS)
+            print(f"[DEBUG] Auto advanced {summary.start_time} -> {summary.end_time} ({summary.stop_reason})")
+            if summary.steps:
+                self.update_display(force_clear_preview=True)
+        elif self.game.advance_time(mode="auto"):
             self.update_display(force_clear_preview=True)
-            
-            # If auto jump is enabled and no active cards remain, advance time again
-            if self.auto_jump and not self.game.active_cards and self.game.card_queue:
-                self.advance_time()
 
     def preview_choice(self, card_index, choice_index):
         """Show a preview of what would happen if this choice was made"""
@@ -1186,16 +1972,58 @@ class GameWindow(QMainWindow):
         try:
             loaded_state = self.state_manager.load_state(node_id)
             self.game = loaded_state
+            self.game.enable_recording(self.recorder)
+            if self.profiler is not None:
+                self.game.enable_profiling(self.profiler)
             self.update_display(force_clear_preview=True)
             print(f"Successfully loaded state from node {node_id}")
         except ValueError as e:
             QMessageBox.critical(self, "Error", f"Failed to load state: {str(e)}")
 
+    def undo_action(self):
+        """Step the game back one action without reloading a snapshot"""
+        if self.game.undo():
+            self.sync_history_position()
+            self.update_display(force_clear_preview=True)
+
+    def redo_action(self):
+        if self.game.redo():
+            self.sync_history_position()
+            self.update_display(force_clear_preview=True)
+
+    def sync_history_position(self):
+        """Point the history at the node of the current state, if it was saved"""
+        node_id = self.game.state_hash()
+        if node_id in self.state_manager.nodes:
+            self.state_manager.current_node_id = node_id
+
     def show_game_log(self):
         """Show the game log dialog"""
         dialog = GameLogDialog(self.game, self)
         dialog.exec()
 
+    def show_performance(self):
+        """Show the performance dialog"""
+        dialog = PerformanceDialog(self, self)
+        dialog.exec()
+
+    def show_memory(self):
+        """Show the memory dialog"""
+        dialog = MemoryDialog(self, self)
+        dialog.exec()
+
+    def set_profiling(self, enabled: bool, trace: bool = False):
+        """Turn profiling of the game and its history on or off"""
+        if enabled:
+            if self.profiler is None or self.profiler.trace != trace:
+                self.profiler = Profiler(trace=trace)
+            self.game.enable_profiling(self.profiler)
+            self.state_manager.enable_profiling(self.profiler)
+        else:
+            self.profiler = None
+            self.game.disable_profiling()
+            self.state_manager.disable_profiling()
+
     def manual_time_advance(self):
         print("\n[DEBUG] ===== manual_time_advance called =====")
         # Restrict if there are immediate cards
@@ -1208,28 +2036,10 @@ class GameWindow(QMainWindow):
 
         amount = self.time_input.value()
         print(f"[DEBUG] Attempting to advance time by {amount} units")
-        for i in range(amount):
-            print(f"[DEBUG] Manual advance iteration {i+1}/{amount}")
-            print(f"[DEBUG] Current time before advance: {self.game.current_time}")
-            print(f"[DEBUG] Current active cards: {[(card.title, card.drawed_at) for card in self.game.active_cards]}")
-            print(f"[DEBUG] Current card queue: {[(card.title, card.drawed_at) for card in self.game.card_queue]}")
-            
-            # In manual mode, we should advance time even if there are non-immediate cards
-            if not self.game.advance_time(mode="manual"):
-                print("[DEBUG] advance_time returned False, stopping manual advance")
-                break
-                
-            # Only stop if we drew any immediate cards
-            immediate_cards = [card for card in self.game.active_cards if card.card_type == "immediate"]
-            if immediate_cards:
-                print(f"[DEBUG] Immediate cards drawn during advance, stopping manual advance")
-                print(f"[DEBUG] Immediate cards: {[card.title for card in immediate_cards]}")
-                break
-                
-            print(f"[DEBUG] Successfully advanced to time {self.game.current_time}")
-            print(f"[DEBUG] Active cards after advance: {[(card.title, card.drawed_at) for card in self.game.active_cards]}")
-            print(f"[DEBUG] Card queue after advance: {[(card.title, card.drawed_at) for card in self.game.card_queue]}")
-            
+        # Advances tick by tick in the engine; only an immediate card (or game over) stops it early
+        summary = self.game.advance_until_decision(stop_time=self.game.current_time + amount, stop_on_new_card=False)
+        print(f"[DEBUG] Advanced {summary.start_time} -> {summary.end_time} ({summary.stop_reason}), "
+              f"drew {summary.cards_drawn}, resource changes {summary.resource_changes}")
         print("[DEBUG] ===== End of manual_time_advance =====")
         self.update_display(force_clear_preview=True)
 
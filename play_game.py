@@ -1,5 +1,11 @@
 from backend.game_state import GameState
+from backend.runner import RunSpec, run_many
+from backend import debug
 from pathlib import Path
+import argparse
+import itertools
+import json
+import sys
 
 def display_resources(game: GameState):
     print("\n=== Resources ===")
@@ -32,9 +38,9 @@ def display_active_cards(game: GameState):
                     for relic in choice["requirements"]["relics"]:
                         print(f"       - {relic}")
 
-def main():
+def play_interactive(mode=None):
     config_path = Path("config")
-    game = GameState(config_path)
+    game = GameState(config_path, mode) if mode else GameState(config_path)
     
     print("Welcome to the Card Game!")
     print("You start with a mysterious letter...")
@@ -78,5 +84,62 @@ def main():
     display_resources(game)
     display_relics(game)
 
+def parse_seeds(text):
+    """Parse seeds like "7", "1,2,3" or "1-100" """
+    seeds = []
+    for part in text.split(","):
+        if "-" in part:
+            start, end = part.split("-", 1)
+            seeds.extend(range(int(start), int(end) + 1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+def run_headless(args):
+    """Run every (mode, policy, seed) combination and stream NDJSON to stdout"""
+    debug.set_debug(False)
+    if not args.policy and not args.actions:
+        print("Headless mode needs --policy or --actions", file=sys.stderr)
+        return 2
+
+    policies = args.policy or [None]
+    seeds = parse_seeds(args.seeds) if args.seeds else [None]
+    specs = [
+        RunSpec(mode=mode, stop_time=args.until, policy=policy, actions=args.actions,
+                seed=seed, max_steps=args.max_steps, profile=args.profile)
+        for mode, policy, seed in itertools.product(args.mode, policies, seeds)
+    ]
+    if args.trace:
+        for run_index, spec in enumerate(specs):
+            spec.trace_path = args.trace if len(specs) == 1 else f"{args.trace}.run{run_index}.json"
+
+    for record in run_many(specs, jobs=args.jobs, with_steps=args.output == "steps"):
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Play the card game in the terminal, or run it headless")
+    parser.add_argument("--mode", action="append", help="Game mode (repeat for several modes in headless runs)")
+    parser.add_argument("--headless", action="store_true", help="Run without prompts and write NDJSON to stdout")
+    parser.add_argument("--policy", action="append",
+                        help="Policy JSON file, or 'random' (repeat to compare several policies)")
+    parser.add_argument("--actions", help="NDJSON action log to replay instead of a policy")
+    parser.add_argument("--until", type=int, help="Stop at this game time")
+    parser.add_argument("--seeds", help="Seeds for the random fallback, e.g. 7, 1,2,3 or 1-100")
+    parser.add_argument("--output", choices=["steps", "summary"], default="summary",
+                        help="Stream every step or only the final summary of each run")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--max-steps", type=int, default=100000, help="Safety limit on steps per run")
+    parser.add_argument("--profile", action="store_true", help="Add per-phase engine stats to each summary")
+    parser.add_argument("--trace", help="Write a Chrome trace-event JSON of the run to this file")
+    args = parser.parse_args()
+
+    if args.headless:
+        if not args.mode:
+            parser.error("--headless requires --mode")
+        sys.exit(run_headless(args))
+    play_interactive(args.mode[0] if args.mode else None)
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
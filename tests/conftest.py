@@ -0,0 +1,83 @@
+import json
+import os
+import random
+from pathlib import Path
+import pytest
+from backend import debug
+from backend.game_loader import COMPILED_CACHE_ENV
+from backend.state_history import StateManager, StateNode
+
+CONFIG = Path(__file__).resolve().parent.parent / "config"
+
+@pytest.fixture(autouse=True, scope="session")
+def compiled_cache(tmp_path_factory):
+    """Keep parsed modes out of the user's cache directory"""
+    previous = os.environ.get(COMPILED_CACHE_ENV)
+    os.environ[COMPILED_CACHE_ENV] = str(tmp_path_factory.mktemp("compiled"))
+    yield
+    if previous is None:
+        del os.environ[COMPILED_CACHE_ENV]
+    else:
+        os.environ[COMPILED_CACHE_ENV] = previous
+
+@pytest.fixture(autouse=True)
+def quiet():
+    debug.set_debug(False)
+
+@pytest.fixture
+def config_path() -> Path:
+    return CONFIG
+
+def _make_node(value: int, time: int = 0) -> StateNode:
+    state = {"current_time": time, "resources": {"value": value}, "relics": [], "active_cards": [],
+             "card_queue": [], "effect_timers": {}}
+    return StateNode(json.dumps(state))
+
+def _random_history(seed: int, size: int = 200, merges: int = 40) -> StateManager:
+    """A tree of `size` nodes grown from random earlier nodes, plus `merges` extra edges
+    from earlier to later nodes (so the history stays acyclic)"""
+    rng = random.Random(seed)
+    manager = StateManager(Path("config"), "test", prefetch=False)
+    ids = [manager.add_node(_make_node(0))]
+    manager.root_node_id = ids[0]
+    for value in range(1, size):
+        manager.current_node_id = rng.choice(ids)
+        ids.append(manager.add_node(_make_node(value)))
+    for _ in range(merges):
+        a, b = sorted(rng.sample(range(size), 2))
+        manager.link(ids[a], ids[b], f"merge {a}-{b}")
+    return manager
+
+@pytest.fixture
+def make_node():
+    """A history node whose state differs by `value` only"""
+    return _make_node
+
+@pytest.fixture
+def random_history():
+    return _random_history
+
+@pytest.fixture
+def naive_ancestors():
+    def ancestors(manager: StateManager, node_id: str) -> set:
+        seen = set()
+        pending = list(manager.nodes[node_id].parents)
+        while pending:
+            parent_id = pending.pop()
+            if parent_id in manager.nodes and parent_id not in seen:
+                seen.add(parent_id)
+                pending.extend(manager.nodes[parent_id].parents)
+        return seen
+    return ancestors
+
+@pytest.fixture
+def assert_symmetric():
+    def check(manager: StateManager) -> None:
+        for node_id, node in manager.nodes.items():
+            for child_id in node.child_ids:
+                assert node_id in manager.nodes[child_id].parents
+            for parent_id in node.parents:
+                if parent_id in manager.nodes:
+                    assert node_id in manager.nodes[parent_id].child_ids
+            assert len(node.child_ids) == len(set(node.child_ids))
+    return check
@@ -0,0 +1,44 @@
+from backend.game_state import Card, GameState
+
+MODE = "0507_terran"
+
+def blocked_game(config_path) -> GameState:
+    """No active card and only a queued card that needs a relic the player lacks"""
+    game = GameState(config_path, MODE)
+    config = next(card for card in game.card_config["cards"].values()
+                  if (card.get("requirements") or {}).get("relics"))
+    game.active_cards = []
+    game.card_queue = [Card(title=config["title"], description=config.get("description", ""), drawed_at=3,
+                            priority=config.get("priority", 0), choices=config["choices"],
+                            card_type=config.get("card_type", "delayed"), requirements=config["requirements"])]
+    return game
+
+def test_stops_when_no_queued_card_can_be_drawn(config_path):
+    game = blocked_game(config_path)
+    summary = game.advance_until_decision()
+    assert summary.stop_reason == "no_drawable_cards"
+    assert summary.steps == 0
+
+def test_stops_with_only_delayed_cards_and_nothing_queued(config_path):
+    game = GameState(config_path, MODE)
+    assert game.active_cards and not game.card_queue
+    summary = game.advance_until_decision(stop_on_new_card=False)
+    assert summary.stop_reason == "no_drawable_cards" and summary.steps == 0
+
+def test_stop_time_still_advances_a_blocked_game(config_path):
+    game = blocked_game(config_path)
+    summary = game.advance_until_decision(stop_time=20, stop_on_new_card=False)
+    assert summary.stop_reason == "stop_time"
+    assert game.current_time == 20
+    assert [card.title for card in game.card_queue] == [game.card_queue[0].title]
+
+def test_game_already_over_stops_at_once(config_path):
+    game = GameState(config_path, MODE)
+    resource, config = next((name, config) for name, config in game.resource_config["resources"].items()
+                            if "min_amount" in config)
+    game.resources[resource] = config["min_amount"] - 1
+    game.card_queue = blocked_game(config_path).card_queue
+    game.card_queue[0].requirements = None
+    assert game.is_game_over()
+    summary = game.advance_until_decision(stop_on_new_card=False)
+    assert summary.stop_reason == "game_over" and summary.steps == 0
@@ -0,0 +1,39 @@
+import random
+import pytest
+from backend.state_history import StateManager
+
+def naive_common_ancestor(manager: StateManager, node_a: str, node_b: str):
+    via = manager._dag_index().via
+    def chain(node_id):
+        nodes = [node_id]
+        while via[nodes[-1]] is not None:
+            nodes.append(via[nodes[-1]])
+        return nodes
+    above_b = set(chain(node_b))
+    return next((node_id for node_id in chain(node_a) if node_id in above_b), None)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_common_ancestor_matches_naive_walk(seed, random_history):
+    manager = random_history(seed)
+    rng = random.Random(seed)
+    ids = list(manager.nodes)
+    for _ in range(500):
+        a, b = rng.choice(ids), rng.choice(ids)
+        assert manager.common_ancestor(a, b) == naive_common_ancestor(manager, a, b)
+
+def test_lifting_tables_follow_new_leaves(random_history, make_node):
+    manager = random_history(1, size=50, merges=0)
+    ids = list(manager.nodes)
+    manager.common_ancestor(ids[1], ids[2])  # Builds the tables
+    rng = random.Random(1)
+    for value in range(50, 300):
+        manager.current_node_id = rng.choice(ids)
+        ids.append(manager.add_node(make_node(value)))
+        a, b = rng.choice(ids), ids[-1]
+        assert manager.common_ancestor(a, b) == naive_common_ancestor(manager, a, b)
+
+def test_common_ancestor_of_unrelated_trees(random_history, make_node):
+    manager = random_history(2, size=10, merges=0)
+    manager.current_node_id = None
+    other = manager.add_node(make_node(1000))
+    assert manager.common_ancestor(manager.root_node_id, other) is None
@@ -0,0 +1,31 @@
+import os
+import shutil
+from backend.game_loader import COMPILED_CACHE_ENV, GameLoader
+
+def test_new_content_replaces_the_mode_entry(tmp_path, config_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv(COMPILED_CACHE_ENV, str(cache_dir))
+    config = tmp_path / "config"
+    for mode in ("0507_terran", "0506_terran"):
+        shutil.copytree(config_path / mode, config / mode)
+    GameLoader.load_mode("0506_terran", config)
+    first = GameLoader.load_mode("0507_terran", config)
+    assert len(list(cache_dir.glob("*.json"))) == 2
+    cards = config / "0507_terran" / "cards.yaml"
+    for edit in range(3):
+        cards.write_text(cards.read_text(encoding="utf-8") + f"\n# edit {edit}\n", encoding="utf-8")
+        loaded = GameLoader.load_mode("0507_terran", config)
+        assert loaded.card_config == first.card_config
+        assert len(list(cache_dir.glob("*.json"))) == 2
+
+def test_cached_entry_is_used(tmp_path, config_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv(COMPILED_CACHE_ENV, str(cache_dir))
+    config = tmp_path / "config"
+    shutil.copytree(config_path / "0507_terran", config / "0507_terran")
+    GameLoader.load_mode("0507_terran", config)
+    monkeypatch.setattr(GameLoader, "_parse_config", staticmethod(lambda mode, files: 1 / 0))
+    cards = config / "0507_terran" / "cards.yaml"
+    mtime = cards.stat().st_mtime_ns
+    os.utime(cards, ns=(mtime, mtime + 10 ** 9))  # New mtime, same content
+    GameLoader.load_mode("0507_terran", config)
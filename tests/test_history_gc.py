@@ -0,0 +1,43 @@
+import random
+from pathlib import Path
+import pytest
+from backend.state_history import RetentionPolicy, StateManager
+
+@pytest.mark.parametrize("seed", range(3))
+def test_collect_garbage_splices_children(seed, random_history, naive_ancestors, assert_symmetric):
+    manager = random_history(seed, size=300)
+    rng = random.Random(seed)
+    for node_id in rng.sample(list(manager.nodes), 10):
+        manager.label_node(node_id, "kept")
+    before = {node_id: naive_ancestors(manager, node_id) for node_id in manager.nodes}
+    policy = RetentionPolicy(keep_branch_tips=True, keep_every_n=0, keep_labelled=True, keep_last=0)
+    keep = manager.retained_nodes(policy)
+    report = manager.collect_garbage(policy, batch_size=16)
+
+    assert report.removed > 0
+    assert set(manager.nodes) == keep
+    assert_symmetric(manager)
+    for node_id in manager.nodes:
+        # Every surviving ancestor stays an ancestor, and no new ones appear
+        assert naive_ancestors(manager, node_id) == before[node_id] & keep
+        manager.path_to(node_id)
+    assert manager.nodes[manager.root_node_id].parents == {}
+
+def test_repeated_collection_keeps_the_every_n_trail(tmp_path, make_node):
+    manager = StateManager(Path("config"), "test", prefetch=False)
+    manager.root_node_id = manager.add_node(make_node(0))
+    for value in range(1, 101):
+        manager.add_node(make_node(value))
+    policy = RetentionPolicy(keep_branch_tips=False, keep_every_n=10, keep_labelled=False, keep_last=0)
+    manager.collect_garbage(policy)
+    trail = set(manager.nodes)
+    assert len(trail) == 11
+    for _ in range(3):
+        manager.collect_garbage(policy)
+        assert set(manager.nodes) == trail
+    path = str(tmp_path / "history.json")
+    manager.save_to_file(path)
+    loaded = StateManager(Path("config"), "test", prefetch=False)
+    loaded.load_from_file(path)
+    loaded.collect_garbage(policy)
+    assert set(loaded.nodes) == trail
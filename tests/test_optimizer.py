@@ -0,0 +1,30 @@
+import pytest
+from backend.optimizer import PolicyOptimizer, canonical_rules, policy_hash
+
+MODE = "0507_terran"
+
+def test_unknown_objective_names_fail_at_construction(config_path):
+    with pytest.raises(ValueError, match="mineralz"):
+        PolicyOptimizer(MODE, 20, "mineralz + 1", config_path=str(config_path))
+    PolicyOptimizer(MODE, 20, "minerals + sum(count for count in relics.values()) - time",
+                    config_path=str(config_path))
+
+def test_candidates_are_canonical(config_path):
+    optimizer = PolicyOptimizer(MODE, 20, "minerals", config_path=str(config_path), seed=3)
+    rules = optimizer.random_rules()
+    assert rules == canonical_rules(rules)
+    for _ in range(200):
+        rules = optimizer.mutate(rules)
+        assert rules == canonical_rules(rules)
+
+def test_reordered_rules_share_a_hash():
+    rules = (("b", "x"), ("a", "y"), ("a", "z"))
+    reordered = (("a", "y"), ("b", "x"), ("a", "z"))
+    assert policy_hash(canonical_rules(rules)) == policy_hash(canonical_rules(reordered))
+    assert canonical_rules(rules) == (("a", "y"), ("a", "z"), ("b", "x"))
+
+def test_search_is_deterministic(config_path):
+    results = [PolicyOptimizer(MODE, 30, "minerals", config_path=str(config_path), population=6,
+                               generations=3, seed=1).optimize() for _ in range(2)]
+    assert results[0].best_rules == results[1].best_rules
+    assert results[0].history == results[1].history
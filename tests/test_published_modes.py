@@ -0,0 +1,30 @@
+import shutil
+from backend.analytics import analyze
+from backend.game_loader import mode_error, published_modes
+from backend.runner import RunSpec, run_many
+
+def broken_config(tmp_path, config_path):
+    shutil.copytree(config_path / "0507_terran", tmp_path / "0507_terran")
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "cards.yaml").write_text("cards: [unclosed", encoding="utf-8")
+    return tmp_path
+
+def test_failing_mode_is_recorded_not_raised(tmp_path, config_path):
+    config = broken_config(tmp_path, config_path)
+    assert mode_error("0507_terran", config) is None
+    assert mode_error("broken", config) is not None
+    with published_modes([("0507_terran", config), ("broken", config)]) as handles:
+        assert len(handles) == 1
+        assert list(handles.failures) == [("broken", str(config))]
+
+def test_runs_of_other_modes_go_on(tmp_path, config_path):
+    config = str(broken_config(tmp_path, config_path))
+    specs = [RunSpec(mode=mode, policy="random", seed=seed, max_steps=20, config_path=config)
+             for mode in ("broken", "0507_terran") for seed in range(2)]
+    for jobs in (1, 2):
+        summaries = sorted(run_many(specs, jobs=jobs), key=lambda record: record["run"])
+        assert [summary["stop_reason"] == "error" for summary in summaries] == [True, True, False, False]
+        assert summaries[0]["error"]
+    results = analyze(specs, jobs=2)
+    assert results["broken"].errors == 2 and results["broken"].load_error
+    assert results["0507_terran"].runs == 2 and results["0507_terran"].load_error is None
@@ -0,0 +1,45 @@
+import random
+import pytest
+from backend.analytics import QuantileSketch
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+@pytest.mark.parametrize("accuracy", [0.01, 0.05])
+def test_quantiles_within_relative_accuracy(accuracy):
+    rng = random.Random(0)
+    values = [rng.lognormvariate(0, 2) * rng.choice((-1, 1)) for _ in range(20000)] + [0.0] * 50
+    sketch = QuantileSketch(accuracy)
+    for value in values:
+        sketch.add(value)
+    for q in (0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0):
+        expected = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= accuracy * abs(expected) + 1e-12
+    assert sketch.min == min(values) and sketch.max == max(values)
+    assert sketch.count == len(values)
+
+def test_merge_equals_one_sketch_of_everything():
+    rng = random.Random(1)
+    parts = [[rng.expovariate(0.01) for _ in range(1000)] for _ in range(4)]
+    whole = QuantileSketch()
+    merged = QuantileSketch()
+    for part in parts:
+        sketch = QuantileSketch()
+        for value in part:
+            sketch.add(value)
+            whole.add(value)
+        merged.merge(QuantileSketch.from_dict(sketch.to_dict()))
+    assert merged.positive == whole.positive and merged.count == whole.count
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+    assert merged.total == pytest.approx(whole.total)
+    assert merged.quantile(0.5) == whole.quantile(0.5)
+
+def test_merge_rejects_other_accuracy():
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+def test_empty_sketch():
+    sketch = QuantileSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.summary() == {"count": 0}
@@ -0,0 +1,49 @@
+import random
+from pathlib import Path
+import pytest
+from backend.game_state import GameState
+from backend.state_history import StateManager
+
+@pytest.mark.parametrize("seed", range(3))
+def test_parents_and_children_are_symmetric(seed, random_history, assert_symmetric):
+    manager = random_history(seed)
+    assert_symmetric(manager)
+    assert manager.dag_stats["merges"] > 0
+
+def test_link_rejects_cycles(random_history, assert_symmetric):
+    manager = random_history(0, size=20, merges=0)
+    root = manager.root_node_id
+    leaf = next(node_id for node_id, node in manager.nodes.items() if not node.child_ids)
+    assert not manager.link(leaf, root)
+    assert not manager.link(leaf, leaf)
+    assert manager.dag_stats["back_edges"] == 2
+    assert_symmetric(manager)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_is_ancestor_matches_naive_walk(seed, random_history, naive_ancestors):
+    manager = random_history(seed, size=80)
+    rng = random.Random(seed)
+    ids = list(manager.nodes)
+    for _ in range(500):
+        a, b = rng.choice(ids), rng.choice(ids)
+        assert manager.is_ancestor(a, b) == (a != b and a in naive_ancestors(manager, b))
+
+def test_node_ids_cover_the_whole_continuation_state(config_path, make_node):
+    game = GameState(config_path, "0507_terran")
+    manager = StateManager(config_path, "0507_terran", prefetch=False)
+    manager.initialize(game)
+    assert manager.root_node_id == game.state_hash()
+    assert make_node(1, time=0).node_id != make_node(1, time=5).node_id
+
+def test_same_resources_later_are_a_new_node(make_node):
+    manager = StateManager(Path("config"), "test", prefetch=False)
+    first = manager.add_node(make_node(1, time=0))
+    manager.root_node_id = first
+    manager.add_node(make_node(2, time=1))
+    later = manager.add_node(make_node(1, time=2))  # A -> B -> A'
+    assert later != first
+    assert manager.path_to(later) == [first, manager.nodes[later].parent_id, later]
+    assert manager.dag_stats["back_edges"] == 0
+    manager.current_node_id = first
+    manager.add_node(make_node(2, time=1))  # The same B again: a revisit, not a new node
+    assert len(manager.nodes) == 3 and manager.dag_stats["revisits"] == 1
@@ -0,0 +1,36 @@
+import random
+from backend.timeseries import ResourceRecorder
+
+def test_compaction_bounds_points_and_keeps_extremes():
+    rng = random.Random(0)
+    recorder = ResourceRecorder(["gold"], max_points=64)
+    values = {}
+    for time in range(5000):
+        values[time] = rng.randint(-1000, 1000)
+        recorder.record(time, {"gold": values[time]})
+    points = recorder.points("gold")
+    assert recorder.stats()["compactions"] > 0
+    assert len(points) <= 64
+    assert [time for time, _ in points] == sorted({time for time, _ in points})
+    assert all(values[time] == value for time, value in points)
+    assert min(value for _, value in points) == min(values.values())
+    assert max(value for _, value in points) == max(values.values())
+    # The most recent quarter stays at full resolution
+    for time in range(4990, 5000):
+        assert recorder.value_at("gold", time) == values[time]
+
+def test_unchanged_values_are_not_stored():
+    recorder = ResourceRecorder(["gold", "wood"], max_points=16)
+    for time in range(100):
+        recorder.record(time, {"gold": time // 10, "wood": 5})
+    assert len(recorder.points("gold")) == 10
+    assert recorder.points("wood") == [(0, 5)]
+    assert recorder.value_at("gold", 55) == 5
+
+def test_going_back_in_time_truncates():
+    recorder = ResourceRecorder(["gold"], max_points=16)
+    for time in range(10):
+        recorder.record(time, {"gold": time})
+    recorder.record(4, {"gold": 40})
+    assert recorder.points("gold") == [(0, 0), (1, 1), (2, 2), (3, 3), (4, 40)]
+    assert recorder.window("gold", 0, 100)[-1] == (4, 40)
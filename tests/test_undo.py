@@ -0,0 +1,49 @@
+import json
+import random
+import pytest
+from backend.game_state import GameState, Policy
+from backend.runner import legal_choices
+
+MODE = "0507_terran"
+
+def snapshot(game: GameState) -> str:
+    return json.dumps(game.to_dict(), sort_keys=True)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_undo_all_restores_initial_state(config_path, seed):
+    rng = random.Random(seed)
+    game = GameState(config_path, MODE)
+    states = [snapshot(game)]
+    for _ in range(150):
+        if game.is_game_over():
+            break
+        choices = legal_choices(game)
+        roll = rng.random()
+        if choices and roll < 0.6:
+            game.make_choice(*rng.choice(choices))
+        elif roll < 0.8:
+            game.advance_time(rng.choice(["auto", "manual", "advance_cards"]))
+        else:
+            game.manual_time_advance(rng.randint(1, 5))
+        if snapshot(game) != states[-1]:
+            states.append(snapshot(game))
+    while game.undo():
+        pass
+    assert snapshot(game) == states[0]
+    while game.redo():
+        pass
+    assert snapshot(game) == states[-1]
+
+def test_policy_run_is_undone_step_by_step(config_path):
+    game = GameState(config_path, MODE)
+    initial = snapshot(game)
+    rules = [{"card_title": card["title"], "choice_description": card["choices"][0]["description"]}
+             for card in game.card_config["cards"].values() if card.get("choices")]
+    game.policy = Policy.from_dict({"rules": rules})
+    game.policy.set_target_time("+40", 0)
+    game.run_policy()
+    assert game.current_time > 0
+    assert len(game._undo_stack) > 1
+    while game.undo():
+        pass
+    assert snapshot(game) == initial